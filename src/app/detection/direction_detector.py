@@ -6,6 +6,8 @@ import math
 import time
 import numpy as np
 
+from app.geometry import project_to_ground
+
 # Global variable - shared from integrated_main.py
 VEHICLE_POSITIONS = {}  # Will be initialized from integrated_main
 
@@ -110,14 +112,17 @@ def calculate_vehicle_direction(track_id, current_pos, ref_angle=None):
         return 'unknown'
 
 
-def estimate_vehicle_speed(track_id, fps=30, pixel_to_meter=0.05):
+def estimate_vehicle_speed(track_id, fps=30, pixel_to_meter=0.05, homography=None, window=5):
     """Estimate vehicle speed from tracking history.
     Returns speed in km/h or None if cannot estimate.
     
     Args:
         track_id: Vehicle tracking ID
         fps: Video frame rate (default 30)
-        pixel_to_meter: Calibration factor (default 0.05m per pixel)
+        pixel_to_meter: Calibration factor used when no homography (default 0.05m per pixel)
+        homography: Optional 3x3 image → ground-plane matrix (meters), see
+                    app.geometry.compute_ground_homography
+        window: Number of recent positions to average over (default 5)
     
     Returns:
         speed_kmh: Speed in km/h or None
@@ -127,29 +132,29 @@ def estimate_vehicle_speed(track_id, fps=30, pixel_to_meter=0.05):
     if track_id not in VEHICLE_POSITIONS or len(VEHICLE_POSITIONS[track_id]) < 2:
         return None
     
-    # Get last 2 positions
-    positions = VEHICLE_POSITIONS[track_id]
+    positions = VEHICLE_POSITIONS[track_id][-max(2, window):]
     if len(positions[-1]) == 2:  # Old format without timestamp
         return None
     
-    pos1 = positions[-2]
+    pos1 = positions[0]
     pos2 = positions[-1]
     
-    # Calculate pixel distance
-    dx = pos2[0] - pos1[0]
-    dy = pos2[1] - pos1[1]
-    distance_px = np.sqrt(dx**2 + dy**2)
-    
-    # Convert to meters
-    distance_m = distance_px * pixel_to_meter
+    # Distance over the whole window (less noisy than the last 2 points)
+    if homography is not None:
+        ground = project_to_ground([pos1[:2], pos2[:2]], homography)
+        distance_m = float(np.linalg.norm(ground[1] - ground[0]))
+    else:
+        dx = pos2[0] - pos1[0]
+        dy = pos2[1] - pos1[1]
+        distance_m = np.sqrt(dx**2 + dy**2) * pixel_to_meter
     
     # Calculate time difference
     if len(pos1) >= 3 and len(pos2) >= 3:
         time_s = pos2[2] - pos1[2]
         if time_s <= 0:
-            time_s = 1.0 / fps
+            time_s = (len(positions) - 1) / fps
     else:
-        time_s = 1.0 / fps
+        time_s = (len(positions) - 1) / fps
     
     # Calculate speed in km/h
     speed_mps = distance_m / time_s
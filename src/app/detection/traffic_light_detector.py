@@ -74,3 +74,33 @@ def classify_tl_color(roi):
         return "yellow"
     else:
         return "green"
+
+
+def detect_tl_color_hsv(roi):
+    """Detect traffic light color using HSV pixel counting (used for live TL tracking)
+    
+    Args:
+        roi: ROI image (BGR format)
+    
+    Returns:
+        str: 'đỏ', 'vàng', 'xanh', or 'unknown'
+    """
+    if roi is None or roi.size == 0:
+        return 'unknown'
+    try:
+        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        
+        # Red (two ranges due to hue wraparound)
+        red_count = (cv2.countNonZero(cv2.inRange(hsv, np.array([0, 100, 100]), np.array([10, 255, 255]))) +
+                     cv2.countNonZero(cv2.inRange(hsv, np.array([170, 100, 100]), np.array([180, 255, 255]))))
+        yellow_count = cv2.countNonZero(cv2.inRange(hsv, np.array([20, 100, 100]), np.array([30, 255, 255])))
+        green_count = cv2.countNonZero(cv2.inRange(hsv, np.array([40, 50, 50]), np.array([90, 255, 255])))
+        
+        # Return color with most pixels, only if significant (at least 1% of ROI)
+        counts = {'đỏ': red_count, 'vàng': yellow_count, 'xanh': green_count}
+        max_color = max(counts, key=counts.get)
+        if counts[max_color] > roi.size * 0.01:
+            return max_color
+        return 'unknown'
+    except Exception:
+        return 'unknown'
@@ -42,24 +42,30 @@ def check_speed_violation(speed_kmh, speed_limit=50):
     return (False, f"✅ OK - Tốc độ {speed_kmh:.1f} km/h")
 
 
-def check_lane_direction_match(vehicle_direction, lane_roi_index):
+def check_lane_direction_match(vehicle_direction, lane_roi_index, direction_rois=None):
     """Check if vehicle direction matches the lane direction.
     Returns (is_violation, reason_str)
     
     VD: Xe ở làn rẽ trái (primary_direction='left') nhưng đi thẳng = VI PHẠM
+    
+    direction_rois: Direction zones of the calling pipeline; defaults to the linked DIRECTION_ROIS
+                    (pass explicitly when several cameras run in one process)
     """
     global DIRECTION_ROIS
+    if direction_rois is None:
+        direction_rois = DIRECTION_ROIS
     
-    if lane_roi_index is None or lane_roi_index >= len(DIRECTION_ROIS):
+    if lane_roi_index is None or lane_roi_index >= len(direction_rois):
         return (False, "Not in any direction ROI")
     
     if vehicle_direction == 'unknown':
         return (False, "Unknown direction - cannot determine")
     
-    lane_roi = DIRECTION_ROIS[lane_roi_index]
+    lane_roi = direction_rois[lane_roi_index]
     primary_dir = lane_roi.get('primary_direction', 'unknown')
     secondary_dirs = lane_roi.get('secondary_directions', [])
-    allowed_dirs = [primary_dir] + secondary_dirs
+    # Zones drawn in the GUI / saved configs store the full list in 'allowed_directions'
+    allowed_dirs = [primary_dir] + secondary_dirs + lane_roi.get('allowed_directions', [])
     
     if vehicle_direction not in allowed_dirs:
         return (True, f"🚨 VI PHẠM - Xe đi {vehicle_direction} trong làn {primary_dir}")
@@ -67,10 +73,13 @@ def check_lane_direction_match(vehicle_direction, lane_roi_index):
     return (False, f"✅ OK - Đi đúng làn {primary_dir}")
 
 
-def check_tl_violation(track_id, vehicle_direction):
+def check_tl_violation(track_id, vehicle_direction, tl_rois=None):
     """Check if vehicle crossing stopline is a violation.
     Returns (is_violation, reason_str)
     
+    tl_rois: Optional snapshot of TL_ROIS taken at the crossing instant
+             (used when the verdict is resolved later); defaults to live TL_ROIS
+    
     HOÀN CHỈNH THEO LUẬT GIAO THÔNG VIỆT NAM (60 CASES)
     Tham khảo: docs/COMPLETE_VIOLATION_CASES.md
     
@@ -88,7 +97,10 @@ def check_tl_violation(track_id, vehicle_direction):
     """
     global TL_ROIS, VEHICLE_DIRECTIONS
     
-    if len(TL_ROIS) == 0:
+    if tl_rois is None:
+        tl_rois = TL_ROIS
+    
+    if len(tl_rois) == 0:
         return (False, "No traffic lights configured")
     
     # Store direction for this vehicle
@@ -104,7 +116,7 @@ def check_tl_violation(track_id, vehicle_direction):
         'rẽ phải': []
     }
     
-    for idx, (x1, y1, x2, y2, tl_type, current_color) in enumerate(TL_ROIS):
+    for idx, (x1, y1, x2, y2, tl_type, current_color) in enumerate(tl_rois):
         lights_by_type[tl_type].append({
             'index': idx,
             'type': tl_type,
@@ -1,6 +1,15 @@
 """
 Geometry package
 """
-from .utils import point_in_polygon, point_to_segment_distance, is_on_stop_line
+from .utils import (
+    point_in_polygon, point_to_segment_distance, is_on_stop_line,
+    compute_ground_homography, project_to_ground
+)
 
-__all__ = ['point_in_polygon', 'point_to_segment_distance', 'is_on_stop_line']
+__all__ = [
+    'point_in_polygon',
+    'point_to_segment_distance',
+    'is_on_stop_line',
+    'compute_ground_homography',
+    'project_to_ground',
+]
@@ -56,3 +56,46 @@ def is_on_stop_line(cx, cy, stop_line, threshold=15):
     p1, p2 = stop_line
     dist = point_to_segment_distance(cx, cy, p1[0], p1[1], p2[0], p2[1])
     return dist < threshold
+
+
+def compute_ground_homography(image_points, world_points):
+    """Compute image → ground-plane homography from point correspondences
+    
+    Args:
+        image_points: List of >= 4 pixel points [[x, y], ...] on the road surface
+        world_points: Matching ground coordinates in meters [[X, Y], ...]
+    
+    Returns:
+        np.ndarray: 3x3 homography matrix (float64)
+    
+    Raises:
+        ValueError: If the points are malformed or degenerate
+    """
+    src = np.asarray(image_points, dtype=np.float32).reshape(-1, 2)
+    dst = np.asarray(world_points, dtype=np.float32).reshape(-1, 2)
+    if len(src) < 4 or len(src) != len(dst):
+        raise ValueError("Ground calibration needs >= 4 matching image/world points")
+    
+    if len(src) == 4:
+        H = cv2.getPerspectiveTransform(src, dst)
+    else:
+        H, _ = cv2.findHomography(src, dst, 0)
+    
+    if H is None or not np.all(np.isfinite(H)) or abs(np.linalg.det(H)) < 1e-12:
+        raise ValueError("Degenerate ground calibration points (collinear?)")
+    return H.astype(np.float64)
+
+
+def project_to_ground(points, homography):
+    """Project pixel points to ground-plane coordinates (meters)
+    
+    Args:
+        points: Array-like of shape (N, 2) in pixels
+        homography: 3x3 matrix from compute_ground_homography
+    
+    Returns:
+        np.ndarray: (N, 2) ground coordinates
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    hom = pts @ homography[:, :2].T + homography[:, 2]
+    return hom[:, :2] / hom[:, 2:3]
@@ -0,0 +1,541 @@
+"""
+Camera Supervisor - Chạy nhiều pipeline (mỗi camera 1 process) trên cùng một server
+Đọc site manifest, pin CPU, tự khởi động lại worker bị crash, gom metrics của từng camera
+"""
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.inference_server import InferenceServer, InferenceClient
+from headless_runner import build_headless_thread, load_model
+
+
+STATUS_STARTING = 'starting'
+STATUS_RUNNING = 'running'
+STATUS_BACKOFF = 'backoff'      # Crash, đang chờ khởi động lại
+STATUS_FINISHED = 'finished'    # Video file đã xử lý xong
+STATUS_FAILED = 'failed'        # Crash quá max_restarts lần → bỏ
+STATUS_STOPPED = 'stopped'
+
+# Manifest keys (ngoài "cameras") được truyền vào CameraSupervisor
+_SUPERVISOR_OPTIONS = ('cpus_per_camera', 'max_restarts', 'restart_window', 'restart_backoff',
+                       'report_interval', 'stall_timeout', 'share_weights', 'metrics_path',
+                       'shared_inference', 'max_batch', 'max_wait_ms', 'decode_process',
+                       'watch_config', 'motion_gate')
+
+
+class CameraSpec:
+    """Một camera trong site manifest"""
+
+    __slots__ = ('camera_id', 'source', 'config', 'model', 'model_type', 'cpus')
+
+    def __init__(self, camera_id: str, source: str, config: Optional[str] = None,
+                 model: Optional[str] = None, model_type: str = "YOLOv8", cpus: Optional[List[int]] = None):
+        self.camera_id = camera_id
+        self.source = source
+        self.config = config
+        self.model = model
+        self.model_type = model_type
+        self.cpus = cpus
+
+    @property
+    def is_stream(self) -> bool:
+        """Stream (rtsp/http...) không bao giờ 'xong' - dừng là phải khởi động lại"""
+        return '://' in self.source
+
+
+def load_site_manifest(path: str) -> Tuple[List[CameraSpec], Dict]:
+    """
+    Đọc site manifest (JSON)
+
+    Format:
+        {
+          "cameras": [
+            {"id": "cam01", "source": "rtsp://... hoặc video.mp4", "config": "cam01_config.json",
+             "model": "batch16_size416_100epoch.pt", "model_type": "YOLOv8", "cpus": [0, 1]}
+          ],
+          "cpus_per_camera": 2, "max_restarts": 5, "report_interval": 10, "metrics_path": "site_metrics.json",
+          "shared_inference": false, "max_batch": 8, "max_wait_ms": 5, "decode_process": false,
+          "watch_config": false, "motion_gate": false
+        }
+        Đường dẫn tương đối tính theo thư mục chứa manifest; "config"/"model"/"cpus" là tùy chọn.
+
+    Returns:
+        (cameras, options) - options là các key còn lại, truyền thẳng vào CameraSupervisor
+    """
+    manifest_path = Path(path)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    base_dir = manifest_path.parent
+
+    def resolve(value):
+        if value is None or '://' in value or Path(value).is_absolute():
+            return value
+        return str(base_dir / value)
+
+    cameras = []
+    seen = set()
+    for entry in data.get('cameras', []):
+        camera_id = str(entry['id'])
+        if camera_id in seen:
+            raise ValueError(f"Duplicate camera id in manifest: {camera_id}")
+        seen.add(camera_id)
+        model = entry.get('model')
+        if model is not None and (os.sep in model or '/' in model):
+            model = resolve(model)  # Đường dẫn .pt; chỉ tên file thì tìm trong models/<type>/
+        cameras.append(CameraSpec(
+            camera_id, resolve(entry['source']), resolve(entry.get('config')),
+            model, entry.get('model_type', "YOLOv8"), entry.get('cpus')
+        ))
+    if not cameras:
+        raise ValueError(f"No cameras in manifest: {manifest_path}")
+
+    options = {key: value for key, value in data.items() if key != 'cameras'}
+    unknown = set(options) - set(_SUPERVISOR_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown manifest option(s): {', '.join(sorted(unknown))}")
+    if options.get('metrics_path'):
+        options['metrics_path'] = resolve(options['metrics_path'])
+    return cameras, options
+
+
+def _thread_metrics(thread) -> Dict:
+    """Metrics của pipeline trong worker (đọc từ thread khác - chỉ đọc số)"""
+    metrics = {
+        'fps': thread.fps,
+        'processed_fps': thread.processed_fps,
+        'frame_index': thread.frame_index,
+        'media_time': round(thread.media_time, 2),
+        'detection_enabled': thread.detection_enabled,
+        'evidence_clips': thread.evidence_recorder.clips_written,
+        'events': thread.event_log.stats(),
+    }
+    metrics.update(thread.violation_detector.get_statistics())
+    stream = thread.stream_health()
+    if stream is not None:
+        metrics['stream'] = stream
+    if thread.motion_gate is not None:
+        metrics['motion_gate'] = thread.motion_gate.stats()
+    return metrics
+
+
+def _camera_worker(spec: CameraSpec, cpus: List[int], yolo_model, metrics_queue, stop_event,
+                   report_interval: float, token: int, decode_process: bool = False, watch_config: bool = False,
+                   motion_gate: bool = False):
+    """Entry point của worker: chạy pipeline của 1 camera, gửi metrics định kỳ
+
+    cpus rỗng = không pin CPU (worker chạy như thread trong process supervisor)
+    """
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"⚠️ [{spec.camera_id}] CPU affinity {cpus} ignored: {e}")
+    if cpus:
+        try:
+            import torch
+            torch.set_num_threads(len(cpus))
+        except ImportError:
+            pass
+
+    thread = build_headless_thread(spec.source, spec.config, spec.model, spec.model_type,
+                                   name=spec.camera_id, yolo_model=yolo_model, decode_process=decode_process,
+                                   watch_config=watch_config, motion_gate=motion_gate)
+
+    error = []
+
+    def run_pipeline():
+        try:
+            thread.run()
+        except Exception as e:
+            error.append(e)
+
+    runner = threading.Thread(target=run_pipeline, name=f'Pipeline-{spec.camera_id}', daemon=True)
+    runner.start()
+
+    next_report = time.monotonic() + report_interval
+    while runner.is_alive():
+        runner.join(0.5)
+        if time.monotonic() >= next_report:
+            metrics_queue.put((spec.camera_id, token, _thread_metrics(thread)))
+            next_report = time.monotonic() + report_interval
+        if stop_event.is_set() or not thread.detection_enabled:
+            # A detection error disables detection - stop and exit non-zero so the supervisor restarts us
+            thread.stop()
+            runner.join()
+
+    metrics_queue.put((spec.camera_id, token, _thread_metrics(thread)))
+    if error:
+        print(f"❌ [{spec.camera_id}] Pipeline crashed: {error[0]}")
+        sys.exit(1)
+    if not thread.detection_enabled and not stop_event.is_set():
+        print(f"❌ [{spec.camera_id}] Detection stopped after an error")
+        sys.exit(1)
+
+
+class _PipelineThread(threading.Thread):
+    """Worker chạy như thread trong process supervisor (shared_inference) - cùng interface với Process"""
+
+    def __init__(self, camera_id: str, stop_event: threading.Event, args: tuple):
+        super().__init__(name=f'camera-{camera_id}', daemon=True)
+        self._args = args
+        self._stop_event = stop_event
+        self.exitcode: Optional[int] = None
+
+    @property
+    def pid(self) -> int:
+        return os.getpid()
+
+    def run(self):
+        try:
+            _camera_worker(*self._args)
+            self.exitcode = 0
+        except SystemExit as e:
+            self.exitcode = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            print(f"❌ {self.name}: {e}")
+            self.exitcode = 1
+
+    def terminate(self):
+        # Threads can't be killed - ask the pipeline to stop (a hung thread is abandoned)
+        self._stop_event.set()
+
+
+class _Worker:
+    """Trạng thái supervisor giữ cho mỗi camera"""
+
+    __slots__ = ('spec', 'cpus', 'process', 'stop_event', 'token', 'status', 'restarts', 'restart_times',
+                 'next_start', 'started_at', 'last_progress', 'metrics')
+
+    def __init__(self, spec: CameraSpec, cpus: List[int]):
+        self.spec = spec
+        self.cpus = cpus
+        self.process = None
+        self.stop_event = None
+        self.token = 0  # Tăng mỗi lần khởi động - bỏ metrics của worker cũ
+        self.status = STATUS_STARTING
+        self.restarts = 0
+        self.restart_times: List[float] = []
+        self.next_start = 0.0
+        self.started_at = 0.0
+        self.last_progress = 0.0  # Lần cuối frame_index tăng
+        self.metrics: Dict = {}
+
+
+class CameraSupervisor:
+    """
+    Supervisor chạy mỗi camera trong 1 process riêng
+
+    Nguyên lý:
+    - Mỗi camera: 1 process chạy VideoThread headless (không render), pin vào tập CPU riêng
+    - Weights: load 1 lần trong supervisor trước khi fork → các worker dùng chung trang nhớ
+      (copy-on-write, weights chỉ đọc nên RAM không tăng theo số camera).
+      Không có fork (Windows/macOS spawn) hoặc chạy CUDA → mỗi worker tự load weights
+    - Worker crash (exit code != 0) hoặc không xử lý thêm frame nào quá stall_timeout → khởi động lại với backoff;
+      crash quá max_restarts lần trong restart_window giây → đánh dấu failed
+    - Worker gửi metrics qua queue mỗi report_interval giây; supervisor in bảng tổng hợp
+      và ghi ra metrics_path (JSON) nếu có
+    - shared_inference: mọi camera chạy như thread trong 1 process, mỗi bộ weights 1 InferenceServer
+      gom frame của các camera thành batch (hợp với GPU); tracker vẫn riêng từng camera
+    """
+
+    def __init__(self, cameras: List[CameraSpec],
+                 cpus_per_camera: Optional[int] = None,
+                 max_restarts: int = 5,
+                 restart_window: float = 300.0,
+                 restart_backoff: float = 2.0,
+                 report_interval: float = 10.0,
+                 stall_timeout: float = 60.0,
+                 share_weights: bool = True,
+                 metrics_path: Optional[str] = None,
+                 shared_inference: bool = False,
+                 max_batch: int = 8,
+                 max_wait_ms: float = 5.0,
+                 decode_process: bool = False,
+                 watch_config: bool = False,
+                 motion_gate: bool = False):
+        """
+        Args:
+            cameras: Danh sách camera (load_site_manifest)
+            cpus_per_camera: Số CPU pin cho mỗi camera (None = chia đều các CPU hiện có)
+            max_restarts: Số lần khởi động lại tối đa trong restart_window
+            restart_window: Cửa sổ thời gian (giây) đếm số lần khởi động lại
+            restart_backoff: Thời gian chờ lần đầu (giây), nhân đôi sau mỗi lần crash liên tiếp (tối đa 60s)
+            report_interval: Chu kỳ gửi/in metrics (giây)
+            stall_timeout: Worker không xử lý thêm frame nào quá thời gian này (giây) → coi như treo, khởi động lại
+            share_weights: Load weights 1 lần trong supervisor và chia sẻ qua fork (copy-on-write)
+            metrics_path: File JSON ghi metrics tổng hợp (None = chỉ in ra console)
+            shared_inference: Chạy camera như thread dùng chung InferenceServer thay vì process riêng
+            max_batch: Số frame tối đa mỗi batch inference (shared_inference)
+            max_wait_ms: Thời gian tối đa (ms) chờ gom batch (shared_inference)
+            decode_process: Mỗi camera decode video trong process con riêng, frame qua shared memory
+            watch_config: Hot reload file config của từng camera (sửa ROI không cần khởi động lại worker)
+            motion_gate: Bỏ qua detector khi không có chuyển động trong ROI (camera vắng xe ban đêm)
+        """
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.restart_backoff = restart_backoff
+        self.report_interval = report_interval
+        self.stall_timeout = stall_timeout
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+
+        self.shared_inference = shared_inference
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.decode_process = decode_process
+        self.watch_config = watch_config
+        self.motion_gate = motion_gate
+        self._models: Dict[Tuple[str, Optional[str]], object] = {}
+        self._servers: Dict[Tuple[str, Optional[str]], InferenceServer] = {}
+
+        if shared_inference:
+            self.share_weights = False
+            self._ctx = None
+            self._metrics_queue = queue.Queue()
+        else:
+            self.share_weights = (share_weights and 'fork' in mp.get_all_start_methods()
+                                  and not self._cuda_available())
+            self._ctx = mp.get_context('fork' if self.share_weights else 'spawn')
+            self._metrics_queue = self._ctx.Queue()
+
+        cpu_sets = self._assign_cpus(cameras, cpus_per_camera)
+        self._workers: Dict[str, _Worker] = {
+            spec.camera_id: _Worker(spec, cpus) for spec, cpus in zip(cameras, cpu_sets)
+        }
+
+    @staticmethod
+    def _cuda_available() -> bool:
+        """CUDA không chịu được fork sau khi đã khởi tạo → không chia sẻ weights khi có GPU"""
+        try:
+            import torch
+            return torch.cuda.is_available()
+        except ImportError:
+            return False
+
+    @staticmethod
+    def _assign_cpus(cameras: List[CameraSpec], cpus_per_camera: Optional[int]) -> List[List[int]]:
+        """Chia CPU cho từng camera (round-robin; 'cpus' trong manifest được ưu tiên)"""
+        if hasattr(os, 'sched_getaffinity'):
+            available = sorted(os.sched_getaffinity(0))
+        else:
+            available = list(range(os.cpu_count() or 1))
+        per_camera = cpus_per_camera or max(1, len(available) // len(cameras))
+
+        cpu_sets = []
+        for i, spec in enumerate(cameras):
+            if spec.cpus:
+                cpu_sets.append(list(spec.cpus))
+            else:
+                cpu_sets.append([available[(i * per_camera + k) % len(available)] for k in range(per_camera)])
+        return cpu_sets
+
+    def _preload_models(self):
+        """Load mỗi bộ weights 1 lần (trước khi fork) và fuse sẵn để worker không ghi vào trang nhớ weights"""
+        for worker in self._workers.values():
+            key = (worker.spec.model_type, worker.spec.model)
+            if key in self._models:
+                continue
+            # load_model warms up: Conv+BN are fused (new tensors) here once, not in every worker
+            yolo_model, weight_path = load_model(*key)
+            self._models[key] = yolo_model
+            print(f"🧠 Shared weights loaded: {weight_path}")
+
+    def _start_servers(self):
+        """Mỗi bộ weights: 1 model + 1 InferenceServer dùng chung cho mọi camera của nó"""
+        for worker in self._workers.values():
+            key = (worker.spec.model_type, worker.spec.model)
+            if key in self._servers:
+                continue
+            yolo_model, weight_path = load_model(*key)
+            self._servers[key] = InferenceServer(yolo_model, self.max_batch, self.max_wait).start()
+            print(f"🧠 Inference server started: {weight_path} (batch≤{self.max_batch}, "
+                  f"wait≤{self.max_wait * 1000:.0f}ms)")
+
+    def start(self):
+        """Load weights dùng chung (nếu có) và khởi động mọi worker"""
+        if self.shared_inference:
+            self._start_servers()
+        elif self.share_weights:
+            self._preload_models()
+        else:
+            print("ℹ️ Supervisor: weights not shared (no fork or CUDA) - each worker loads its own")
+        for worker in self._workers.values():
+            self._spawn(worker)
+
+    def _spawn(self, worker: _Worker):
+        spec = worker.spec
+        key = (spec.model_type, spec.model)
+        worker.token += 1
+        if self.shared_inference:
+            # New client = fresh tracker state for the restarted pipeline
+            client = InferenceClient(self._servers[key], spec.camera_id)
+            worker.stop_event = threading.Event()
+            worker.process = _PipelineThread(spec.camera_id, worker.stop_event, (
+                spec, [], client, self._metrics_queue, worker.stop_event, self.report_interval, worker.token,
+                self.decode_process, self.watch_config, self.motion_gate))
+        else:
+            worker.stop_event = self._ctx.Event()
+            worker.process = self._ctx.Process(
+                target=_camera_worker,
+                args=(spec, worker.cpus, self._models.get(key), self._metrics_queue, worker.stop_event,
+                      self.report_interval, worker.token, self.decode_process, self.watch_config,
+                      self.motion_gate),
+                name=f'camera-{spec.camera_id}', daemon=False
+            )
+        worker.process.start()
+        worker.status = STATUS_STARTING
+        worker.started_at = worker.last_progress = time.monotonic()
+        cpus = 'shared process' if self.shared_inference else f"cpus={worker.cpus}"
+        print(f"▶️ [{spec.camera_id}] Worker started (pid={worker.process.pid}, {cpus})")
+
+    def run(self):
+        """Vòng giám sát (block) đến khi mọi camera xong/failed hoặc Ctrl+C"""
+        self.start()
+        next_report = time.monotonic() + self.report_interval
+        try:
+            while any(w.status not in (STATUS_FINISHED, STATUS_FAILED) for w in self._workers.values()):
+                self._drain_metrics(timeout=0.5)
+                self._check_workers()
+                if time.monotonic() >= next_report:
+                    self.report()
+                    next_report = time.monotonic() + self.report_interval
+        except KeyboardInterrupt:
+            print("⏹️ Supervisor: interrupted")
+        finally:
+            self.stop()
+            self.report()
+
+    def stop(self, timeout: float = 10.0):
+        """Yêu cầu mọi worker dừng (ghi nốt event log/evidence), kill nếu quá timeout"""
+        for worker in self._workers.values():
+            if worker.stop_event is not None:
+                worker.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers.values():
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.join(max(0.0, deadline - time.monotonic()))
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(timeout)
+            if worker.status not in (STATUS_FINISHED, STATUS_FAILED):
+                worker.status = STATUS_STOPPED
+        for server in self._servers.values():
+            server.stop()
+        self._drain_metrics(timeout=0)
+
+    def _drain_metrics(self, timeout: float):
+        try:
+            while True:
+                camera_id, token, metrics = self._metrics_queue.get(timeout=timeout)
+                timeout = 0
+                worker = self._workers.get(camera_id)
+                if worker is None or worker.token != token:
+                    continue  # Report from a worker that was already replaced
+                if metrics.get('frame_index') != worker.metrics.get('frame_index'):
+                    worker.last_progress = time.monotonic()
+                worker.metrics = metrics
+                if worker.status == STATUS_STARTING:
+                    worker.status = STATUS_RUNNING
+        except queue.Empty:
+            pass
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker in self._workers.values():
+            spec = worker.spec
+            if worker.status == STATUS_BACKOFF:
+                if now >= worker.next_start:
+                    self._spawn(worker)
+                continue
+            if worker.status in (STATUS_FINISHED, STATUS_FAILED, STATUS_STOPPED) or worker.process is None:
+                continue
+
+            process = worker.process
+            if process.is_alive():
+                if now - worker.last_progress > self.stall_timeout:
+                    print(f"⚠️ [{spec.camera_id}] No progress for {self.stall_timeout:.0f}s - restarting")
+                    process.terminate()
+                    process.join(10.0)
+                    if process.is_alive():
+                        print(f"⚠️ [{spec.camera_id}] Hung pipeline thread abandoned")
+                    self._schedule_restart(worker, now)
+                continue
+
+            process.join()
+            if process.exitcode == 0 and not spec.is_stream:
+                worker.status = STATUS_FINISHED
+                print(f"✅ [{spec.camera_id}] Finished")
+            else:
+                print(f"⚠️ [{spec.camera_id}] Worker exited (code={process.exitcode})")
+                self._schedule_restart(worker, now)
+
+    def _schedule_restart(self, worker: _Worker, now: float):
+        worker.restart_times = [t for t in worker.restart_times if now - t < self.restart_window]
+        if len(worker.restart_times) >= self.max_restarts:
+            worker.status = STATUS_FAILED
+            print(f"❌ [{worker.spec.camera_id}] Crashed {len(worker.restart_times)} times "
+                  f"in {self.restart_window:.0f}s - giving up")
+            return
+        worker.restart_times.append(now)
+        worker.restarts += 1
+        delay = min(60.0, self.restart_backoff * 2 ** (len(worker.restart_times) - 1))
+        worker.next_start = now + delay
+        worker.status = STATUS_BACKOFF
+        print(f"🔁 [{worker.spec.camera_id}] Restarting in {delay:.0f}s (restart #{worker.restarts})")
+
+    def metrics(self) -> Dict:
+        """Metrics tổng hợp: từng camera + tổng site"""
+        cameras = {}
+        totals = {'cameras': len(self._workers), 'running': 0, 'processed_fps': 0,
+                  'total_vehicles': 0, 'total_violations': 0, 'restarts': 0}
+        for camera_id, worker in self._workers.items():
+            cameras[camera_id] = dict(worker.metrics, status=worker.status, restarts=worker.restarts,
+                                      cpus=worker.cpus, pid=worker.process.pid if worker.process else None)
+            totals['running'] += worker.status == STATUS_RUNNING
+            totals['processed_fps'] += worker.metrics.get('processed_fps', 0)
+            totals['total_vehicles'] += worker.metrics.get('total_vehicles', 0)
+            totals['total_violations'] += worker.metrics.get('total_violations', 0)
+            totals['restarts'] += worker.restarts
+        inference = {f"{model_type}:{model or 'default'}": server.stats()
+                     for (model_type, model), server in self._servers.items()}
+        return {'time': time.time(), 'site': totals, 'cameras': cameras, 'inference': inference}
+
+    def report(self):
+        """In bảng metrics và ghi metrics_path (nếu có)"""
+        snapshot = self.metrics()
+        site = snapshot['site']
+        print(f"📊 Site: {site['running']}/{site['cameras']} running | "
+              f"Detection FPS: {site['processed_fps']} | Vehicles: {site['total_vehicles']} | "
+              f"Violations: {site['total_violations']} | Restarts: {site['restarts']}")
+        for camera_id, cam in snapshot['cameras'].items():
+            print(f"   [{camera_id}] {cam['status']:<9} FPS: {cam.get('processed_fps', 0):>3} | "
+                  f"frame {cam.get('frame_index', 0)} | vehicles {cam.get('total_vehicles', 0)} | "
+                  f"violations {cam.get('total_violations', 0)} | restarts {cam['restarts']}")
+        for name, inf in snapshot['inference'].items():
+            print(f"   🧠 {name}: avg batch {inf['avg_batch']:.1f} | {inf['frames']} frames | "
+                  f"latency {inf['avg_latency_ms']:.1f}ms (max {inf['max_latency_ms']:.1f}) | queue {inf['queue_depth']}")
+
+        if self.metrics_path is not None:
+            try:
+                self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.metrics_path.with_suffix('.tmp')
+                tmp_path.write_text(json.dumps(snapshot, indent=2), encoding='utf-8')
+                os.replace(tmp_path, self.metrics_path)
+            except OSError as e:
+                print(f"⚠️ Cannot write metrics: {e}")
+
+
+def run_site(manifest_path: str):
+    """Chạy toàn bộ camera trong site manifest (block đến khi xong hoặc Ctrl+C)"""
+    cameras, options = load_site_manifest(manifest_path)
+    print(f"🏙️ Site manifest: {len(cameras)} camera(s) from {manifest_path}")
+    supervisor = CameraSupervisor(cameras, **options)
+    supervisor.run()
+    return supervisor.metrics()
@@ -0,0 +1,235 @@
+"""
+Chunked Runner - Xử lý 1 video dài song song: chia thành các đoạn thời gian, mỗi đoạn 1 process headless
+Mỗi đoạn chạy thêm overlap ở 2 đầu (warm-up để track ổn định / tail để chốt verdict đang chờ),
+sau đó nối track qua ranh giới đoạn (IoU trên các frame chung) và loại sự kiện trùng
+"""
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+from core.event_log import EventLog, read_events, write_events
+
+
+class ChunkPlan:
+    """1 đoạn: sở hữu [start, end); thực tế chạy [run_start, run_end) (có overlap)"""
+
+    __slots__ = ('index', 'start', 'end', 'run_start', 'run_end', 'overlap')
+
+    def __init__(self, index: int, start: float, end: float, overlap: float, duration: float):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.overlap = overlap
+        self.run_start = max(0.0, start - overlap)
+        self.run_end = min(duration, end + overlap)
+
+    def observes(self, media_time: float) -> bool:
+        """Frame nằm trong vùng overlap với đoạn trước/sau (ghi lại box để nối track)"""
+        return media_time < self.start + self.overlap or media_time >= self.end - self.overlap
+
+    def __repr__(self):
+        return (f"ChunkPlan({self.index}: {self.start:.0f}-{self.end:.0f}s, "
+                f"runs {self.run_start:.0f}-{self.run_end:.0f}s)")
+
+
+def probe_duration(video_path: str) -> Tuple[float, float]:
+    """(duration giây, fps) của file video"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Cannot open video: {video_path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    finally:
+        cap.release()
+    if frames <= 0:
+        raise ValueError(f"Unknown frame count (not a seekable file?): {video_path}")
+    return frames / fps, fps
+
+
+def plan_chunks(duration: float, workers: int, overlap: float = 10.0,
+                min_chunk: float = 60.0) -> List[ChunkPlan]:
+    """
+    Chia [0, duration) thành các đoạn đều nhau
+
+    Args:
+        workers: Số đoạn mong muốn (thường = số worker)
+        overlap: Thời gian chạy thêm ở mỗi đầu (giây)
+        min_chunk: Đoạn ngắn nhất (giây) - overlap chỉ đáng khi đoạn dài hơn nhiều
+    """
+    count = max(1, min(workers, int(duration // max(min_chunk, overlap * 2)) or 1))
+    length = duration / count
+    return [ChunkPlan(i, i * length, duration if i == count - 1 else (i + 1) * length, overlap, duration)
+            for i in range(count)]
+
+
+def _remove_db(db_path):
+    """Xóa file SQLite cùng file -wal/-shm đi kèm"""
+    for suffix in ('', '-wal', '-shm'):
+        Path(str(db_path) + suffix).unlink(missing_ok=True)
+
+
+def _run_chunk(video_path: str, plan: ChunkPlan, config_path: Optional[str], model: Optional[str],
+               model_type: str, threads: int, checkpoint: bool) -> Dict:
+    """Worker: chạy headless trên 1 đoạn, trả về file log + box của các frame overlap"""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from headless_runner import build_headless_thread
+
+    name = f"{Path(video_path).stem}_chunk{plan.index:02d}"
+    thread = build_headless_thread(video_path, config_path, model, model_type, name=name,
+                                   start_time=plan.run_start, end_time=plan.run_end, checkpoint=checkpoint)
+    # frame_index → [(track_id, x1, y1, x2, y2)]; kept in checkpoint_extras so a resumed chunk
+    # still has the head-overlap boxes recorded before the interruption
+    thread.checkpoint_extras['track_observations'] = {}
+
+    def observe(frame_index, vehicles):
+        if plan.observes(thread.media_time):
+            thread.checkpoint_extras['track_observations'][frame_index] = [
+                (veh["track_id"],) + veh["box"] for veh in vehicles if veh["track_id"] != -1]
+
+    thread.track_observer = observe
+    if thread.checkpoint is None or not thread.checkpoint.path.exists():
+        # Fresh run: rows left by an earlier run (kept logs, crash) would be merged twice
+        _remove_db(thread.event_log.db_path)
+    thread.run()
+    return {
+        'index': plan.index,
+        'events_path': str(thread.event_log.db_path),
+        'source': name,
+        'observations': thread.checkpoint_extras['track_observations'],
+        'stats': thread.violation_detector.get_statistics(),
+    }
+
+
+def _iou(a, b) -> float:
+    ix1, iy1, ix2, iy2 = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def stitch_tracks(before: Dict[int, List], after: Dict[int, List], min_iou: float = 0.5,
+                  min_frames: int = 5) -> Dict[int, int]:
+    """
+    Nối track qua ranh giới: track id của đoạn sau → track id của đoạn trước
+
+    Trên mỗi frame chung, ghép box theo IoU (tham lam, IoU lớn trước); một cặp id được nối
+    khi ghép với nhau ở >= min_frames frame và là lựa chọn tốt nhất của cả hai phía
+    """
+    votes: Dict[Tuple[int, int], int] = {}
+    for frame_index in before.keys() & after.keys():
+        pairs = sorted(((_iou(a[1:], b[1:]), a[0], b[0])
+                        for a in before[frame_index] for b in after[frame_index]), reverse=True)
+        used_before, used_after = set(), set()
+        for iou, id_before, id_after in pairs:
+            if iou < min_iou:
+                break
+            if id_before in used_before or id_after in used_after:
+                continue
+            used_before.add(id_before)
+            used_after.add(id_after)
+            votes[(id_before, id_after)] = votes.get((id_before, id_after), 0) + 1
+
+    best_for_after: Dict[int, Tuple[int, int]] = {}
+    best_for_before: Dict[int, Tuple[int, int]] = {}
+    for (id_before, id_after), count in votes.items():
+        if count > best_for_after.get(id_after, (0, None))[0]:
+            best_for_after[id_after] = (count, id_before)
+        if count > best_for_before.get(id_before, (0, None))[0]:
+            best_for_before[id_before] = (count, id_after)
+    return {id_after: id_before for id_after, (count, id_before) in best_for_after.items()
+            if count >= min_frames and best_for_before[id_before][1] == id_after}
+
+
+def merge_chunk_events(plans: List[ChunkPlan], results: List[Dict], source: str) -> List[Dict]:
+    """
+    Gộp sự kiện các đoạn: track id toàn cục (đã nối), bỏ sự kiện trùng
+
+    - Sự kiện trong warm-up của đoạn (trước start) bị bỏ: đoạn trước sở hữu khoảng đó
+    - Sự kiện trong tail (từ end) chỉ giữ nếu track được nối sang đoạn sau (nếu không, đoạn sau tự ghi)
+    - Trùng (kind, reason_code, track toàn cục) → giữ sự kiện sớm nhất
+    """
+    results = sorted(results, key=lambda r: r['index'])
+    # links[k]: track id in chunk k → track id in chunk k-1
+    links = [{}] + [stitch_tracks(results[k - 1]['observations'], results[k]['observations'])
+                    for k in range(1, len(results))]
+    assigned: Dict[Tuple[int, int], int] = {}
+
+    def global_id(k: int, local_id: int) -> int:
+        while k > 0 and local_id in links[k]:  # Follow the track back to the chunk where it started
+            local_id = links[k][local_id]
+            k -= 1
+        return assigned.setdefault((k, local_id), len(assigned) + 1)
+
+    merged: Dict[Tuple, Dict] = {}
+    for k, (plan, result) in enumerate(zip(plans, results)):
+        continues = set(links[k + 1].values()) if k + 1 < len(links) else set()
+        for event in read_events(result['events_path'], result['source']):
+            if event['media_time'] < plan.start:
+                continue
+            if event['media_time'] >= plan.end and event['track_id'] not in continues:
+                continue
+            event = dict(event, track_id=global_id(k, event['track_id']), source=source)
+            key = (event['kind'], event['reason_code'], event['track_id'])
+            if key not in merged or event['media_time'] < merged[key]['media_time']:
+                merged[key] = event
+    return sorted(merged.values(), key=lambda e: (e['media_time'], e['frame_index']))
+
+
+def run_chunked(video_path: str, workers: Optional[int] = None, overlap: float = 10.0,
+                config_path: Optional[str] = None, model: Optional[str] = None, model_type: str = "YOLOv8",
+                checkpoint: bool = False, keep_chunk_logs: bool = False) -> Dict:
+    """
+    Xử lý 1 video dài bằng nhiều process song song
+
+    Args:
+        video_path: File video (phải seek được)
+        workers: Số process (None = số CPU / 2, mỗi process dùng 2 thread torch)
+        overlap: Thời gian chạy thêm ở mỗi đầu đoạn (giây) - dài hơn thời gian chốt verdict
+        config_path: File config JSON (None = config đã lưu của video)
+        checkpoint: Mỗi đoạn lưu checkpoint riêng (chạy lại sau crash chỉ làm tiếp đoạn dở)
+        keep_chunk_logs: Giữ file log của từng đoạn sau khi gộp
+
+    Returns:
+        Dict: số sự kiện đã gộp, file log kết quả, thống kê từng đoạn
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    workers = workers or max(1, cpus // 2)
+    duration, _ = probe_duration(video_path)
+    plans = plan_chunks(duration, workers, overlap)
+    threads = max(1, cpus // len(plans))
+    print(f"🧩 {video_path}: {duration:.0f}s in {len(plans)} chunks ({threads} threads each, {overlap:g}s overlap)")
+    for plan in plans:
+        print(f"   {plan}")
+
+    # spawn: each worker imports torch/ultralytics itself (no forked inference state)
+    with ProcessPoolExecutor(max_workers=len(plans), mp_context=mp.get_context('spawn')) as pool:
+        futures = [pool.submit(_run_chunk, video_path, plan, config_path, model, model_type, threads, checkpoint)
+                   for plan in plans]
+        results = [future.result() for future in futures]
+
+    events = merge_chunk_events(plans, results, source=video_path)
+    output = EventLog.default_path(video_path)
+    write_events(output, events, replace_source=video_path)
+    chunk_events = sum(len(read_events(r['events_path'], r['source'])) for r in results)
+    print(f"✅ Merged {len(events)} events ({chunk_events} before stitching/dedup) into {output}")
+
+    if not keep_chunk_logs:
+        for result in results:
+            _remove_db(result['events_path'])
+    return {
+        'events': len(events),
+        'events_path': str(output),
+        'chunks': [{'start': plan.start, 'end': plan.end, **result['stats']}
+                   for plan, result in zip(plans, sorted(results, key=lambda r: r['index']))],
+    }
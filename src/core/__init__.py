@@ -5,6 +5,17 @@ from .vehicle_tracker import VehicleTracker
 from .violation_detector import ViolationDetector
 from .stopline_manager import StopLineManager
 from .traffic_light_manager import TrafficLightManager
+from .speed_estimator import SpeedEstimator
+from .track_registry import TrackRegistry, TrackRecord
+from .pending_verdicts import PendingVerdict, PendingVerdictQueue
+from .event_log import EventLog
+from .evidence_recorder import EvidenceRecorder
+from .frame_exchange import FrameExchange, FrameSlot
+from .render_worker import RenderWorker
+from .inference_server import InferenceServer, InferenceClient, CameraTracker
+from .camera_config import CameraConfig, ConfigError
+from .checkpoint import JobCheckpoint
+from .motion_gate import MotionGate
 from .video_thread import VideoThread
 
 __all__ = [
@@ -12,5 +23,22 @@ __all__ = [
     'ViolationDetector', 
     'StopLineManager',
     'TrafficLightManager',
+    'SpeedEstimator',
+    'TrackRegistry',
+    'TrackRecord',
+    'PendingVerdict',
+    'PendingVerdictQueue',
+    'EventLog',
+    'EvidenceRecorder',
+    'FrameExchange',
+    'FrameSlot',
+    'RenderWorker',
+    'InferenceServer',
+    'InferenceClient',
+    'CameraTracker',
+    'CameraConfig',
+    'ConfigError',
+    'JobCheckpoint',
+    'MotionGate',
     'VideoThread'
 ]
@@ -0,0 +1,389 @@
+"""
+Camera Config - Cấu hình ROI của 1 camera, biên dịch 1 lần thành object bất biến (frozen)
+Mang sẵn các dữ liệu dẫn xuất mà hot path cần: polygon numpy, label map zone, pháp tuyến stopline,
+vector tham chiếu đơn vị, slice ROI đèn, homography → pipeline không tính lại mỗi frame
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.geometry import compute_ground_homography
+
+
+class ConfigError(ValueError):
+    """Config không hợp lệ (sai schema hoặc hình học suy biến)"""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+# Schema của file config JSON (ConfigManager.save_config)
+# Giá trị: kiểu | 'point' | 'polygon' | [schema phần tử] | {key: (schema, bắt buộc)}; None luôn hợp lệ cho key tùy chọn
+_POINT_PAIR = {'p1': ('point', True), 'p2': ('point', True)}
+CONFIG_SCHEMA = {
+    'lanes': ([{
+        'points': ('polygon', True),
+        'label': (str, False),
+        'allowed_types': ([str], False),
+    }], False),
+    'stopline': (_POINT_PAIR, False),
+    'traffic_lights': ([{
+        'x1': (int, True), 'y1': (int, True), 'x2': (int, True), 'y2': (int, True),
+        'type': (str, True),
+        'color': (str, False),
+    }], False),
+    'direction_zones': ([{
+        'name': (str, False),
+        'points': ('polygon', True),
+        'allowed_directions': ([str], False),
+        'primary_direction': (str, False),
+        'direction': (str, False),
+    }], False),
+    'reference_vector': (_POINT_PAIR, False),
+    'ground_calibration': ({
+        'image_points': (['point'], True),
+        'world_points': (['point'], True),
+        'speed_limit_kmh': (float, False),
+    }, False),
+}
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check(value, schema, path: str, problems: List[str]):
+    if schema == 'point':
+        if not (isinstance(value, (list, tuple)) and len(value) == 2 and all(_is_number(v) for v in value)):
+            problems.append(f"{path}: expected [x, y]")
+    elif schema == 'polygon':
+        if not isinstance(value, (list, tuple)) or len(value) < 3:
+            problems.append(f"{path}: expected a polygon of >= 3 points")
+        else:
+            for i, point in enumerate(value):
+                _check(point, 'point', f"{path}[{i}]", problems)
+    elif isinstance(schema, list):
+        if not isinstance(value, (list, tuple)):
+            problems.append(f"{path}: expected a list")
+        else:
+            for i, item in enumerate(value):
+                _check(item, schema[0], f"{path}[{i}]", problems)
+    elif isinstance(schema, dict):
+        if not isinstance(value, dict):
+            problems.append(f"{path}: expected an object")
+            return
+        for key, (item_schema, required) in schema.items():
+            if value.get(key) is None:
+                if required:
+                    problems.append(f"{path}.{key}: missing")
+                continue
+            _check(value[key], item_schema, f"{path}.{key}", problems)
+    elif schema is float:
+        if not _is_number(value):
+            problems.append(f"{path}: expected a number")
+    elif schema is int:
+        if not (_is_number(value) and float(value).is_integer()):
+            problems.append(f"{path}: expected an integer")
+    elif not isinstance(value, schema):
+        problems.append(f"{path}: expected {schema.__name__}")
+
+
+def validate_config_data(data: Dict[str, Any]) -> List[str]:
+    """Kiểm tra dict đọc từ file config JSON theo CONFIG_SCHEMA; trả về danh sách lỗi (rỗng = hợp lệ)"""
+    problems: List[str] = []
+    _check(data, CONFIG_SCHEMA, 'config', problems)
+    return problems
+
+
+def _frozen_array(points, dtype) -> np.ndarray:
+    array = np.asarray(points, dtype=dtype).reshape(-1, 2)
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class LaneZone:
+    """Làn đường giới hạn loại xe"""
+    label: str
+    points: Tuple[Tuple[int, int], ...]
+    polygon: np.ndarray = field(repr=False, compare=False)  # int32 (N, 2)
+    allowed_labels: Tuple[str, ...]  # ('all',) = mọi loại xe
+
+    def contains(self, cx: float, cy: float) -> bool:
+        return cv2.pointPolygonTest(self.polygon, (float(cx), float(cy)), False) >= 0
+
+    def allows(self, vehicle_label: str) -> bool:
+        return 'all' in self.allowed_labels or vehicle_label in self.allowed_labels
+
+
+@dataclass(frozen=True)
+class StopLine:
+    """Stopline với hướng/pháp tuyến đơn vị và độ dài tính sẵn"""
+    p1: Tuple[float, float]
+    p2: Tuple[float, float]
+    direction: Tuple[float, float]  # Vector đơn vị p1 → p2
+    normal: Tuple[float, float]  # Pháp tuyến đơn vị (xoay direction +90°)
+    length: float
+
+    def distance(self, px: float, py: float) -> float:
+        """Khoảng cách từ điểm đến đoạn stopline (pixel)"""
+        x1, y1 = self.p1
+        if self.length == 0:
+            return math.hypot(px - x1, py - y1)
+        dx, dy = self.direction
+        t = min(max((px - x1) * dx + (py - y1) * dy, 0.0), self.length)
+        return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+    def signed_offset(self, px: float, py: float) -> float:
+        """Khoảng cách có dấu theo pháp tuyến (> 0 = phía normal)"""
+        return (px - self.p1[0]) * self.normal[0] + (py - self.p1[1]) * self.normal[1]
+
+
+@dataclass(frozen=True)
+class TrafficLightROI:
+    """ROI đèn tín hiệu (hình chữ nhật); rows/cols là slice cắt thẳng từ frame"""
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+    tl_type: str
+    rows: slice = field(repr=False, compare=False)
+    cols: slice = field(repr=False, compare=False)
+
+    @property
+    def geometry(self) -> Tuple[int, int, int, int, str]:
+        return (self.x1, self.y1, self.x2, self.y2, self.tl_type)
+
+
+@dataclass(frozen=True)
+class DirectionZone:
+    """Zone hướng đi của làn"""
+    name: str
+    points: Tuple[Tuple[int, int], ...]
+    polygon: np.ndarray = field(repr=False, compare=False)
+    primary_direction: str
+    allowed_directions: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class CameraConfig:
+    """
+    Cấu hình ROI đã biên dịch của 1 camera (bất biến - đổi config = biên dịch object mới)
+
+    Dựng bằng CameraConfig.compile(...) hoặc CameraConfig.from_loaded(ConfigManager.load_config(...))
+    """
+    lanes: Tuple[LaneZone, ...] = ()
+    stopline: Optional[StopLine] = None
+    traffic_lights: Tuple[TrafficLightROI, ...] = ()
+    direction_zones: Tuple[DirectionZone, ...] = ()
+    # Dạng dict cho check_lane_direction_match (cùng thứ tự với direction_zones)
+    direction_rules: Tuple[Dict[str, Any], ...] = field(default=(), repr=False, compare=False)
+    reference_vector: Optional[Tuple[Tuple[float, float], Tuple[float, float]]] = None
+    reference_unit: Optional[Tuple[float, float]] = None
+    reference_angle: Optional[float] = None  # Độ, -180..180
+    homography: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    ground_calibration: Optional[Tuple] = None  # (image_points, world_points) - để so sánh config
+    speed_limit_kmh: float = 50.0
+    # Label map zone theo kích thước frame (dựng lần đầu cần, 1 lần cho mỗi kích thước)
+    _label_maps: Dict[Tuple[int, int], Optional[np.ndarray]] = field(
+        default_factory=dict, init=False, repr=False, compare=False)
+    # Mask vùng theo dõi chuyển động theo (kích thước frame, margin stopline, chỉ stopline)
+    _activity_masks: Dict[Tuple, Optional[np.ndarray]] = field(
+        default_factory=dict, init=False, repr=False, compare=False)
+
+    @classmethod
+    def compile(cls, lanes: Sequence[Dict] = (), stopline=None, traffic_lights: Sequence = (),
+                direction_zones: Sequence[Dict] = (), reference_vector=None,
+                ground_calibration: Optional[Dict] = None) -> 'CameraConfig':
+        """
+        Biên dịch config thô (dạng ConfigManager.load_config / biến global của GUI)
+
+        Raises:
+            ConfigError: Hình học suy biến (polygon < 3 điểm, ROI đèn rỗng, stopline 1 điểm...)
+        """
+        problems: List[str] = []
+
+        compiled_lanes = []
+        for i, lane in enumerate(lanes):
+            points = lane.get('points') or lane.get('poly') or []
+            if len(points) < 3:
+                problems.append(f"lanes[{i}]: polygon needs >= 3 points")
+                continue
+            # GUI lanes store 'allowed_labels' (['all'] = any); saved configs store 'allowed_types' ([] = any)
+            allowed = lane.get('allowed_labels') or lane.get('allowed_types') or ['all']
+            compiled_lanes.append(LaneZone(
+                label=lane.get('label', f"Lane {i + 1}"),
+                points=tuple((int(x), int(y)) for x, y in points),
+                polygon=_frozen_array(points, np.int32),
+                allowed_labels=tuple(allowed),
+            ))
+
+        compiled_stopline = None
+        if stopline is not None:
+            (x1, y1), (x2, y2) = stopline
+            length = math.hypot(x2 - x1, y2 - y1)
+            if length == 0:
+                problems.append("stopline: both points are the same")
+            else:
+                ux, uy = (x2 - x1) / length, (y2 - y1) / length
+                compiled_stopline = StopLine((float(x1), float(y1)), (float(x2), float(y2)),
+                                             (ux, uy), (-uy, ux), length)
+
+        compiled_lights = []
+        for i, tl in enumerate(traffic_lights):
+            x1, y1, x2, y2, tl_type = (int(tl[0]), int(tl[1]), int(tl[2]), int(tl[3]), tl[4])
+            if x2 <= x1 or y2 <= y1 or min(x1, y1) < 0:
+                problems.append(f"traffic_lights[{i}]: empty ROI")
+                continue
+            compiled_lights.append(TrafficLightROI(x1, y1, x2, y2, tl_type, slice(y1, y2), slice(x1, x2)))
+
+        compiled_zones = []
+        for i, zone in enumerate(direction_zones):
+            points = zone.get('points') or []
+            if len(points) < 3:
+                problems.append(f"direction_zones[{i}]: polygon needs >= 3 points")
+                continue
+            primary = zone.get('primary_direction', zone.get('direction', 'unknown'))
+            compiled_zones.append(DirectionZone(
+                name=zone.get('name', f"zone_{i + 1}"),
+                points=tuple((int(x), int(y)) for x, y in points),
+                polygon=_frozen_array(points, np.int32),
+                primary_direction=primary,
+                allowed_directions=tuple(zone.get('allowed_directions') or [primary]),
+            ))
+
+        reference_unit = reference_angle = None
+        if reference_vector is not None:
+            (x1, y1), (x2, y2) = reference_vector
+            length = math.hypot(x2 - x1, y2 - y1)
+            if length == 0:
+                problems.append("reference_vector: both points are the same")
+                reference_vector = None
+            else:
+                reference_vector = ((float(x1), float(y1)), (float(x2), float(y2)))
+                reference_unit = ((x2 - x1) / length, (y2 - y1) / length)
+                reference_angle = math.degrees(math.atan2(y2 - y1, x2 - x1))
+
+        if problems:
+            raise ConfigError(problems)
+
+        homography = calibration_key = None
+        speed_limit = 50.0
+        if ground_calibration:
+            speed_limit = float(ground_calibration.get('speed_limit_kmh', 50))
+            calibration_key = (tuple(map(tuple, ground_calibration['image_points'])),
+                               tuple(map(tuple, ground_calibration['world_points'])))
+            try:
+                homography = compute_ground_homography(ground_calibration['image_points'],
+                                                       ground_calibration['world_points'])
+                homography.flags.writeable = False
+            except ValueError as e:
+                print(f"⚠️ Ground calibration ignored: {e}")
+
+        return cls(
+            lanes=tuple(compiled_lanes),
+            stopline=compiled_stopline,
+            traffic_lights=tuple(compiled_lights),
+            direction_zones=tuple(compiled_zones),
+            direction_rules=tuple({
+                'name': zone.name,
+                'points': [list(p) for p in zone.points],
+                'primary_direction': zone.primary_direction,
+                'allowed_directions': list(zone.allowed_directions),
+            } for zone in compiled_zones),
+            reference_vector=reference_vector,
+            reference_unit=reference_unit,
+            reference_angle=reference_angle,
+            homography=homography,
+            ground_calibration=calibration_key,
+            speed_limit_kmh=speed_limit,
+        )
+
+    @classmethod
+    def from_loaded(cls, config: Optional[Dict]) -> 'CameraConfig':
+        """Biên dịch kết quả của ConfigManager.load_config (None = config rỗng)"""
+        if not config:
+            return cls()
+        return cls.compile(config['lanes'], config['stopline'], config['traffic_lights'],
+                           config['direction_zones'], config['reference_vector'],
+                           config.get('ground_calibration'))
+
+    def reuse_derived(self, previous: 'CameraConfig'):
+        """Giữ lại label map của config cũ nếu direction zones không đổi (hot reload chỉ đổi stopline/TL...)"""
+        if previous is not self and previous.direction_zones == self.direction_zones:
+            for key, label_map in previous._label_maps.items():
+                self._label_maps.setdefault(key, label_map)
+        if previous is not self and (previous.lanes, previous.direction_zones, previous.stopline) == (
+                self.lanes, self.direction_zones, self.stopline):
+            for key, mask in previous._activity_masks.items():
+                self._activity_masks.setdefault(key, mask)
+
+    @property
+    def tl_geometry(self) -> Tuple[Tuple[int, int, int, int, str], ...]:
+        return tuple(tl.geometry for tl in self.traffic_lights)
+
+    def is_on_stop_line(self, cx: float, cy: float, threshold: float = 15) -> bool:
+        return self.stopline is not None and self.stopline.distance(cx, cy) < threshold
+
+    def lane_at(self, cx: float, cy: float) -> Optional[LaneZone]:
+        """Làn đầu tiên chứa điểm (giống thứ tự duyệt LANE_CONFIGS)"""
+        for lane in self.lanes:
+            if lane.contains(cx, cy):
+                return lane
+        return None
+
+    def zone_label_map(self, shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+        """Label map: pixel = index zone + 1 (0 = ngoài mọi zone); zone đứng trước ưu tiên khi chồng lấn"""
+        key = tuple(shape[:2])
+        if key not in self._label_maps:
+            label_map = None
+            if self.direction_zones and len(self.direction_zones) <= 254:
+                label_map = np.zeros(key, dtype=np.uint8)
+                for i in range(len(self.direction_zones) - 1, -1, -1):
+                    cv2.fillPoly(label_map, [self.direction_zones[i].polygon], i + 1)
+                label_map.flags.writeable = False
+            self._label_maps[key] = label_map
+        return self._label_maps[key]
+
+    def zone_index_at(self, cx: int, cy: int, shape: Tuple[int, ...]) -> Optional[int]:
+        """Index zone chứa điểm (tra label map O(1)), None nếu ngoài mọi zone"""
+        label_map = self.zone_label_map(shape)
+        if label_map is None:
+            return None
+        h, w = label_map.shape
+        if not (0 <= cx < w and 0 <= cy < h):
+            return None
+        label = int(label_map[cy, cx])
+        return label - 1 if label > 0 else None
+
+    def activity_mask(self, shape: Tuple[int, ...], stopline_margin: int = 40,
+                      stopline_only: bool = False) -> Optional[np.ndarray]:
+        """
+        Mask vùng có thể phát sinh vi phạm (255 = trong vùng): làn + zone hướng + dải rộng
+        stopline_margin pixel quanh stopline. None nếu config không có vùng nào (= cả frame)
+
+        Args:
+            stopline_only: Chỉ dải quanh stopline (xe đang vượt vạch)
+        """
+        key = (tuple(shape[:2]), stopline_margin, stopline_only)
+        if key not in self._activity_masks:
+            mask = np.zeros(key[0], dtype=np.uint8)
+            if not stopline_only:
+                # One fillPoly per polygon: a single call fills with the even-odd rule, so where a lane
+                # and a zone overlap the mask would get a hole instead of the union
+                for polygon in [lane.polygon for lane in self.lanes] + [zone.polygon for zone in self.direction_zones]:
+                    cv2.fillPoly(mask, [polygon], 255)
+            if self.stopline is not None:
+                p1 = tuple(int(round(v)) for v in self.stopline.p1)
+                p2 = tuple(int(round(v)) for v in self.stopline.p2)
+                cv2.line(mask, p1, p2, 255, max(1, 2 * stopline_margin))
+            if cv2.countNonZero(mask) == 0:
+                mask = None
+            else:
+                mask.flags.writeable = False
+            self._activity_masks[key] = mask
+        return self._activity_masks[key]
@@ -0,0 +1,85 @@
+"""
+Job Checkpoint - Lưu tiến độ job offline định kỳ để chạy tiếp sau khi crash / bị dừng giữa chừng
+Nội dung: frame index, state tracker, state rule đang chờ, offset event log (xem VideoThread._checkpoint_state)
+"""
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CHECKPOINT_VERSION = 1
+
+
+class JobCheckpoint:
+    """
+    File checkpoint của 1 job (1 video + 1 khoảng thời gian)
+
+    - due(media_time): đến lúc lưu chưa (mỗi interval giây video)
+    - save(state): ghi file tạm rồi rename → crash lúc đang ghi vẫn còn checkpoint cũ nguyên vẹn
+    - load(): state đã lưu, None nếu chưa có / hỏng / khác phiên bản
+    - remove(): job xong → xóa, lần chạy sau bắt đầu lại từ đầu
+    """
+
+    def __init__(self, path, interval: float = 60.0):
+        """
+        Args:
+            path: File checkpoint
+            interval: Chu kỳ lưu tính theo thời gian video (giây)
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self._last_saved: Optional[float] = None
+        self.saves = 0
+
+    @staticmethod
+    def default_path(video_path: str, start_time: Optional[float] = None,
+                     end_time: Optional[float] = None) -> Path:
+        """<project root>/checkpoints/<tên video>[_<start>-<end>].ckpt (mỗi khoảng thời gian 1 file)"""
+        checkpoint_dir = Path(__file__).parent.parent.parent / "checkpoints"
+        name = Path(video_path).stem
+        if start_time is not None or end_time is not None:
+            name += f"_{start_time or 0:g}-{'' if end_time is None else f'{end_time:g}'}"
+        return checkpoint_dir / f"{name}.ckpt"
+
+    def due(self, media_time: float) -> bool:
+        if self._last_saved is None:
+            self._last_saved = media_time  # Interval counts from where this run started
+            return False
+        return media_time - self._last_saved >= self.interval
+
+    def save(self, state: Dict[str, Any]) -> bool:
+        state = dict(state, version=CHECKPOINT_VERSION)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except (OSError, pickle.PicklingError, TypeError) as e:
+            print(f"⚠️ Checkpoint not saved ({self.path}): {e}")
+            return False
+        self._last_saved = state.get('media_time', self._last_saved)
+        self.saves += 1
+        return True
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:  # Truncated/corrupt file - start over rather than crash
+            print(f"⚠️ Checkpoint unreadable ({self.path}): {e} - starting from the beginning")
+            return None
+        if state.get('version') != CHECKPOINT_VERSION:
+            print(f"⚠️ Checkpoint version {state.get('version')} not supported - starting from the beginning")
+            return None
+        return state
+
+    def remove(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,284 @@
+"""
+Event Log - Ghi sự kiện qua vạch / vi phạm vào SQLite (append-only) từ background thread
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# Reason code cho từng loại sự kiện
+REASON_CROSSING = 'crossing'
+REASON_RED_LIGHT = 'red_light'
+REASON_LANE = 'lane'
+REASON_SPEED = 'speed'
+REASON_LANE_DIRECTION = 'lane_direction'
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    wall_time REAL NOT NULL,
+    source TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    reason_code TEXT NOT NULL,
+    track_id INTEGER NOT NULL,
+    cls_id INTEGER,
+    label TEXT,
+    direction TEXT,
+    frame_index INTEGER NOT NULL,
+    media_time REAL NOT NULL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+    tl_snapshot TEXT,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_source_time ON events (source, media_time);
+CREATE INDEX IF NOT EXISTS idx_events_reason ON events (reason_code);
+"""
+
+_INSERT = """
+INSERT INTO events (wall_time, source, kind, reason_code, track_id, cls_id, label, direction,
+                    frame_index, media_time, x1, y1, x2, y2, tl_snapshot, reason)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# Cột của 1 sự kiện (cùng thứ tự với _INSERT)
+EVENT_COLUMNS = ('wall_time', 'source', 'kind', 'reason_code', 'track_id', 'cls_id', 'label', 'direction',
+                 'frame_index', 'media_time', 'x1', 'y1', 'x2', 'y2', 'tl_snapshot', 'reason')
+
+
+def read_events(db_path, source: Optional[str] = None) -> List[Dict]:
+    """Đọc sự kiện (theo thứ tự ghi) từ 1 file log, lọc theo nguồn nếu có"""
+    if not Path(db_path).exists():
+        return []
+    conn = sqlite3.connect(str(db_path))
+    try:
+        query = f"SELECT {', '.join(EVENT_COLUMNS)} FROM events"
+        args = ()
+        if source is not None:
+            query += " WHERE source = ?"
+            args = (source,)
+        rows = conn.execute(query + " ORDER BY id", args).fetchall()
+    except sqlite3.Error:
+        return []  # Table not created yet (nothing was logged)
+    finally:
+        conn.close()
+    return [dict(zip(EVENT_COLUMNS, row)) for row in rows]
+
+
+def write_events(db_path, events: List[Dict], replace_source: Optional[str] = None) -> int:
+    """
+    Ghi đồng bộ một loạt sự kiện (dạng read_events) - dùng khi gộp kết quả, không dùng trong frame loop
+
+    Args:
+        replace_source: Xóa sự kiện cũ của nguồn này trong cùng transaction (ghi lại kết quả gộp)
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        with conn:
+            if replace_source is not None:
+                conn.execute("DELETE FROM events WHERE source = ?", (replace_source,))
+            conn.executemany(_INSERT, [tuple(event[column] for column in EVENT_COLUMNS) for event in events])
+    finally:
+        conn.close()
+    return len(events)
+
+
+class EventLog:
+    """
+    Sink ghi sự kiện không chặn frame loop
+
+    Nguyên lý:
+    - Frame loop chỉ đẩy tuple vào queue (put_nowait), không chạm tới disk
+    - Writer thread gom batch (tối đa batch_size hoặc flush_interval giây) → 1 transaction
+    - SQLite chế độ WAL: append nhanh, có thể đọc báo cáo trong khi đang ghi
+    - Queue đầy → bỏ sự kiện và đếm vào dropped (không bao giờ block xử lý video)
+    """
+
+    def __init__(self, db_path: str, source: str = '',
+                 batch_size: int = 256, flush_interval: float = 1.0, max_queue: int = 10000):
+        """
+        Args:
+            db_path: Đường dẫn file SQLite
+            source: Tên nguồn (video/camera) ghi kèm mỗi sự kiện
+            batch_size: Số sự kiện tối đa trong 1 transaction
+            flush_interval: Thời gian tối đa (giây) giữ sự kiện trước khi commit
+            max_queue: Kích thước tối đa của queue
+        """
+        self.db_path = Path(db_path)
+        self.source = source
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._flush_now = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self._enqueued = 0  # Sự kiện đã vào queue / đã được writer xử lý (commit hoặc lỗi) - cho flush()
+        self._processed = 0
+        self.error: Optional[str] = None  # Writer không mở được DB → không sự kiện nào được ghi
+        self._error_reported = False
+
+    @staticmethod
+    def default_path(video_path: str) -> Path:
+        """File log mặc định: <project root>/events/<tên video>_events.sqlite"""
+        events_dir = Path(__file__).parent.parent.parent / "events"
+        return events_dir / f"{Path(video_path).stem}_events.sqlite"
+
+    def start(self):
+        """Khởi động writer thread (gọi lại sau close() được)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.error = None  # Retry opening the DB
+        self._error_reported = False
+        self._thread = threading.Thread(target=self._writer_loop, name='EventLogWriter', daemon=True)
+        self._thread.start()
+
+    def log(self, kind: str, reason_code: str, track_id: int, frame_index: int, media_time: float,
+            cls_id: Optional[int] = None, label: Optional[str] = None, direction: Optional[str] = None,
+            bbox: Optional[Tuple[int, int, int, int]] = None, tl_snapshot: Optional[List[Tuple]] = None,
+            reason: str = ''):
+        """
+        Đẩy một sự kiện vào queue (không block)
+
+        Args:
+            kind: 'crossing' hoặc 'violation'
+            reason_code: Một trong các REASON_* ở trên
+            tl_snapshot: TL_ROIS tại thời điểm sự kiện [(x1, y1, x2, y2, tl_type, color), ...]
+        """
+        x1, y1, x2, y2 = bbox if bbox is not None else (None, None, None, None)
+        lights = None
+        if tl_snapshot:
+            lights = json.dumps([[tl[4], tl[5]] for tl in tl_snapshot])
+        row = (time.time(), self.source, kind, reason_code, int(track_id), cls_id, label, direction,
+               int(frame_index), float(media_time), x1, y1, x2, y2, lights, reason)
+        try:
+            self._queue.put_nowait(row)
+            self._enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Chờ writer commit hết các sự kiện đã log (dùng trước khi lưu checkpoint)"""
+        if self.error is not None:
+            if not self._error_reported:
+                self._error_reported = True
+                print(f"❌ EventLog: cannot flush - writer failed: {self.error}")
+            return False
+        target = self._enqueued
+        if self._thread is None or not self._thread.is_alive():
+            return self._processed >= target
+        deadline = time.monotonic() + timeout
+        while self._processed < target:
+            if time.monotonic() >= deadline:
+                return False
+            self._flush_now.set()  # Commit the current batch without waiting for flush_interval
+            time.sleep(0.01)
+        return True
+
+    def last_event_id(self) -> int:
+        """id lớn nhất đã ghi của nguồn này (0 nếu chưa có) - offset cho checkpoint"""
+        if not self.db_path.exists():
+            return 0
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            row = conn.execute("SELECT MAX(id) FROM events WHERE source = ?", (self.source,)).fetchone()
+        except sqlite3.Error:
+            return 0  # Table not created yet
+        finally:
+            conn.close()
+        return row[0] or 0
+
+    def truncate_after(self, event_id: int) -> int:
+        """
+        Xóa sự kiện của nguồn này ghi sau offset event_id (resume từ checkpoint sẽ ghi lại chúng)
+        Gọi trước start()
+
+        Returns:
+            Số sự kiện đã xóa
+        """
+        if not self.db_path.exists():
+            return 0
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            with conn:
+                cursor = conn.execute("DELETE FROM events WHERE source = ? AND id > ?", (self.source, event_id))
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"⚠️ EventLog: cannot truncate {self.db_path}: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def close(self, timeout: float = 5.0):
+        """Ghi nốt các sự kiện còn lại và dừng writer thread"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        if self.dropped:
+            print(f"⚠️ EventLog: dropped {self.dropped} events (queue full)")
+
+    def stats(self) -> Dict[str, int]:
+        return {'written': self.written, 'dropped': self.dropped, 'queued': self._queue.qsize()}
+
+    def _writer_loop(self):
+        """Gom batch và commit - chạy trong writer thread"""
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+        except (sqlite3.Error, OSError) as e:
+            self.error = f"cannot open {self.db_path}: {e}"
+            print(f"❌ EventLog: {self.error}")
+            return
+
+        print(f"🗃️ EventLog: writing to {self.db_path}")
+        try:
+            while True:
+                batch = self._drain()
+                if batch:
+                    try:
+                        with conn:
+                            conn.executemany(_INSERT, batch)
+                        self.written += len(batch)
+                    except sqlite3.Error as e:
+                        self.dropped += len(batch)
+                        print(f"❌ EventLog: write failed: {e}")
+                    self._processed += len(batch)
+                elif self._stop.is_set():
+                    break
+        finally:
+            conn.close()
+
+    def _drain(self) -> List[Tuple]:
+        """Lấy tối đa batch_size sự kiện, chờ không quá flush_interval giây"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if self._stop.is_set() or self._flush_now.is_set():
+                remaining = 0
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        if not batch:
+            self._flush_now.clear()
+        return batch
@@ -0,0 +1,277 @@
+"""
+Evidence Recorder - Lưu clip + ảnh crop làm bằng chứng vi phạm
+Giữ ring buffer các frame đã nén JPEG (giới hạn bộ nhớ), ghi clip bất đồng bộ
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.image_encoder import ImageEncodePool, POLICY_DROP_OLDEST
+
+
+class _BufferedFrame:
+    """Một frame trong ring buffer (JPEG có thể chưa encode xong)"""
+
+    __slots__ = ('frame_index', 'media_time', 'future', 'nbytes', 'live')
+
+    def __init__(self, frame_index: int, media_time: float, future):
+        self.frame_index = frame_index
+        self.media_time = media_time
+        self.future = future
+        self.nbytes = 0
+        self.live = True  # False = đã bị bỏ khỏi ring buffer (không tính vào dung lượng)
+
+
+class _Incident:
+    """Một clip bằng chứng đang chờ đủ post-roll (có thể gộp nhiều vi phạm)"""
+
+    __slots__ = ('start', 'end', 'first_frame', 'violations')
+
+    def __init__(self, start: float, end: float, first_frame: int):
+        self.start = start
+        self.end = end
+        self.first_frame = first_frame
+        # [(track_id, reason_code, frame_index, bbox, label), ...]
+        self.violations: List[Tuple] = []
+
+
+class EvidenceRecorder:
+    """
+    Ghi bằng chứng vi phạm: clip (pre-roll + post-roll) và ảnh crop phương tiện
+
+    Nguyên lý:
+    - Mỗi frame: copy + đẩy vào ImageEncodePool → ring buffer chỉ giữ bytes đã nén
+    - Ring buffer bị cắt theo thời gian (pre_roll) và tổng dung lượng (max_bytes)
+    - Vi phạm → mở incident [t - pre_roll, t + post_roll]; incident chồng lấn được gộp thành 1 clip
+    - Đủ post-roll → gửi danh sách JPEG sang writer thread (decode + VideoWriter), ảnh crop encode qua pool
+    - Frame loop không bao giờ chờ: pool quá tải thì bỏ frame cũ nhất đang chờ thay vì block
+    """
+
+    def __init__(self, output_dir: str,
+                 pre_roll: float = 3.0,
+                 post_roll: float = 2.0,
+                 max_trigger_delay: float = 2.0,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 jpeg_quality: int = 80,
+                 encode_workers: int = 2,
+                 max_in_flight: int = 8,
+                 encoder: Optional[ImageEncodePool] = None):
+        """
+        Args:
+            output_dir: Thư mục lưu clip/ảnh
+            pre_roll: Số giây trước vi phạm đưa vào clip
+            post_roll: Số giây sau vi phạm đưa vào clip
+            max_trigger_delay: Độ trễ tối đa giữa lúc vi phạm và lúc trigger
+                               (vd. vi phạm đèn đỏ được kết luận sau khi hướng đi đủ tin cậy)
+            max_bytes: Giới hạn tổng dung lượng JPEG trong ring buffer
+            jpeg_quality: Chất lượng JPEG (0-100)
+            encode_workers: Số thread encode JPEG (khi tự tạo pool)
+            max_in_flight: Số frame tối đa đang chờ encode (vượt → bỏ frame cũ nhất)
+            encoder: Dùng chung ImageEncodePool có sẵn (None = tự tạo pool riêng)
+        """
+        self.output_dir = Path(output_dir)
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_trigger_delay = max_trigger_delay
+        self.max_bytes = max_bytes
+        self.jpeg_quality = jpeg_quality
+        self.enabled = True
+        self.fps = 30.0
+
+        self._frames: deque = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._incidents: List[_Incident] = []
+        self._seen = set()  # (track_id, reason_code) đã ghi bằng chứng
+
+        self._owns_encoder = encoder is None
+        if encoder is None:
+            encoder = ImageEncodePool(workers=encode_workers, max_queue=max_in_flight,
+                                      policy=POLICY_DROP_OLDEST, jpeg_quality=jpeg_quality)
+        self._encoder = encoder
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='EvidenceWriter')
+
+        self.dropped_frames = 0
+        self.clips_written = 0
+
+    @staticmethod
+    def default_dir(video_path: str) -> Path:
+        """Thư mục mặc định: <project root>/evidence/<tên video>/"""
+        return Path(__file__).parent.parent.parent / "evidence" / Path(video_path).stem
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._bytes
+
+    def push_frame(self, frame: np.ndarray, frame_index: int, media_time: float):
+        """
+        Đưa frame mới vào ring buffer (gọi TRƯỚC khi vẽ overlay lên frame)
+
+        Args:
+            frame: Frame BGR gốc (sẽ được copy)
+            frame_index: Index frame trong video
+            media_time: Thời điểm frame (giây, thời gian video)
+        """
+        if not self.enabled:
+            return
+
+        entry = _BufferedFrame(frame_index, media_time, None)
+        entry.future = self._encoder.submit(frame.copy(), quality=self.jpeg_quality, block=False)
+        entry.future.add_done_callback(lambda job, e=entry: self._on_encoded(e, job))
+        self._frames.append(entry)
+
+        self._finalize_due(media_time)
+        self._trim(media_time)
+
+    def trigger(self, track_id: int, reason_code: str, frame_index: int, media_time: float,
+                bbox: Optional[Tuple[int, int, int, int]] = None, label: str = ''):
+        """
+        Ghi nhận một vi phạm cần bằng chứng
+
+        Args:
+            frame_index: Frame xảy ra vi phạm (dùng để crop ảnh phương tiện)
+            media_time: Thời điểm vi phạm (giây, thời gian video)
+        """
+        if not self.enabled:
+            return
+        key = (track_id, reason_code)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+
+        start = media_time - self.pre_roll
+        end = media_time + self.post_roll
+        violation = (track_id, reason_code, frame_index, bbox, label)
+
+        # Chồng lấn với incident đang mở → gộp vào cùng clip
+        for incident in self._incidents:
+            if start <= incident.end:
+                incident.start = min(incident.start, start)
+                incident.end = max(incident.end, end)
+                incident.first_frame = min(incident.first_frame, frame_index)
+                incident.violations.append(violation)
+                return
+
+        incident = _Incident(start, end, frame_index)
+        incident.violations.append(violation)
+        self._incidents.append(incident)
+
+    def flush(self):
+        """Ghi ngay mọi incident đang mở với các frame đã có (khi video kết thúc/loop)"""
+        for incident in self._incidents:
+            self._submit(incident)
+        self._incidents = []
+
+    def reset(self):
+        """Ghi nốt incident và xóa ring buffer (khi video loop lại từ đầu)"""
+        self.flush()
+        while self._frames:
+            self._drop(self._frames.popleft())
+        self._seen.clear()
+
+    def close(self):
+        """Ghi nốt và dừng các worker thread"""
+        self.flush()
+        self._writer.shutdown(wait=True)
+        if self._owns_encoder:
+            self._encoder.close()
+        while self._frames:
+            self._drop(self._frames.popleft())
+
+    def _on_encoded(self, entry: _BufferedFrame, job):
+        data = job.result()
+        with self._lock:
+            if job.dropped():
+                self.dropped_frames += 1
+            if entry.live:
+                entry.nbytes = len(data) if data else 0
+                self._bytes += entry.nbytes
+
+    def _drop(self, entry: _BufferedFrame):
+        with self._lock:
+            entry.live = False
+            self._bytes -= entry.nbytes
+            entry.nbytes = 0
+
+    def _trim(self, media_time: float):
+        """Bỏ frame cũ hơn pre-roll (hoặc cũ hơn incident đang mở) và giữ dưới max_bytes"""
+        keep_from = media_time - self.pre_roll - self.max_trigger_delay
+        if self._incidents:
+            keep_from = min(keep_from, min(inc.start for inc in self._incidents))
+
+        frames = self._frames
+        while frames and frames[0].future.done() and (
+                frames[0].media_time < keep_from or self._bytes > self.max_bytes):
+            self._drop(frames.popleft())
+
+    def _finalize_due(self, media_time: float):
+        """Gửi các incident đã đủ post-roll sang writer thread"""
+        if not self._incidents:
+            return
+        due = [inc for inc in self._incidents if inc.end <= media_time]
+        if due:
+            self._incidents = [inc for inc in self._incidents if inc.end > media_time]
+            for incident in due:
+                self._submit(incident)
+
+    def _submit(self, incident: _Incident):
+        frames = [(e.frame_index, e.future) for e in self._frames
+                  if incident.start <= e.media_time <= incident.end]
+        if frames:
+            self._writer.submit(self._write_incident, incident, frames, self.fps)
+
+    def _write_incident(self, incident: _Incident, frames: List[Tuple], fps: float):
+        """Decode JPEG → clip mp4 + ảnh crop cho từng vi phạm (chạy trong writer thread)"""
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            first = incident.violations[0]
+            stem = f"f{incident.first_frame:06d}_{first[1]}_id{first[0]}"
+            crops: Dict[int, List[Tuple]] = {}
+            for track_id, reason_code, frame_index, bbox, label in incident.violations:
+                crops.setdefault(frame_index, []).append((track_id, reason_code, bbox, label))
+
+            writer = None
+            for frame_index, future in frames:
+                data = future.result()
+                if not data:
+                    continue
+                image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    continue
+                if writer is None:
+                    h, w = image.shape[:2]
+                    writer = cv2.VideoWriter(str(self.output_dir / f"{stem}.mp4"),
+                                             cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+                writer.write(image)
+
+                for track_id, reason_code, bbox, label in crops.pop(frame_index, []):
+                    self._write_crop(image, bbox, f"f{frame_index:06d}_{reason_code}_id{track_id}.jpg")
+
+            if writer is not None:
+                writer.release()
+                self.clips_written += 1
+                print(f"🎞️ Evidence saved: {stem}.mp4 ({len(incident.violations)} violation(s))")
+        except Exception as e:
+            print(f"❌ Evidence writer error: {e}")
+
+    def _write_crop(self, image: np.ndarray, bbox: Optional[Tuple[int, int, int, int]], filename: str):
+        """Lưu ảnh crop phương tiện (nới rộng bbox 20% cho dễ nhận diện)"""
+        h, w = image.shape[:2]
+        if bbox is None:
+            crop = image
+        else:
+            x1, y1, x2, y2 = bbox
+            pad_x = (x2 - x1) // 5
+            pad_y = (y2 - y1) // 5
+            x1, y1 = max(0, x1 - pad_x), max(0, y1 - pad_y)
+            x2, y2 = min(w, x2 + pad_x), min(h, y2 + pad_y)
+            if x2 <= x1 or y2 <= y1:
+                return
+            crop = image[y1:y2, x1:x2]
+        # Writer thread được phép chờ chỗ trống trong pool (không phải frame loop)
+        self._encoder.submit(crop, path=str(self.output_dir / filename), quality=95, block=True)
@@ -0,0 +1,128 @@
+"""
+Frame Exchange - Triple buffer trao đổi frame giữa 1 thread ghi và 1 thread đọc
+Buffer cấp phát sẵn, latest wins, đếm tham chiếu để reader không bao giờ thấy buffer đang ghi
+"""
+import threading
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+
+class FrameSlot:
+    """Một buffer trong exchange"""
+
+    __slots__ = ('index', 'array', 'seq', 'meta', 'refs')
+
+    def __init__(self, index: int):
+        self.index = index
+        self.array: Optional[np.ndarray] = None
+        self.seq = 0        # Thứ tự publish (tăng dần)
+        self.meta: Any = None  # Dữ liệu kèm frame (do writer quyết định)
+        self.refs = 0       # Số reader đang giữ buffer
+
+
+class FrameExchange:
+    """
+    Triple buffer latest-wins
+
+    Nguyên lý:
+    - Writer: acquire_write() lấy buffer rảnh (không phải buffer mới nhất, không có reader giữ)
+      → ghi thẳng vào slot.array → publish()
+    - Reader: acquire_read() lấy buffer mới nhất (refs += 1) → dùng → release()
+    - Frame chưa ai đọc bị frame mới thay thế (superseded) - không có hàng đợi frame cũ
+    - publish() trả về True chỉ khi reader đã đọc hết frame trước đó → writer chỉ cần
+      báo cho reader 1 lần, event loop không bao giờ tích tụ thông báo
+    - Với 3 buffer (1 đang ghi, 1 mới nhất, 1 reader giữ) writer luôn có buffer rảnh
+    """
+
+    def __init__(self, num_buffers: int = 3):
+        """
+        Args:
+            num_buffers: Số buffer (tối thiểu 3)
+        """
+        if num_buffers < 3:
+            raise ValueError("FrameExchange needs at least 3 buffers")
+        self._slots: List[FrameSlot] = [FrameSlot(i) for i in range(num_buffers)]
+        self._lock = threading.Lock()
+        self._latest: Optional[FrameSlot] = None
+        self._writing: Optional[FrameSlot] = None
+        self._unread = False
+        self._seq = 0
+
+        self.published = 0
+        self.superseded = 0  # Frame bị thay thế trước khi reader kịp đọc
+        self.starved = 0     # Writer không có buffer rảnh (reader giữ quá nhiều buffer)
+
+    def acquire_write(self, shape: Tuple[int, ...], dtype=np.uint8) -> Optional[FrameSlot]:
+        """
+        Lấy buffer để ghi (chỉ 1 writer)
+
+        Returns:
+            FrameSlot có array đúng shape/dtype (chỉ cấp phát lại khi shape đổi), hoặc None nếu hết buffer rảnh
+        """
+        with self._lock:
+            slot = next((s for s in self._slots
+                         if s.refs == 0 and s is not self._latest and s is not self._writing), None)
+            if slot is None:
+                self.starved += 1
+                return None
+            self._writing = slot
+            slot.meta = None
+
+        if slot.array is None or slot.array.shape != tuple(shape) or slot.array.dtype != dtype:
+            slot.array = np.empty(shape, dtype=dtype)
+        return slot
+
+    def publish(self, slot: FrameSlot, meta: Any = None) -> bool:
+        """
+        Đánh dấu buffer vừa ghi là frame mới nhất
+
+        Returns:
+            True nếu reader cần được báo (trước đó không còn frame chưa đọc)
+        """
+        with self._lock:
+            if self._unread:
+                self.superseded += 1
+            self._seq += 1
+            slot.seq = self._seq
+            slot.meta = meta
+            self._latest = slot
+            self._writing = None
+            self.published += 1
+            notify = not self._unread
+            self._unread = True
+            return notify
+
+    def cancel_write(self, slot: FrameSlot):
+        """Bỏ buffer đã acquire_write mà không publish (vd. render lỗi)"""
+        with self._lock:
+            if self._writing is slot:
+                self._writing = None
+
+    def has_unread(self) -> bool:
+        """True nếu có frame đã publish mà reader chưa lấy"""
+        with self._lock:
+            return self._unread
+
+    def acquire_read(self) -> Optional[FrameSlot]:
+        """
+        Lấy frame mới nhất chưa đọc (phải gọi release() sau khi dùng xong)
+
+        Returns:
+            FrameSlot, hoặc None nếu không có frame mới
+        """
+        with self._lock:
+            if not self._unread:
+                return None
+            slot = self._latest
+            slot.refs += 1
+            self._unread = False
+            return slot
+
+    def release(self, slot: FrameSlot):
+        """Trả buffer cho writer"""
+        with self._lock:
+            slot.refs = max(0, slot.refs - 1)
+
+    def stats(self):
+        return {'published': self.published, 'superseded': self.superseded, 'starved': self.starved}
@@ -0,0 +1,246 @@
+"""
+Inference Server - Một model YOLO dùng chung cho nhiều camera, gom frame thành batch động
+Mỗi camera giữ tracker (ByteTrack) riêng ở phía client
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class InferenceRequest:
+    """Một frame chờ inference (tương tự Future: done(), result())"""
+
+    __slots__ = ('camera_id', 'frame', 'params', 'submitted_at', '_event', '_result', '_error')
+
+    def __init__(self, camera_id: str, frame: np.ndarray, params: tuple):
+        self.camera_id = camera_id
+        self.frame = frame
+        self.params = params  # (imgsz, conf, classes) - chỉ gom batch các request cùng params
+        self.submitted_at = time.perf_counter()
+        self._event = threading.Event()
+        self._result = None
+        self._error: Optional[Exception] = None
+
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    def result(self, timeout: Optional[float] = None):
+        """Chờ và trả về ultralytics Results của frame này (raise nếu inference lỗi)"""
+        if not self._event.wait(timeout):
+            raise TimeoutError(f"Inference timeout ({self.camera_id})")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _finish(self, result=None, error: Optional[Exception] = None):
+        self.frame = None
+        self._result = result
+        self._error = error
+        self._event.set()
+
+
+class InferenceServer:
+    """
+    Server inference dùng chung trong process
+
+    Nguyên lý:
+    - Camera pipeline gọi submit() → request vào hàng đợi chung
+    - Server thread lấy request đầu tiên, chờ thêm tối đa max_wait giây hoặc đến khi đủ max_batch
+      → 1 lần model.predict() cho cả batch → trả kết quả về từng request
+    - Chỉ gom các request cùng (imgsz, conf, classes); request khác params chờ batch sau
+    - Không tracking ở đây: tracker phụ thuộc thứ tự frame của từng camera (xem CameraTracker)
+    """
+
+    def __init__(self, model, max_batch: int = 8, max_wait: float = 0.005):
+        """
+        Args:
+            model: ultralytics YOLO đã load
+            max_batch: Số frame tối đa mỗi batch
+            max_wait: Thời gian tối đa (giây) giữ request đầu tiên để chờ gom batch
+        """
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.batches = 0
+        self.frames = 0
+        self.failed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name='InferenceServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Dừng server; request còn chờ kết thúc với lỗi"""
+        with self._cond:
+            self._running = False
+            pending = list(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+        for request in pending:
+            request._finish(error=RuntimeError("Inference server stopped"))
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, camera_id: str, frame: np.ndarray, imgsz: int = 640, conf: float = 0.25,
+               classes: Optional[List[int]] = None) -> InferenceRequest:
+        """
+        Đưa frame vào hàng đợi inference (không block)
+
+        Args:
+            frame: Frame BGR - caller không được sửa frame cho đến khi có kết quả
+        """
+        request = InferenceRequest(camera_id, frame, (imgsz, conf, tuple(classes) if classes else None))
+        with self._cond:
+            if not self._running:
+                request._finish(error=RuntimeError("Inference server not running"))
+                return request
+            self._pending.append(request)
+            self._cond.notify_all()
+        return request
+
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, float]:
+        """Thống kê: số batch, batch size trung bình, latency (ms, tính từ lúc submit đến lúc có kết quả)"""
+        frames = max(self.frames, 1)
+        return {
+            'queue_depth': len(self._pending),
+            'batches': self.batches,
+            'frames': self.frames,
+            'failed': self.failed,
+            'avg_batch': self.frames / max(self.batches, 1),
+            'avg_latency_ms': self._latency_total / frames * 1000,
+            'max_latency_ms': self._latency_max * 1000,
+        }
+
+    def _next_batch(self) -> List[InferenceRequest]:
+        """Chờ request đầu tiên, gom thêm đến max_batch hoặc hết max_wait"""
+        with self._cond:
+            while not self._pending and self._running:
+                self._cond.wait()
+            if not self._running:
+                return []
+
+            deadline = self._pending[0].submitted_at + self.max_wait
+            while len(self._pending) < self.max_batch and self._running:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            params = self._pending[0].params
+            batch = [r for r in self._pending if r.params == params][:self.max_batch]
+            for request in batch:
+                self._pending.remove(request)
+            return batch
+
+    def _serve(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            imgsz, conf, classes = batch[0].params
+            try:
+                results = self.model.predict(
+                    [r.frame for r in batch],
+                    imgsz=imgsz,
+                    conf=conf,
+                    classes=list(classes) if classes else None,
+                    verbose=False
+                )
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"❌ Inference error (batch of {len(batch)}): {e}")
+                for request in batch:
+                    request._finish(error=e)
+                continue
+
+            now = time.perf_counter()
+            self.batches += 1
+            self.frames += len(batch)
+            for request, result in zip(batch, results):
+                latency = now - request.submitted_at
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+                request._finish(result=result)
+
+
+class CameraTracker:
+    """
+    Tracker (ByteTrack/BoT-SORT theo file yaml của ultralytics) riêng cho một camera
+
+    Tương đương callback tracking của model.track(): gán track id cho Results đã predict
+    """
+
+    def __init__(self, tracker: str = "bytetrack.yaml", frame_rate: int = 30):
+        from ultralytics.utils import IterableSimpleNamespace, yaml_load
+        from ultralytics.utils.checks import check_yaml
+        from ultralytics.trackers.track import TRACKER_MAP
+
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker)))
+        self._tracker = TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=frame_rate)
+
+    def update(self, result, frame: np.ndarray):
+        """Trả về Results chỉ gồm các box được track, boxes có thêm cột track id"""
+        import torch
+
+        det = result.boxes.cpu().numpy()
+        if len(det) == 0:
+            return result
+        tracks = self._tracker.update(det, frame)
+        if len(tracks) == 0:
+            return result
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return result
+
+
+class InferenceClient:
+    """
+    Dùng thay YOLO trong VideoThread: model.track(...) → InferenceServer (batch chung) + tracker riêng
+
+    VideoThread không cần biết model là local hay dùng chung
+    """
+
+    def __init__(self, server: InferenceServer, camera_id: str, frame_rate: int = 30, timeout: float = 10.0):
+        """
+        Args:
+            server: InferenceServer đang chạy
+            camera_id: Tên camera (để log/thống kê)
+            frame_rate: FPS dùng cho tracker (giống model.track của ultralytics: 30)
+            timeout: Thời gian chờ kết quả tối đa (giây)
+        """
+        self.server = server
+        self.camera_id = camera_id
+        self.frame_rate = frame_rate
+        self.timeout = timeout
+        self._tracker: Optional[CameraTracker] = None
+
+    def track(self, frame: np.ndarray, tracker: str = "bytetrack.yaml", persist: bool = True,
+              classes: Optional[List[int]] = None, verbose: bool = False,
+              imgsz: int = 640, conf: float = 0.25, **kwargs):
+        """Cùng signature/kết quả với YOLO.track() (list 1 Results)"""
+        if self._tracker is None or not persist:
+            self._tracker = CameraTracker(tracker, self.frame_rate)
+        result = self.server.submit(self.camera_id, frame, imgsz=imgsz, conf=conf,
+                                    classes=classes).result(self.timeout)
+        return [self._tracker.update(result, frame)]
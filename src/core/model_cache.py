@@ -0,0 +1,119 @@
+"""
+Model Artifact Cache - Lưu model đã tối ưu (PyTorch đã fuse / ONNX / OpenVINO IR) xuống đĩa
+Key = hash nội dung file weight + imgsz → lần khởi động sau bỏ qua fuse/export
+"""
+import hashlib
+import json
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+BACKEND_PYTORCH = 'pytorch'
+BACKEND_ONNX = 'onnx'
+BACKEND_OPENVINO = 'openvino'
+
+# Export format của ultralytics cho từng backend
+_EXPORT_FORMATS = {BACKEND_ONNX: 'onnx', BACKEND_OPENVINO: 'openvino'}
+
+
+class ModelArtifactCache:
+    """
+    Cache artifact theo weight
+
+    Cấu trúc:
+        <root>/index.json                       path weight → (size, mtime, sha256) - không hash lại file chưa đổi
+        <root>/<sha16>/<stem>_fused.pt          PyTorch đã fuse Conv+BN (không phụ thuộc imgsz)
+        <root>/<sha16>/<stem>_<imgsz>.onnx      ONNX export với input cố định imgsz
+        <root>/<sha16>/<stem>_<imgsz>_openvino_model/
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict]] = None
+
+    def weight_hash(self, weight_path: str) -> str:
+        """sha256 nội dung weight (cache theo size/mtime để không đọc lại file lớn mỗi lần khởi động)"""
+        path = Path(weight_path).resolve()
+        stat = path.stat()
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(str(path))
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                return entry['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+
+        with self._lock:
+            index = self._load_index()
+            index[str(path)] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha}
+            self._save_index(index)
+        return sha
+
+    def artifact_path(self, weight_path: str, backend: str, imgsz: int) -> Path:
+        """Đường dẫn artifact (có thể chưa tồn tại)"""
+        stem = Path(weight_path).stem
+        folder = self.root / self.weight_hash(weight_path)[:16]
+        if backend == BACKEND_PYTORCH:
+            return folder / f"{stem}_fused.pt"
+        if backend == BACKEND_ONNX:
+            return folder / f"{stem}_{imgsz}.onnx"
+        if backend == BACKEND_OPENVINO:
+            return folder / f"{stem}_{imgsz}_openvino_model"
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    def get(self, weight_path: str, backend: str, imgsz: int) -> Optional[str]:
+        """Artifact đã cache, None nếu chưa có"""
+        path = self.artifact_path(weight_path, backend, imgsz)
+        return str(path) if path.exists() else None
+
+    def build(self, weight_path: str, backend: str, imgsz: int) -> str:
+        """
+        Tạo artifact (chậm: fuse hoặc export) và lưu vào cache
+
+        Returns:
+            Đường dẫn artifact - load bằng YOLO(path)
+        """
+        from ultralytics import YOLO
+
+        target = self.artifact_path(weight_path, backend, imgsz)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + '.tmp')
+
+        model = YOLO(weight_path)
+        if backend == BACKEND_PYTORCH:
+            model.fuse()
+            model.save(str(tmp))
+        else:
+            exported = Path(model.export(format=_EXPORT_FORMATS[backend], imgsz=imgsz, verbose=False))
+            shutil.move(str(exported), str(tmp))
+
+        # Rename last so a crash mid-build never leaves a half-written artifact in the cache
+        if target.exists():
+            shutil.rmtree(target) if target.is_dir() else target.unlink()
+        tmp.rename(target)
+        print(f"💾 Cached {backend} artifact: {target}")
+        return str(target)
+
+    def get_or_build(self, weight_path: str, backend: str, imgsz: int) -> str:
+        return self.get(weight_path, backend, imgsz) or self.build(weight_path, backend, imgsz)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if self._index is None:
+            try:
+                self._index = json.loads((self.root / 'index.json').read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self, index: Dict[str, Dict]):
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            (self.root / 'index.json').write_text(json.dumps(index, indent=2), encoding='utf-8')
+        except OSError as e:
+            print(f"⚠️ Model cache index not saved: {e}")
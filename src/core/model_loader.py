@@ -0,0 +1,190 @@
+"""
+Model Loader - Load weights YOLO + warm-up trong thread riêng, rồi mới giao model cho VideoThread
+VideoThread đổi model ở ranh giới giữa 2 frame (request_model_swap), không bao giờ giữa lúc track()
+"""
+import pickle
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from core.model_cache import ModelArtifactCache, BACKEND_PYTORCH
+
+
+def warm_up_model(model, imgsz_values: Iterable[int] = (640,), conf: float = 0.25):
+    """
+    Chạy predict trên frame rỗng để trả trước chi phí khởi tạo lười
+    (tạo predictor, fuse Conv+BN, chọn kernel) - frame thật đầu tiên không bị trễ
+    """
+    for imgsz in imgsz_values:
+        model.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), imgsz=imgsz, conf=conf, verbose=False)
+
+
+def load_optimized_model(weight_path: str, imgsz_values: Sequence[int] = (640,), backend: str = BACKEND_PYTORCH,
+                         conf: float = 0.25, cache_dir: Optional[str] = None):
+    """
+    Load weight qua cache artifact đã tối ưu, rồi warm-up với từng imgsz
+
+    Args:
+        weight_path: File .pt gốc
+        imgsz_values: Các imgsz sẽ dùng (cái đầu tiên dùng cho ONNX/OpenVINO - input cố định)
+        backend: pytorch (fuse sẵn) | onnx | openvino
+        cache_dir: Thư mục cache (None = models/.cache, '' = không dùng cache)
+
+    Returns:
+        YOLO model sẵn sàng chạy (frame đầu tiên không còn bị trễ)
+    """
+    from ultralytics import YOLO
+
+    if cache_dir is None:
+        from model_config import MODEL_CACHE_DIR
+        cache_dir = MODEL_CACHE_DIR
+
+    imgsz_values = list(imgsz_values) or [640]
+    path = weight_path
+    if cache_dir:
+        try:
+            path = ModelArtifactCache(cache_dir).get_or_build(weight_path, backend, imgsz_values[0])
+        except Exception as e:
+            print(f"⚠️ {backend} artifact unavailable ({e}) - using {weight_path}")
+            path, backend = weight_path, BACKEND_PYTORCH
+
+    model = YOLO(path, task='detect')
+    if backend != BACKEND_PYTORCH:
+        imgsz_values = imgsz_values[:1]  # Exported graphs have a fixed input size
+    warm_up_model(model, imgsz_values, conf)
+    return model
+
+
+def transfer_tracker_state(old_model, new_model) -> bool:
+    """
+    Chuyển tracker (ByteTrack) của model cũ sang model mới để giữ nguyên track id
+
+    Returns:
+        False nếu không chuyển được (track id sẽ bắt đầu lại) - caller phải reset state theo track id
+    """
+    old_trackers = getattr(getattr(old_model, 'predictor', None), 'trackers', None)
+    if not old_trackers:
+        return True  # Old model never tracked - nothing to keep
+    if getattr(new_model, 'predictor', None) is None:
+        return False  # Not warmed up: the predictor (and its trackers) doesn't exist yet
+    try:
+        from ultralytics.trackers import register_tracker
+
+        register_tracker(new_model, persist=True)  # Tracking callbacks; persist keeps the trackers set below
+        new_model.predictor.trackers = old_trackers
+        return True
+    except Exception as e:
+        print(f"⚠️ Tracker state not transferred: {e}")
+        return False
+
+
+def export_tracker_state(model) -> Optional[bytes]:
+    """
+    Trạng thái tracker (ByteTrack) của model dạng bytes, để lưu checkpoint
+
+    Returns:
+        None nếu model chưa track lần nào hoặc tracker không pickle được
+    """
+    trackers = getattr(getattr(model, 'predictor', None), 'trackers', None)
+    if not trackers:
+        return None
+    try:
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        # BaseTrack._count is the class-wide id counter: resumed tracks must not reuse old ids
+        return pickle.dumps({'trackers': trackers, 'next_id': BaseTrack._count})
+    except Exception as e:
+        print(f"⚠️ Tracker state not exported: {e}")
+        return None
+
+
+def restore_tracker_state(model, state: bytes) -> bool:
+    """
+    Khôi phục tracker từ export_tracker_state (model phải đã warm-up)
+
+    Returns:
+        False nếu không khôi phục được (track id sẽ bắt đầu lại) - caller phải reset state theo track id
+    """
+    if getattr(model, 'predictor', None) is None:
+        return False
+    try:
+        from ultralytics.trackers import register_tracker
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        saved = pickle.loads(state)
+        register_tracker(model, persist=True)
+        model.predictor.trackers = saved['trackers']
+        BaseTrack._count = max(BaseTrack._count, saved['next_id'])
+        return True
+    except Exception as e:
+        print(f"⚠️ Tracker state not restored: {e}")
+        return False
+
+
+def reset_tracker_state(model) -> bool:
+    """
+    Bỏ mọi track đang theo dõi (trước khi nhảy tới đoạn video không liền với frame trước)
+    Id mới vẫn tiếp tục đếm - không trùng track id đã ghi vào event log
+
+    Returns:
+        False nếu không reset được
+    """
+    trackers = getattr(getattr(model, 'predictor', None), 'trackers', None)
+    if not trackers:
+        return True  # Never tracked - nothing to forget
+    try:
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        next_id = BaseTrack._count
+        for tracker in trackers:
+            tracker.reset()  # Also restarts the class-wide id counter
+        BaseTrack._count = max(BaseTrack._count, next_id)
+        return True
+    except Exception as e:
+        print(f"⚠️ Tracker state not reset: {e}")
+        return False
+
+
+class ModelLoadWorker(QThread):
+    """
+    Load 1 bộ weights trong background (GUI không bị đứng)
+
+    Signals:
+        loaded(model, model_type, weight_name, weight_path): model đã load + warm-up xong
+        failed(model_type, weight_name, message)
+    """
+
+    loaded = pyqtSignal(object, str, str, str)
+    failed = pyqtSignal(str, str, str)
+
+    def __init__(self, model_type: str, weight_name: str, imgsz: int = 640, conf: float = 0.25):
+        """
+        Args:
+            imgsz: imgsz đang chọn trên GUI - warm-up thêm nếu không nằm trong warmup_imgsz của model config
+        """
+        super().__init__()
+        self.model_type = model_type
+        self.weight_name = weight_name
+        self.imgsz = imgsz
+        self.conf = conf
+
+    def run(self):
+        try:
+            from model_config import get_weight_path, get_model_config
+
+            config = get_model_config(self.model_type)
+            imgsz_values = list(config.get('warmup_imgsz') or [config['default_imgsz']])
+            if self.imgsz not in imgsz_values:
+                imgsz_values.append(self.imgsz)
+            weight_path = get_weight_path(self.model_type, self.weight_name)
+            print(f"🔄 Loading {self.model_type} model: {self.weight_name}...")
+            model = load_optimized_model(weight_path, imgsz_values, config.get('backend', BACKEND_PYTORCH),
+                                         self.conf)
+        except Exception as e:
+            import traceback
+            print(f"❌ Failed to load model: {e}")
+            print(traceback.format_exc())
+            self.failed.emit(self.model_type, self.weight_name, str(e))
+            return
+        self.loaded.emit(model, self.model_type, self.weight_name, weight_path)
@@ -0,0 +1,108 @@
+"""
+Motion Gate - Bỏ qua detector khi không có gì chuyển động trong vùng ROI (đèn đỏ dài, ban đêm vắng xe)
+Trừ frame trên ảnh xám thu nhỏ, chỉ tính trong mask làn/zone/stopline của config (CameraConfig.activity_mask)
+"""
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Quyết định frame nào cần chạy detector
+
+    - So frame hiện tại với frame tham chiếu (làm mới mỗi reference_interval giây) → xe chạy chậm
+      vẫn tạo đủ khác biệt, không phụ thuộc FPS
+    - Có chuyển động → mở cổng, giữ mở thêm hold giây sau lần chuyển động cuối
+    - Cổng đóng → vẫn chạy detector mỗi idle_interval giây: tracker giữ được xe đang đứng chờ đèn
+      (ByteTrack chỉ xóa track sau nhiều lần update không khớp) và rule theo thời gian vẫn được chốt
+    """
+
+    def __init__(self, scale: float = 0.25, pixel_threshold: int = 25, motion_ratio: float = 0.002,
+                 hold: float = 2.0, idle_interval: float = 0.5, reference_interval: float = 0.5):
+        """
+        Args:
+            scale: Hệ số thu nhỏ frame trước khi trừ
+            pixel_threshold: Chênh lệch mức xám để tính 1 pixel là thay đổi
+            motion_ratio: Tỉ lệ pixel thay đổi (trong mask) để tính là có chuyển động
+            hold: Giữ cổng mở sau chuyển động cuối (giây video)
+            idle_interval: Chu kỳ chạy detector khi cổng đóng (giây video) - nhỏ hơn thời gian
+                TrackRegistry / PendingVerdictQueue giữ state
+            reference_interval: Chu kỳ làm mới frame tham chiếu (giây video)
+        """
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.motion_ratio = motion_ratio
+        self.hold = hold
+        self.idle_interval = idle_interval
+        self.reference_interval = reference_interval
+        self._mask_source: Optional[np.ndarray] = None
+        self._mask: Optional[np.ndarray] = None
+        self._mask_area = 0
+        self.checked = 0
+        self.gated = 0
+        self.reset()
+
+    def reset(self):
+        """Quên frame tham chiếu (sau seek / quay lại đầu video) - frame kế tiếp luôn được detect"""
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = float('-inf')
+        self._last_motion = float('-inf')
+        self._last_detect = float('-inf')
+        self.motion = 0.0
+
+    def should_detect(self, frame: np.ndarray, media_time: float, mask: Optional[np.ndarray] = None) -> bool:
+        """
+        Args:
+            frame: Frame BGR gốc
+            media_time: Thời điểm frame (giây, thời gian video)
+            mask: Mask vùng ROI kích thước frame (255 = theo dõi), None = cả frame
+
+        Returns:
+            True nếu cần chạy detector cho frame này
+        """
+        self.checked += 1
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        self._update_mask(mask, gray.shape)
+
+        if self._reference is None or self._reference.shape != gray.shape:
+            self._reference, self._reference_time = gray, media_time
+            self._last_motion = media_time  # No reference yet: treat as motion
+        else:
+            _, changed = cv2.threshold(cv2.absdiff(gray, self._reference), self.pixel_threshold, 255,
+                                       cv2.THRESH_BINARY)
+            if self._mask is not None:
+                changed = cv2.bitwise_and(changed, self._mask)
+            self.motion = cv2.countNonZero(changed) / max(1, self._mask_area or changed.size)
+            if self.motion >= self.motion_ratio:
+                self._last_motion = media_time
+            if media_time - self._reference_time >= self.reference_interval:
+                self._reference, self._reference_time = gray, media_time
+
+        if (media_time - self._last_motion <= self.hold
+                or media_time - self._last_detect >= self.idle_interval):
+            self._last_detect = media_time
+            return True
+        self.gated += 1
+        return False
+
+    def _update_mask(self, mask: Optional[np.ndarray], shape):
+        """Thu nhỏ mask ROI (1 lần cho mỗi mask - config đổi thì mask là object mới)"""
+        if mask is self._mask_source:
+            return
+        self._mask_source = mask
+        if mask is None:
+            self._mask, self._mask_area = None, 0
+        else:
+            self._mask = cv2.resize(mask, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+            self._mask_area = cv2.countNonZero(self._mask)
+
+    def stats(self) -> Dict:
+        return {
+            'checked': self.checked,
+            'gated': self.gated,
+            'gated_ratio': round(self.gated / self.checked, 3) if self.checked else 0.0,
+            'motion': round(self.motion, 4),
+        }
@@ -0,0 +1,81 @@
+"""
+Pending Verdicts - Hoãn kết luận vi phạm đèn đỏ đến khi hướng đi của xe đủ tin cậy
+"""
+from typing import Callable, List, Optional, Tuple
+
+
+class PendingVerdict:
+    """Một lần qua stopline đang chờ kết luận"""
+
+    __slots__ = ('track_id', 'cls_id', 'label', 'tl_snapshot', 'frame_index', 'timestamp', 'bbox')
+
+    def __init__(self, track_id: int, cls_id: int, label: str, tl_snapshot: List[Tuple],
+                 frame_index: int, timestamp: float, bbox: Optional[Tuple[int, int, int, int]] = None):
+        self.track_id = track_id
+        self.cls_id = cls_id
+        self.label = label
+        self.tl_snapshot = tl_snapshot  # Trạng thái đèn TẠI THỜI ĐIỂM qua vạch
+        self.frame_index = frame_index
+        self.timestamp = timestamp
+        self.bbox = bbox
+
+
+class PendingVerdictQueue:
+    """
+    Hàng đợi kết luận vi phạm đèn đỏ
+
+    Nguyên lý:
+    - Lúc qua stopline: chụp lại trạng thái đèn, CHƯA kết luận (hướng thường còn 'unknown')
+    - Mỗi frame: xử lý hàng loạt - kết luận khi hướng đã chắc chắn hoặc hết timeout
+    - Kết luận dùng trạng thái đèn đã chụp, không phải đèn hiện tại
+    """
+
+    def __init__(self, timeout: float = 1.5):
+        """
+        Args:
+            timeout: Thời gian chờ tối đa (giây, thời gian video) trước khi buộc kết luận
+        """
+        self.timeout = timeout
+        self._pending: List[PendingVerdict] = []
+
+    def add(self, verdict: PendingVerdict):
+        """Thêm một lần qua vạch vào hàng đợi"""
+        self._pending.append(verdict)
+
+    def resolve(self, timestamp: float,
+                direction_of: Callable[[int], Tuple[str, bool]]) -> List[Tuple[PendingVerdict, str, bool]]:
+        """
+        Lấy ra các verdict đã sẵn sàng kết luận
+
+        Args:
+            timestamp: Thời điểm hiện tại (giây, thời gian video)
+            direction_of: Hàm track_id → (direction, is_confident)
+
+        Returns:
+            List (verdict, direction, timed_out) cho các verdict đã được lấy ra khỏi hàng đợi
+        """
+        if not self._pending:
+            return []
+
+        ready = []
+        still_pending = []
+        for verdict in self._pending:
+            direction, confident = direction_of(verdict.track_id)
+            timed_out = timestamp - verdict.timestamp >= self.timeout
+            if confident or timed_out:
+                ready.append((verdict, direction, timed_out and not confident))
+            else:
+                still_pending.append(verdict)
+
+        self._pending = still_pending
+        return ready
+
+    def is_pending(self, track_id: int) -> bool:
+        return any(v.track_id == track_id for v in self._pending)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def clear(self):
+        """Xóa toàn bộ verdict đang chờ"""
+        self._pending.clear()
@@ -0,0 +1,216 @@
+"""
+Render Worker - Ghép overlay (bbox, stats panel, layer tĩnh) trong thread riêng
+GUI thread chỉ lấy ảnh RGB đã hoàn chỉnh từ FrameExchange và blit
+"""
+import threading
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from core.frame_exchange import FrameExchange
+
+
+class RenderWorker(QThread):
+    """
+    Thread render hiển thị
+
+    Nguyên lý:
+    - VideoThread gọi submit(frame, detections, stats) - chỉ giữ job MỚI NHẤT (latest wins)
+    - Worker resize frame về kích thước hiển thị TRƯỚC, rồi vẽ mọi thứ theo tọa độ hiển thị
+    - Stats panel được render thành patch (premultiplied + alpha) và chỉ vẽ lại khi số liệu đổi
+    - Kết quả: ảnh RGB ghi thẳng vào buffer của exchange (triple buffer, không cấp phát mỗi frame),
+      meta = (frame gốc, dpr) - GUI cần frame gốc cho thao tác vẽ ROI
+    - frame_ready chỉ emit khi GUI đã lấy frame trước → event loop không tích tụ frame cũ
+    - Còn job chờ hoặc ảnh chưa được GUI lấy → is_backlogged() để VideoThread bỏ render
+    """
+
+    frame_ready = pyqtSignal()  # Có frame mới trong exchange
+
+    def __init__(self):
+        super().__init__()
+        self._cond = threading.Condition()
+        self._job = None
+        self._run_flag = True
+
+        # Kích thước label (logical px) + device pixel ratio, do GUI cập nhật
+        self._target = (1024, 768, 1.0)
+
+        # Hàm vẽ các overlay của GUI (layer tĩnh, điểm tạm, TL boxes): fn(scene, display, scale)
+        # scene = snapshot bất biến do GUI thread dựng (set_scene) - worker không đọc state của GUI
+        self.scene_painter = None
+        self._scene = None
+
+        # Display-sized BGR canvas (reused) → RGB straight into an exchange buffer
+        self.exchange = FrameExchange(num_buffers=3)
+        self._display = None
+        self._panel = None
+        self._panel_key = None
+
+        self.rendered = 0
+        self.superseded = 0  # Job bị job mới hơn thay thế trước khi kịp render
+
+    def set_target_size(self, width: int, height: int, dpr: float = 1.0):
+        """Kích thước vùng hiển thị (gọi từ GUI thread khi label đổi kích thước)"""
+        with self._cond:
+            self._target = (max(1, width), max(1, height), dpr)
+
+    def set_scene_painter(self, painter):
+        self.scene_painter = painter
+
+    def set_scene(self, scene):
+        """Snapshot overlay mới (gọi từ GUI thread) - áp dụng từ job kế tiếp, object không được sửa sau đó"""
+        with self._cond:
+            self._scene = scene
+
+    def submit(self, frame: np.ndarray, detections=None, stats=None):
+        """
+        Gửi frame cần hiển thị (không block, job cũ chưa render sẽ bị thay thế)
+
+        Args:
+            frame: Frame BGR gốc - caller không được sửa frame sau khi submit
+            detections: [(x1, y1, x2, y2, color, label_text), ...] theo tọa độ frame, hoặc None
+            stats: Dict số liệu cho stats panel, hoặc None (không vẽ panel)
+        """
+        with self._cond:
+            if self._job is not None:
+                self.superseded += 1
+            self._job = (frame, detections, stats)
+            self._cond.notify()
+
+    def is_backlogged(self) -> bool:
+        """True nếu worker hoặc GUI chưa theo kịp (job cũ chưa render / ảnh cũ GUI chưa lấy)"""
+        with self._cond:
+            if self._job is not None:
+                return True
+        return self.exchange.has_unread()
+
+    def stop(self):
+        """Stop the thread"""
+        with self._cond:
+            self._run_flag = False
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._job is None and self._run_flag:
+                    self._cond.wait()
+                if not self._run_flag:
+                    return
+                job, self._job = self._job, None
+                target = self._target
+                scene = self._scene  # Each job renders with the snapshot current when it was taken
+
+            slot = None
+            try:
+                display = self._render(*job, target, scene)
+                slot = self.exchange.acquire_write(display.shape)
+                if slot is None:
+                    continue
+                cv2.cvtColor(display, cv2.COLOR_BGR2RGB, dst=slot.array)
+            except Exception as e:
+                print(f"⚠️ Render error: {e}")
+                if slot is not None:
+                    self.exchange.cancel_write(slot)
+                continue
+            self.rendered += 1
+            if self.exchange.publish(slot, (job[0], target[2])):
+                self.frame_ready.emit()
+
+    def _render(self, frame, detections, stats, target, scene=None):
+        label_w, label_h, dpr = target
+        frame_h, frame_w = frame.shape[:2]
+        scale = min(label_w / frame_w, label_h / frame_h) * dpr
+        disp_w = max(1, int(frame_w * scale))
+        disp_h = max(1, int(frame_h * scale))
+
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        if self._display is None or self._display.shape != (disp_h, disp_w) + frame.shape[2:]:
+            self._display = np.empty((disp_h, disp_w) + frame.shape[2:], dtype=frame.dtype)
+        display = cv2.resize(frame, (disp_w, disp_h), dst=self._display, interpolation=interpolation)
+
+        if self.scene_painter is not None and scene is not None:
+            self.scene_painter(scene, display, scale)
+
+        if detections:
+            self._draw_detections(display, detections, scale)
+
+        if stats is not None:
+            self._draw_statistics_panel(display, stats)
+
+        return display
+
+    def _draw_detections(self, display, detections, scale):
+        """Draw vehicle boxes (frame coordinates → display coordinates)"""
+        for x1, y1, x2, y2, color, label_text in detections:
+            x1, y1 = int(x1 * scale), int(y1 * scale)
+            x2, y2 = int(x2 * scale), int(y2 * scale)
+            cv2.rectangle(display, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(display, label_text, (x1, y1-5),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+    def _draw_statistics_panel(self, display, stats):
+        """Blend the cached stats panel onto the display (re-rendered only when numbers change)"""
+        key = tuple(sorted(stats.items()))
+        if key != self._panel_key:
+            self._panel = self._render_statistics_panel(stats)
+            self._panel_key = key
+
+        premult, inv_alpha = self._panel
+        panel_x = panel_y = 10
+        h = min(premult.shape[0], display.shape[0] - panel_y)
+        w = min(premult.shape[1], display.shape[1] - panel_x)
+        if h <= 0 or w <= 0:
+            return
+        roi = display[panel_y:panel_y + h, panel_x:panel_x + w]
+        cv2.multiply(roi, inv_alpha[:h, :w], dst=roi, scale=1.0 / 255)
+        cv2.add(roi, premult[:h, :w], dst=roi)
+
+    def _render_statistics_panel(self, stats):
+        """
+        Render statistics panel as a premultiplied patch + inverse alpha
+
+        Returns:
+            (premult, inv_alpha): uint8 (H, W, 3) arrays
+        """
+        panel_width = 550
+        panel_height = 132
+
+        # Semi-transparent background (70%), opaque text
+        canvas = np.full((panel_height, panel_width, 3), (50, 50, 50), dtype=np.uint8)
+        text_mask = np.zeros((panel_height, panel_width), dtype=np.uint8)
+
+        def put(text, x, y, color):
+            for img, c in ((canvas, color), (text_mask, 255)):
+                cv2.putText(img, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.65, c, 2)
+
+        # Row 1: FPS info
+        text_y = 28
+        put(f"Render FPS: {stats['fps']}", 10, text_y, (0, 255, 255))
+        if stats['detection_enabled']:
+            put(f"Detection FPS: {stats['processed_fps']}", 230, text_y, (0, 255, 0))
+
+        # Row 2: Vehicle counts
+        text_y += 32
+        put(f"Xe may: {stats['motorbikes']}", 10, text_y, (255, 255, 255))
+        put(f"O to: {stats['cars']}", 150, text_y, (255, 255, 255))
+        put(f"Total: {stats['total_vehicles']}", 280, text_y, (255, 255, 0))
+
+        # Row 3: Violations
+        text_y += 32
+        put(f"TL Violations: {stats['red_light_violations']}", 10, text_y, (0, 0, 255))
+        put(f"Lane Violations: {stats['lane_violations']}", 280, text_y, (0, 165, 255))
+
+        # Row 4: Lane-direction and speed violations
+        text_y += 32
+        put(f"Wrong Direction: {stats['direction_violations']}", 10, text_y, (0, 128, 255))
+        if stats.get('speed_limit') is not None:
+            put(f"Speed: {stats['speed_violations']} (>{stats['speed_limit']} km/h)",
+                280, text_y, (255, 0, 255))
+
+        alpha = np.where(text_mask > 0, 1.0, 0.7).astype(np.float32)
+        premult = np.clip(canvas * alpha[:, :, None] + 0.5, 0, 255).astype(np.uint8)
+        inv_alpha = np.clip((1 - alpha) * 255 + 0.5, 0, 255).astype(np.uint8)
+        return premult, cv2.merge([inv_alpha, inv_alpha, inv_alpha])
@@ -0,0 +1,194 @@
+"""
+Speed Estimator - Ước lượng tốc độ phương tiện trên mặt phẳng đường
+Dùng ring buffer cố định cho mọi track và tính toán vector hóa mỗi frame
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class SpeedEstimator:
+    """
+    Ước lượng tốc độ (km/h) cho TẤT CẢ track đang active trong một lần tính
+
+    Nguyên lý:
+    - Mỗi track giữ một slot trong ring buffer (history điểm gần nhất, kèm timestamp)
+    - Mỗi frame: chiếu toàn bộ điểm qua homography (pixel → mét) bằng 1 phép nhân ma trận
+    - Vận tốc = hệ số góc least-squares của vị trí theo thời gian (ổn định hơn 2 điểm cuối)
+    - Làm mượt bằng EMA để giảm nhiễu bbox
+
+    Không có homography → dùng hệ số pixel_to_meter cố định (tương thích logic cũ)
+    """
+
+    def __init__(self,
+                 capacity: int = 256,
+                 history: int = 15,
+                 min_samples: int = 8,
+                 min_span: float = 0.4,
+                 smoothing: float = 0.3,
+                 max_age: float = 2.0,
+                 pixel_to_meter: float = 0.05):
+        """
+        Args:
+            capacity: Số track tối đa theo dõi đồng thời
+            history: Số vị trí lưu cho mỗi track
+            min_samples: Số điểm tối thiểu để ước lượng
+            min_span: Khoảng thời gian tối thiểu (giây) giữa điểm đầu và cuối
+            smoothing: Hệ số EMA (0-1), càng lớn càng bám sát giá trị mới
+            max_age: Giải phóng slot nếu track không xuất hiện quá max_age giây
+            pixel_to_meter: Hệ số quy đổi khi chưa có homography
+        """
+        self.capacity = capacity
+        self.history = history
+        self.min_samples = min_samples
+        self.min_span = min_span
+        self.smoothing = smoothing
+        self.max_age = max_age
+        self.pixel_to_meter = pixel_to_meter
+        self.homography: Optional[np.ndarray] = None
+
+        self._pos = np.zeros((capacity, history, 2), dtype=np.float64)
+        self._ts = np.zeros((capacity, history), dtype=np.float64)
+        self._head = np.zeros(capacity, dtype=np.int64)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._last_seen = np.full(capacity, -np.inf)
+        self._smoothed = np.full(capacity, np.nan)
+        self._track_of = np.full(capacity, -1, dtype=np.int64)
+        self._slot_of: Dict[int, int] = {}
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def set_homography(self, homography: Optional[np.ndarray]):
+        """Đặt ma trận homography 3x3 (pixel → mét), None = dùng pixel_to_meter"""
+        self.homography = None if homography is None else np.asarray(homography, dtype=np.float64)
+        # Đổi hệ tọa độ → giá trị EMA cũ không còn ý nghĩa
+        self._smoothed[:] = np.nan
+
+    @property
+    def is_calibrated(self) -> bool:
+        return self.homography is not None
+
+    def update(self, track_ids: Iterable[int], points: Iterable[Tuple[float, float]], timestamp: float):
+        """
+        Ghi vị trí mới của các track trong frame hiện tại vào ring buffer
+
+        Args:
+            track_ids: Danh sách track ID (bỏ qua -1)
+            points: Điểm tham chiếu (x, y) tương ứng - nên là điểm chạm đường (bottom-center)
+            timestamp: Thời điểm của frame (giây, theo thời gian video)
+        """
+        slots = []
+        coords = []
+        for tid, pt in zip(track_ids, points):
+            if tid < 0:
+                continue
+            slot = self._slot_of.get(tid)
+            if slot is None:
+                slot = self._allocate(tid, timestamp)
+                if slot is None:
+                    continue  # More tracks in this frame than capacity
+            # Mark as used now: eviction must never pick a slot already taken in this batch
+            self._last_seen[slot] = timestamp
+            slots.append(slot)
+            coords.append(pt)
+
+        if slots:
+            rows = np.asarray(slots, dtype=np.int64)
+            cols = self._head[rows]
+            self._pos[rows, cols] = np.asarray(coords, dtype=np.float64)
+            self._ts[rows, cols] = timestamp
+            self._head[rows] = (cols + 1) % self.history
+            self._count[rows] = np.minimum(self._count[rows] + 1, self.history)
+            self._last_seen[rows] = timestamp
+
+        self._expire(timestamp)
+
+    def estimate_speeds(self, timestamp: float) -> Dict[int, float]:
+        """
+        Tính tốc độ đã làm mượt cho mọi track được cập nhật tại timestamp
+
+        Returns:
+            Dict {track_id: speed_kmh}
+        """
+        idx = np.nonzero((self._last_seen == timestamp) & (self._count >= self.min_samples))[0]
+        if idx.size == 0:
+            return {}
+
+        n = idx.size
+        pos = self._pos[idx].reshape(-1, 2)
+        ts = self._ts[idx]
+        valid = np.arange(self.history)[None, :] < self._count[idx][:, None]
+
+        # Pixel → mét cho toàn bộ điểm trong 1 phép tính
+        if self.homography is not None:
+            hom = pos @ self.homography[:, :2].T + self.homography[:, 2]
+            world = (hom[:, :2] / hom[:, 2:3]).reshape(n, self.history, 2)
+        else:
+            world = pos.reshape(n, self.history, 2) * self.pixel_to_meter
+
+        # Least-squares slope: v = Σw(t-t̄)(p-p̄) / Σw(t-t̄)²
+        w = valid.astype(np.float64)
+        w_sum = w.sum(axis=1)
+        t_mean = (w * ts).sum(axis=1) / w_sum
+        dt = (ts - t_mean[:, None]) * w
+        p_mean = (w[:, :, None] * world).sum(axis=1) / w_sum[:, None]
+        dp = world - p_mean[:, None, :]
+        denom = (dt * dt).sum(axis=1)
+
+        t_min = np.where(valid, ts, np.inf).min(axis=1)
+        span = timestamp - t_min
+        ok = (denom > 1e-9) & (span >= self.min_span)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vel = (dt[:, :, None] * dp).sum(axis=1) / denom[:, None]
+        speed = np.hypot(vel[:, 0], vel[:, 1]) * 3.6
+
+        prev = self._smoothed[idx]
+        smoothed = np.where(np.isnan(prev), speed, self.smoothing * speed + (1 - self.smoothing) * prev)
+        self._smoothed[idx[ok]] = smoothed[ok]
+
+        track_ids = self._track_of[idx[ok]]
+        return dict(zip(track_ids.tolist(), smoothed[ok].tolist()))
+
+    def get_speed(self, track_id: int) -> Optional[float]:
+        """Lấy tốc độ đã làm mượt gần nhất của track (km/h) hoặc None"""
+        slot = self._slot_of.get(track_id)
+        if slot is None or np.isnan(self._smoothed[slot]):
+            return None
+        return float(self._smoothed[slot])
+
+    def _allocate(self, track_id: int, timestamp: float) -> Optional[int]:
+        """Cấp slot cho track mới (thu hồi slot cũ nhất nếu đầy); None nếu mọi slot đều đang dùng ở frame này"""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = int(np.argmin(self._last_seen))
+            if self._last_seen[slot] >= timestamp:
+                return None
+            del self._slot_of[int(self._track_of[slot])]
+
+        self._slot_of[track_id] = slot
+        self._track_of[slot] = track_id
+        self._head[slot] = 0
+        self._count[slot] = 0
+        self._smoothed[slot] = np.nan
+        return slot
+
+    def _expire(self, timestamp: float):
+        """Giải phóng slot của track đã mất quá max_age giây"""
+        stale = np.nonzero((self._track_of >= 0) & (self._last_seen < timestamp - self.max_age))[0]
+        for slot in stale.tolist():
+            del self._slot_of[int(self._track_of[slot])]
+            self._track_of[slot] = -1
+            self._last_seen[slot] = -np.inf
+            self._count[slot] = 0
+            self._free.append(slot)
+
+    def clear(self):
+        """Xóa toàn bộ dữ liệu tốc độ"""
+        self._slot_of.clear()
+        self._track_of[:] = -1
+        self._head[:] = 0
+        self._count[:] = 0
+        self._last_seen[:] = -np.inf
+        self._smoothed[:] = np.nan
+        self._free = list(range(self.capacity - 1, -1, -1))
@@ -0,0 +1,92 @@
+"""
+Track Registry - Lưu trạng thái theo từng track (tính một lần, dùng lại mọi frame)
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class TrackRecord:
+    """Trạng thái đã cache của một track"""
+
+    __slots__ = (
+        'track_id', 'cls_id', 'first_seen', 'last_seen',
+        'entry_zone', 'lane_direction_checked', 'crossing_point',
+        'fused_direction', 'fused_source', 'fused_conflict', 'fused_confidence',
+        'fused_anchor', 'direction_frozen',
+    )
+
+    def __init__(self, track_id: int, cls_id: int, timestamp: float):
+        self.track_id = track_id
+        self.cls_id = cls_id
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+
+        # Direction zone lúc xe đi vào (index trong DIRECTION_ROIS), None = chưa gán
+        self.entry_zone: Optional[int] = None
+        # Luật lane-direction đã được đánh giá cho track này chưa
+        self.lane_direction_checked = False
+        # Vị trí (cx, cy) lúc qua stopline, None = chưa qua
+        self.crossing_point: Optional[Tuple[int, int]] = None
+
+        # Hướng đã fusion (ROI + trajectory) - chỉ tính lại khi xe di chuyển đủ xa
+        self.fused_direction = 'unknown'
+        self.fused_source = 'none'
+        self.fused_conflict = False
+        self.fused_confidence = 0.0
+        self.fused_anchor: Optional[Tuple[int, int]] = None  # Vị trí lúc tính gần nhất
+        self.direction_frozen = False  # True = hướng đã chốt, không tính lại nữa
+
+
+class TrackRegistry:
+    """Quản lý TrackRecord cho các track đang active"""
+
+    def __init__(self, max_age: float = 2.0):
+        """
+        Args:
+            max_age: Xóa record nếu track không xuất hiện quá max_age giây (thời gian video)
+        """
+        self.max_age = max_age
+        self.records: Dict[int, TrackRecord] = {}
+
+    def touch(self, track_id: int, cls_id: int, timestamp: float) -> TrackRecord:
+        """Lấy (hoặc tạo) record của track và cập nhật thời điểm thấy gần nhất"""
+        record = self.records.get(track_id)
+        if record is None:
+            record = TrackRecord(track_id, cls_id, timestamp)
+            self.records[track_id] = record
+        else:
+            record.last_seen = timestamp
+        return record
+
+    def get(self, track_id: int) -> Optional[TrackRecord]:
+        return self.records.get(track_id)
+
+    def prune(self, timestamp: float) -> List[TrackRecord]:
+        """
+        Xóa record của các track đã biến mất
+        
+        Returns:
+            List record vừa bị xóa (để chốt luật còn dở và các module khác giải phóng dữ liệu)
+        """
+        cutoff = timestamp - self.max_age
+        stale = [rec for rec in self.records.values() if rec.last_seen < cutoff]
+        for rec in stale:
+            del self.records[rec.track_id]
+        return stale
+
+    def reset_zone_assignments(self):
+        """Gán lại zone cho mọi track (gọi khi direction zones thay đổi)"""
+        for record in self.records.values():
+            record.entry_zone = None
+            record.lane_direction_checked = False
+            record.fused_anchor = None
+            record.direction_frozen = False
+
+    def __iter__(self) -> Iterator[TrackRecord]:
+        return iter(self.records.values())
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def clear(self):
+        """Xóa toàn bộ record"""
+        self.records.clear()
@@ -141,6 +141,12 @@ class VehicleTracker:
         self.ref_angle = ref_angle
         print(f"🧭 VehicleTracker: Updated ref_angle = {ref_angle:.1f}°")
     
+    def remove_track(self, track_id: int):
+        """Xóa dữ liệu của một track đã biến mất"""
+        self.positions.pop(track_id, None)
+        self.directions.pop(track_id, None)
+        self.stopline_start_positions.pop(track_id, None)
+    
     def clear(self):
         """Xóa toàn bộ tracking data"""
         self.positions.clear()
@@ -2,22 +2,48 @@
 Video Thread - Xử lý video và detection trong background thread
 """
 import cv2
-import numpy as np
+import threading
 import time
 from PyQt5.QtCore import QThread, pyqtSignal
 
-from core import VehicleTracker, ViolationDetector, StopLineManager, TrafficLightManager
+from core import VehicleTracker, ViolationDetector, StopLineManager, TrafficLightManager, SpeedEstimator, TrackRegistry
+from core.camera_config import CameraConfig
+from core.direction_fusion import DirectionFusion
+from core.trajectory_direction_analyzer import TrajectoryDirectionAnalyzer
+from core.pending_verdicts import PendingVerdict, PendingVerdictQueue
+from core.event_log import (EventLog, REASON_CROSSING, REASON_RED_LIGHT, REASON_LANE,
+                            REASON_SPEED, REASON_LANE_DIRECTION)
+from core.evidence_recorder import EvidenceRecorder
+from core.model_loader import transfer_tracker_state, export_tracker_state, restore_tracker_state
+from utils.image_encoder import ImageEncodePool
+from utils.shared_frame_pool import SharedFrameCapture
+from utils.stream_capture import StreamCapture, is_stream_source
+from utils.video_utils import save_frame
+
+
+# Backward-compat global sets mirrored from the OOP modules (keyed by track id)
+_GLOBAL_SETS = ('VIOLATOR_TRACK_IDS', 'RED_LIGHT_VIOLATORS', 'LANE_VIOLATORS',
+                'PASSED_VEHICLES', 'MOTORBIKE_COUNT', 'CAR_COUNT')
+
+# Rule/tracking modules saved as-is in a checkpoint (all plain data, no threads or locks)
+_CHECKPOINT_MODULES = ('vehicle_tracker', 'violation_detector', 'speed_estimator', 'track_registry',
+                       'pending_verdicts', 'trajectory_analyzer')
 
 
 class VideoThread(QThread):
     """Thread xử lý video và YOLO detection"""
     
-    change_pixmap_signal = pyqtSignal(np.ndarray)
     error_signal = pyqtSignal(str)
     
-    def __init__(self, video_path):
+    def __init__(self, video_path, name=None):
+        """
+        Args:
+            video_path: Video file or stream URL
+            name: Source name used for the event log and evidence folders (default: video_path)
+        """
         super().__init__()
         self.video_path = video_path
+        self.source_name = name or video_path
         self._run_flag = True
         self.model = None
         self.detection_enabled = False
@@ -26,6 +52,11 @@ class VideoThread(QThread):
         self.frame_count = 0
         self.fps_start_time = None
         self.realtime_mode = True  # Toggle realtime sync
+        self.loop_video = True  # False = stop at the end of the video (offline/headless runs)
+        self.decode_process = False  # Decode in a separate process, frames via shared memory (headless only)
+        self.live_stream = None  # Live camera (reconnect, latest frame only); None = auto for stream URLs
+        self._capture = None
+        self._stream_origin = None
         self.target_display_fps = 30  # Limit display FPS to reduce CPU usage
         
         # Model config (will be set by MainWindow)
@@ -36,11 +67,81 @@ class VideoThread(QThread):
         self.processed_count = 0
         self.skipped_frames = 0  # Frames skipped in realtime mode
         
+        # Media clock (video time, independent of processing speed)
+        self.video_fps = 30.0
+        self.frame_index = -1  # Index of the frame currently being processed
+        self.media_time = 0.0  # Seconds since start of video
+        
+        # Offline jobs: process only [start_time, end_time) and checkpoint progress (set_time_range/checkpoint)
+        self.start_time = None
+        self.end_time = None
+        self.checkpoint = None  # JobCheckpoint - resume after a crash instead of restarting from frame 0
+        self._checkpoint_error_reported = False
+        self.track_observer = None  # Called with (frame_index, vehicles) after tracking (chunk stitching)
+        self.checkpoint_extras = {}  # Caller data (plain, picklable) saved and restored with the checkpoint
+        self.motion_gate = None  # MotionGate - skip/throttle the detector while nothing moves in the ROI
+        
         # Initialize OOP modules
         self.vehicle_tracker = VehicleTracker(time_window=1.0, min_distance=20.0)
         self.violation_detector = ViolationDetector()
         self.stopline_manager = StopLineManager()
         self.traffic_light_manager = TrafficLightManager()
+        self.speed_estimator = SpeedEstimator()
+        self.speed_limit = 50  # km/h, only enforced once ground calibration is set
+        self.track_registry = TrackRegistry()
+        self.direction_fusion = DirectionFusion()
+        self.trajectory_analyzer = TrajectoryDirectionAnalyzer(history_size=15, min_points=5)
+        
+        # Fused direction cache: recompute only after the track moved this far (pixels),
+        # freeze once confident and this far past the stopline
+        self.fusion_move_threshold = 8.0
+        self.fusion_freeze_confidence = 0.8
+        self.fusion_freeze_distance = 60.0
+        
+        # Red-light verdicts are deferred until the direction is confident (or timeout)
+        self.pending_verdicts = PendingVerdictQueue(timeout=1.5)
+        
+        # Persistent crossing/violation log (written by a background thread)
+        self.event_log = EventLog(EventLog.default_path(self.source_name), source=self.source_name)
+        
+        # Shared JPEG encoder for evidence frames, crops and snapshots (never blocks the loop)
+        self.image_encoder = ImageEncodePool(workers=2, max_queue=16)
+        
+        # Violation evidence: JPEG ring buffer (memory-capped) + async clip/crop writer
+        self.evidence_recorder = EvidenceRecorder(EvidenceRecorder.default_dir(self.source_name),
+                                                  encoder=self.image_encoder)
+        
+        # Optional periodic scene snapshots (seconds of video time, 0 = off)
+        self.snapshot_interval = 0.0
+        self.snapshot_dir = EvidenceRecorder.default_dir(self.source_name) / "snapshots"
+        self._last_snapshot_time = float('-inf')
+        
+        # Display rendering happens in a RenderWorker; this thread only publishes detections
+        self.render_worker = None
+        self._frame_detections = None
+        self._frame_detections_index = -1
+        
+        # Rendering is an optional stage: off when headless or the window is hidden,
+        # skipped while the display lags behind (the pipeline never waits for it)
+        self.render_enabled = True
+        self.render_skipped = 0
+        self._render_frame = False
+        
+        # TL colors are tracked here (not in the display path) so headless runs see them too
+        self.tl_color_interval = 10
+        self._tl_color_countdown = 0
+        
+        # Compiled ROI config - the only config the pipeline reads (swapped at a frame boundary)
+        self.camera_config = CameraConfig()
+        self._pending_config = None
+        self.tl_colors = []  # Current color of each config.traffic_lights entry
+        self._tl_snapshot = []  # [(x1, y1, x2, y2, tl_type, color)] - format of the TL rules/event log
+        self._config_watcher = None  # Hot reload of the config file (watch_config_file)
+        self._load_config = None
+        
+        # Model swap requested from another thread, applied at the next frame boundary
+        self._pending_model = None  # (model, model_config, reset_tracks)
+        self._model_lock = threading.Lock()
         
         # Reference to global state (will be set externally)
         self.globals_ref = None
@@ -49,6 +150,62 @@ class VideoThread(QThread):
         """Set reference to global state dictionary"""
         self.globals_ref = globals_dict
     
+    def set_render_worker(self, render_worker):
+        """Set RenderWorker that composes and hands display frames to the GUI (None = no display)"""
+        self.render_worker = render_worker
+    
+    def set_render_enabled(self, enabled: bool):
+        """Turn display rendering on/off (e.g. window minimized or headless run)"""
+        if enabled != self.render_enabled:
+            self.render_enabled = enabled
+            print(f"🖼️ VideoThread: Rendering {'enabled' if enabled else 'disabled'}")
+    
+    def set_camera_config(self, config: CameraConfig):
+        """Use a compiled config (safe from any thread: applied before the next frame)"""
+        self._pending_config = config
+        if not self.isRunning():
+            self._apply_pending_config()
+    
+    def watch_config_file(self, watcher, load_config):
+        """Hot reload while running: load_config(path) -> CameraConfig (None = keep the current one)
+        
+        The file is loaded and compiled on the watcher thread; only the swap happens on this thread.
+        """
+        self._config_watcher = watcher
+        self._load_config = load_config
+    
+    def _reload_config(self, path):
+        try:
+            config = self._load_config(path)
+        except ValueError as e:  # ConfigError - keep running with the current config
+            print(f"⚠️ Config reload rejected ({path}): {e}")
+            return
+        if config is not None:
+            print(f"🔄 Config changed on disk, applying at the next frame: {path}")
+            self.set_camera_config(config)
+    
+    def _apply_pending_config(self):
+        config, self._pending_config = self._pending_config, None
+        if config is None:
+            return
+        previous = self.camera_config
+        config.reuse_derived(previous)  # Only what changed gets rebuilt (label map, TL slices...)
+        self.camera_config = config
+        
+        if config.reference_angle is not None and config.reference_angle != previous.reference_angle:
+            self.set_reference_angle(config.reference_angle)
+        if (config.ground_calibration != previous.ground_calibration
+                or config.speed_limit_kmh != previous.speed_limit_kmh):
+            self.set_ground_calibration(config.homography, config.speed_limit_kmh)
+        if config.direction_zones != previous.direction_zones:
+            self.track_registry.reset_zone_assignments()
+        
+        # Keep the last known color of lights whose ROI didn't change
+        known = dict(zip(previous.tl_geometry, self.tl_colors))
+        self.tl_colors = [known.get(geometry, 'unknown') for geometry in config.tl_geometry]
+        self._tl_snapshot = [geometry + (color,) for geometry, color in zip(config.tl_geometry, self.tl_colors)]
+        self._tl_color_countdown = 0
+    
     def set_reference_angle(self, ref_angle: float):
         """Update reference angle for direction detection
         
@@ -56,17 +213,70 @@ class VideoThread(QThread):
             ref_angle: Reference angle in degrees (-180 to 180) for straight direction
         """
         self.vehicle_tracker.set_ref_angle(ref_angle)
+        self.trajectory_analyzer.set_reference_vector_from_angle(ref_angle)
         print(f"🧭 VideoThread: Reference angle set to {ref_angle:.1f}°")
     
+    def set_ground_calibration(self, homography, speed_limit: float = 50):
+        """Update ground-plane homography used for speed estimation
+        
+        Args:
+            homography: 3x3 image → ground (meters) matrix, or None to disable the speed rule
+            speed_limit: Speed limit in km/h for this camera
+        """
+        self.speed_estimator.set_homography(homography)
+        self.speed_limit = speed_limit
+        if homography is None:
+            print("📏 VideoThread: Ground calibration cleared - speed rule disabled")
+        else:
+            print(f"📏 VideoThread: Ground calibration set - speed limit {speed_limit} km/h")
+    
+    def _open_capture(self):
+        """cv2.VideoCapture, a StreamCapture for live cameras, or a SharedFrameCapture when decoding in a
+        separate process
+
+        Shared-memory frames are only valid until the next read, so the decoder process is used
+        only when nothing keeps frames around (no render worker) and no seek is needed (no looping)
+        """
+        live = is_stream_source(self.video_path) if self.live_stream is None else self.live_stream
+        if live:
+            return StreamCapture(self.video_path)
+        if self.decode_process and self.render_worker is None and not self.loop_video:
+            return SharedFrameCapture(self.video_path)
+        if self.decode_process:
+            print("ℹ️ VideoThread: decode_process ignored (needs no display and no looping)")
+        return cv2.VideoCapture(self.video_path)
+    
+    def stream_health(self):
+        """Health metrics of the live stream (None for files)"""
+        cap = self._capture
+        return cap.health() if isinstance(cap, StreamCapture) else None
+    
+    def _advance_clock(self, cap, live):
+        """Next frame: media time from the capture timestamp for live streams, from the frame index otherwise"""
+        self.frame_count += 1
+        self.frame_index += 1
+        if live:
+            if self._stream_origin is None:
+                self._stream_origin = cap.timestamp
+            self.media_time = cap.timestamp - self._stream_origin
+        else:
+            self.media_time = self.frame_index / self.video_fps
+    
     def run(self):
         """Main video processing loop"""
-        cap = cv2.VideoCapture(self.video_path)
+        cap = self._capture = self._open_capture()
+        live = isinstance(cap, StreamCapture)
+        self._stream_origin = None
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
         self.fps_start_time = time.time()
         
         # Get video FPS
         video_fps = cap.get(cv2.CAP_PROP_FPS)
         if video_fps == 0:
             video_fps = 30
+        self.video_fps = video_fps
+        self.evidence_recorder.fps = video_fps
         
         frame_interval = 1.0 / video_fps
         next_frame_time = time.time()
@@ -75,19 +285,47 @@ class VideoThread(QThread):
         print(f"⏱️ Realtime mode: {'ON (may skip frames)' if self.realtime_mode else 'OFF (process all frames)'}")
         print(f"🎯 Target display FPS: {self.target_display_fps}")
         
+        # Where to start: checkpoint of an interrupted run, else the start of the time range
+        end_frame = None if self.end_time is None else int(round(self.end_time * video_fps))
+        start_frame = 0 if self.start_time is None else int(round(self.start_time * video_fps))
+        resumed = self.checkpoint.load() if self.checkpoint is not None else None
+        if resumed is not None and not self._restore_checkpoint(resumed):
+            resumed = None
+        if resumed is not None:
+            start_frame = self.frame_index + 1
+        elif start_frame > 0:
+            self.frame_index = start_frame - 1
+            self.media_time = self.frame_index / video_fps
+        if start_frame > 0 and not live:
+            self._seek(cap, start_frame)
+        completed = False
+        
+        self.event_log.start()
+        if self._config_watcher is not None:
+            self._config_watcher.start(self._reload_config)
+        
         # Display frame interval for limiting GUI updates
         display_interval = 1.0 / self.target_display_fps
         last_display_time = 0
         
         while self._run_flag:
+            if self._pending_model is not None:
+                self._apply_pending_model()
+            if self._pending_config is not None:
+                self._apply_pending_config()
+            if end_frame is not None and self.frame_index + 1 >= end_frame:
+                completed = True
+                break
+            if self.checkpoint is not None and self.checkpoint.due(self.media_time):
+                self._save_checkpoint()
             current_time = time.time()
             
-            if self.realtime_mode:
-                # REALTIME MODE: Skip frames to match real-time
+            if self.realtime_mode and not live:
+                # REALTIME MODE: Skip frames to match real-time (live streams already drop stale frames)
                 if current_time >= next_frame_time:
                     ret, frame = cap.read()
                     if ret:
-                        self.frame_count += 1
+                        self._advance_clock(cap, live)
                         
                         # Track FPS
                         if time.time() - self.fps_start_time >= 1.0:
@@ -99,7 +337,17 @@ class VideoThread(QThread):
                             self.skipped_frames = 0
                             self.fps_start_time = time.time()
                         
-                        if self.detection_enabled and self.model is not None and self.model_loaded:
+                        self._update_tl_colors(frame)
+                        
+                        # Only emit to GUI at target display FPS to reduce CPU
+                        # (decided before detection so unrendered frames skip building overlays)
+                        self._render_frame = self._render_due(current_time - last_display_time >= display_interval)
+                        
+                        detection_active = self.detection_enabled and self.model is not None and self.model_loaded
+                        if detection_active:
+                            # Clean frame into the evidence ring before the motion gate: clips stay continuous
+                            self.evidence_recorder.push_frame(frame, self.frame_index, self.media_time)
+                        if detection_active and self._detection_due(frame):
                             try:
                                 frame = self.process_detection(frame)
                                 self.processed_count += 1  # Count actual detections
@@ -108,9 +356,8 @@ class VideoThread(QThread):
                                 self.error_signal.emit(str(e))
                                 self.detection_enabled = False
                         
-                        # Only emit to GUI at target display FPS to reduce CPU
-                        if current_time - last_display_time >= display_interval:
-                            self.change_pixmap_signal.emit(frame)
+                        if self._render_frame:
+                            self._publish_frame(frame)
                             last_display_time = current_time
                         
                         next_frame_time += frame_interval
@@ -118,11 +365,14 @@ class VideoThread(QThread):
                         # If falling behind, reset
                         if next_frame_time < current_time:
                             next_frame_time = current_time + frame_interval
-                    else:
+                    elif self.loop_video:
                         # Video ended, loop back
                         cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                         self._clear_all_state()
                         next_frame_time = time.time()
+                    else:
+                        completed = True
+                        break
                 else:
                     self.skipped_frames += 1  # Count skipped frames
                     # ⚠️ PERFORMANCE: Sleep 10ms instead of 1ms to reduce CPU spin
@@ -131,7 +381,7 @@ class VideoThread(QThread):
                 # FULL PROCESSING MODE: Process every frame (no skip)
                 ret, frame = cap.read()
                 if ret:
-                    self.frame_count += 1
+                    self._advance_clock(cap, live)
                     
                     # Track FPS
                     if time.time() - self.fps_start_time >= 1.0:
@@ -142,7 +392,16 @@ class VideoThread(QThread):
                         self.processed_count = 0
                         self.fps_start_time = time.time()
                     
-                    if self.detection_enabled and self.model is not None and self.model_loaded:
+                    self._update_tl_colors(frame)
+                    
+                    # Only emit to GUI at target display FPS
+                    self._render_frame = self._render_due(current_time - last_display_time >= display_interval)
+                    
+                    detection_active = self.detection_enabled and self.model is not None and self.model_loaded
+                    if detection_active:
+                        # Clean frame into the evidence ring before the motion gate: clips stay continuous
+                        self.evidence_recorder.push_frame(frame, self.frame_index, self.media_time)
+                    if detection_active and self._detection_due(frame):
                         try:
                             frame = self.process_detection(frame)
                             self.processed_count += 1  # Count actual detections
@@ -151,25 +410,141 @@ class VideoThread(QThread):
                             self.error_signal.emit(str(e))
                             self.detection_enabled = False
                     
-                    # Only emit to GUI at target display FPS
-                    if current_time - last_display_time >= display_interval:
-                        self.change_pixmap_signal.emit(frame)
+                    if self._render_frame:
+                        self._publish_frame(frame)
                         last_display_time = current_time
                     
-                    # ⚠️ PERFORMANCE: Small sleep to yield CPU
-                    self.msleep(5)
-                else:
+                    # ⚠️ PERFORMANCE: Small sleep to yield CPU (to the GUI - not needed when nothing is shown)
+                    if self.render_enabled and not live:
+                        self.msleep(5)
+                elif live:
+                    continue  # No frame within read_timeout - StreamCapture keeps reconnecting
+                elif self.loop_video:
                     # Video ended, loop back
                     cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                     self._clear_all_state()
+                else:
+                    completed = True
+                    break
             
         cap.release()
+        self._capture = None
+        if self._config_watcher is not None:
+            self._config_watcher.stop()
+        if self.checkpoint is not None:
+            if completed:
+                self.checkpoint.remove()  # Job done - the next run starts over
+                print(f"🏁 Job complete, checkpoint removed ({self.checkpoint.saves} saved during the run)")
+            else:
+                self._save_checkpoint()  # Stopped/preempted - resume from here next time
+        self.evidence_recorder.close()
+        self.image_encoder.close()
+        self.event_log.close()
+        print(f"🖼️ Encoder stats: {self.image_encoder.stats()}")
+        if self.render_skipped:
+            print(f"🖼️ Render skipped: {self.render_skipped} frames (hidden, headless or display behind)")
+        if self.motion_gate is not None:
+            print(f"💤 Motion gate: {self.motion_gate.stats()}")
+    
+    def set_time_range(self, start_time=None, end_time=None):
+        """Process only [start_time, end_time) seconds of the video (None = from the start / to the end)"""
+        self.start_time = start_time
+        self.end_time = end_time
+    
+    def _seek(self, cap, frame_index):
+        """Position the capture so the next read returns frame_index (decodes forward if seeking fails)"""
+        if cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index) and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index:
+            return
+        print(f"⏩ Seek not supported by this capture - decoding forward to frame {frame_index}")
+        grab = cap.grab if hasattr(cap, 'grab') else (lambda: cap.read()[0])
+        for _ in range(frame_index):
+            if not self._run_flag or not grab():
+                break
+    
+    def _save_checkpoint(self):
+        """Save progress at a frame boundary; skipped if the event log can't be flushed (offset would be wrong)"""
+        if not self.event_log.flush():
+            if self.event_log.error is None:
+                print("⚠️ Checkpoint skipped: event log did not flush in time")
+            elif not self._checkpoint_error_reported:
+                # Writer is gone for good: every later checkpoint would be skipped the same way
+                self._checkpoint_error_reported = True
+                print(f"❌ Checkpointing disabled for this run - event log writer failed: {self.event_log.error}")
+            return
+        state = {
+            'source': self.source_name,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'frame_index': self.frame_index,
+            'media_time': self.media_time,
+            'event_id': self.event_log.last_event_id(),
+            'modules': {name: getattr(self, name) for name in _CHECKPOINT_MODULES},
+            'globals': {key: set(self.globals_ref[key]) for key in _GLOBAL_SETS} if self.globals_ref else {},
+            'tl_colors': (self.camera_config.tl_geometry, list(self.tl_colors)),
+            'last_snapshot_time': self._last_snapshot_time,
+            'tracker': export_tracker_state(self.model) if self.model is not None else None,
+            'extras': self.checkpoint_extras,
+        }
+        if self.checkpoint.save(state):
+            print(f"💾 Checkpoint saved at frame {self.frame_index} ({self.media_time:.1f}s)")
+    
+    def _restore_checkpoint(self, state):
+        """Restore a saved checkpoint before the first frame; False if it belongs to another job"""
+        if (state['source'], state['start_time'], state['end_time']) != (self.source_name, self.start_time,
+                                                                          self.end_time):
+            print(f"⚠️ Checkpoint {self.checkpoint.path} is for another job - ignored")
+            return False
+        
+        for name, module in state['modules'].items():
+            setattr(self, name, module)
+        # The restored modules carry the settings of the interrupted run - the current config wins
+        config = self.camera_config
+        if config.reference_angle is not None:
+            self.set_reference_angle(config.reference_angle)
+        self.set_ground_calibration(config.homography, config.speed_limit_kmh)
+        if self.globals_ref:
+            for key, values in state['globals'].items():
+                self.globals_ref[key].clear()
+                self.globals_ref[key].update(values)
+        geometry, colors = state['tl_colors']
+        if geometry == self.camera_config.tl_geometry:
+            self.tl_colors = colors
+            self._tl_snapshot = [g + (color,) for g, color in zip(geometry, colors)]
+        self._last_snapshot_time = state['last_snapshot_time']
+        self.checkpoint_extras.update(state.get('extras', {}))
+        self.frame_index = state['frame_index']
+        self.media_time = state['media_time']
+        
+        # Same track ids as before the interruption, or start the tracks over (like a model swap)
+        tracker = state['tracker']
+        if tracker is not None and (self.model is None or not restore_tracker_state(self.model, tracker)):
+            print("⚠️ Tracker state not restored - tracks restart from here")
+            self._reset_track_state()
+        
+        # Events logged after the checkpoint will be produced again
+        removed = self.event_log.truncate_after(state['event_id'])
+        print(f"♻️ Resuming {self.source_name} from frame {self.frame_index + 1} ({self.media_time:.1f}s)"
+              f"{f', {removed} later events removed' if removed else ''}")
+        return True
     
     def _clear_all_state(self):
         """Clear all tracking and violation state"""
         # Clear OOP modules
         self.vehicle_tracker.clear()
         self.violation_detector.clear()
+        self.speed_estimator.clear()
+        self.track_registry.clear()
+        self.pending_verdicts.clear()
+        self.evidence_recorder.reset()
+        self._last_snapshot_time = float('-inf')
+        self.trajectory_analyzer.trajectories.clear()
+        self.trajectory_analyzer.cached_directions.clear()
+        self.frame_index = -1
+        self._frame_detections_index = -1
+        self._tl_color_countdown = 0
+        self.media_time = 0.0
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
         
         # Also clear global sets for backward compatibility
         if self.globals_ref:
@@ -180,12 +555,76 @@ class VideoThread(QThread):
             self.globals_ref['MOTORBIKE_COUNT'].clear()
             self.globals_ref['CAR_COUNT'].clear()
     
+    def _reset_track_state(self):
+        """Forget everything keyed by track id (tracker ids restart), keep the media clock and event log"""
+        self.vehicle_tracker.clear()
+        self.violation_detector.clear()
+        self.speed_estimator.clear()
+        self.track_registry.clear()
+        self.pending_verdicts.clear()
+        self.trajectory_analyzer.trajectories.clear()
+        self.trajectory_analyzer.cached_directions.clear()
+        self._frame_detections_index = -1
+        
+        if self.globals_ref:
+            for key in _GLOBAL_SETS:
+                self.globals_ref[key].clear()
+    
     def set_model(self, model):
         """Set pre-loaded model from main thread"""
         self.model = model
         self.model_loaded = True
         print("✅ Model set in thread")
     
+    def request_model_swap(self, model, model_config=None, reset_tracks=False):
+        """
+        Replace the model between two frames (safe to call from any thread while running)
+        
+        Args:
+            model: Loaded (and warmed-up) YOLO model
+            model_config: New model config (None = keep current)
+            reset_tracks: True = start tracking from scratch; False = keep ByteTrack state so
+                          track ids and per-track rule state carry over to the new model
+        """
+        with self._model_lock:
+            self._pending_model = (model, model_config, reset_tracks)
+        if not self.isRunning():
+            self._apply_pending_model()
+    
+    def _apply_pending_model(self):
+        with self._model_lock:
+            pending, self._pending_model = self._pending_model, None
+        if pending is None:
+            return
+        model, model_config, reset_tracks = pending
+        
+        if not reset_tracks and self.model is not None and not transfer_tracker_state(self.model, model):
+            reset_tracks = True  # New tracker will hand out fresh ids - old per-track state is meaningless
+        if reset_tracks:
+            self._reset_track_state()
+        
+        self.model = model
+        if model_config is not None:
+            self.model_config = model_config
+        self.model_loaded = True
+        print(f"🔁 Model swapped at frame {self.frame_index + 1} "
+              f"({'tracks reset' if reset_tracks else 'tracks kept'})")
+    
+    def _detection_due(self, frame):
+        """Motion gate: False = nothing moves in the lanes/stopline area, skip the detector on this frame
+        
+        The gate still lets a frame through every idle_interval so ByteTrack keeps the waiting vehicles
+        and time-based rules (pending verdicts, track pruning) keep resolving.
+        """
+        if self.motion_gate is None:
+            return True
+        mask = self.camera_config.activity_mask(frame.shape)
+        if self.motion_gate.should_detect(frame, self.media_time, mask):
+            return True
+        if self._frame_detections_index == self.frame_index - 1:
+            self._frame_detections_index = self.frame_index  # Nothing moved: keep showing the last boxes
+        return False
+    
     def process_detection(self, frame):
         """Process YOLO detection on frame"""
         if not self.globals_ref:
@@ -194,12 +633,14 @@ class VideoThread(QThread):
         # Get global state references
         ALLOWED_VEHICLE_IDS = self.globals_ref['ALLOWED_VEHICLE_IDS']
         VEHICLE_CLASSES = self.globals_ref['VEHICLE_CLASSES']
-        LANE_CONFIGS = self.globals_ref['LANE_CONFIGS']
-        TL_ROIS = self.globals_ref['TL_ROIS']
         # Don't cache _show_all_boxes - read it fresh each time to get latest value
-        is_on_stop_line = self.globals_ref['is_on_stop_line']
         check_tl_violation = self.globals_ref['check_tl_violation']
-        point_in_polygon = self.globals_ref['point_in_polygon']
+        check_speed_violation = self.globals_ref.get('check_speed_violation')
+        check_lane_direction_match = self.globals_ref.get('check_lane_direction_match')
+        
+        # Geometry comes from the compiled config only (precomputed polygons, stopline, zones)
+        config = self.camera_config
+        TL_ROIS = self._tl_snapshot
         
         # Backward compat globals
         VIOLATOR_TRACK_IDS = self.globals_ref['VIOLATOR_TRACK_IDS']
@@ -209,6 +650,12 @@ class VideoThread(QThread):
         MOTORBIKE_COUNT = self.globals_ref['MOTORBIKE_COUNT']
         CAR_COUNT = self.globals_ref['CAR_COUNT']
         
+        if self.snapshot_interval > 0 and self.media_time - self._last_snapshot_time >= self.snapshot_interval:
+            self._last_snapshot_time = self.media_time
+            # block=True: the per-frame evidence jobs are evictable, a pending snapshot must not be
+            save_frame(frame.copy(), self.snapshot_dir / f"f{self.frame_index:06d}.jpg",
+                       encoder=self.image_encoder, block=True)
+        
         # Get model config or use defaults
         imgsz = 416
         conf = 0.3
@@ -247,6 +694,28 @@ class VideoThread(QThread):
                         "conf": conf_val
                     })
         
+        if self.track_observer is not None:
+            self.track_observer(self.frame_index, vehicles)
+        
+        # Speed: one vectorized pass over all tracks (bottom-center = ground contact point)
+        speeds = {}
+        if self.speed_estimator.is_calibrated:
+            self.speed_estimator.update(
+                [veh["track_id"] for veh in vehicles],
+                [((veh["box"][0] + veh["box"][2]) / 2, veh["box"][3]) for veh in vehicles],
+                self.media_time
+            )
+            speeds = self.speed_estimator.estimate_speeds(self.media_time)
+        
+        # Boxes to draw: rendered later by the RenderWorker (frame coordinates),
+        # only built when this frame will actually be displayed
+        render = self._render_frame
+        detections = []
+        
+        # Get real-time _show_all_boxes value via lambda function
+        get_show_all_boxes = self.globals_ref.get('get_show_all_boxes')
+        _show_all_boxes = get_show_all_boxes() if get_show_all_boxes else True
+        
         # Process vehicles with direction detection
         for veh in vehicles:
             track_id = veh["track_id"]
@@ -260,12 +729,24 @@ class VideoThread(QThread):
             # Track vehicle position for direction calculation using OOP
             if track_id != -1:
                 vehicle_direction = self.vehicle_tracker.update_position(track_id, cx, cy)
+                record = self.track_registry.touch(track_id, cls_id, self.media_time)
+                
+                # Entry direction zone: assigned once, then cached on the track record
+                if record.entry_zone is None:
+                    record.entry_zone = config.zone_index_at(cx, cy, frame.shape)
+                
+                # Fused ROI + trajectory direction (memoized on the record)
+                self.trajectory_analyzer.update_position(track_id, cx, cy)
+                fused_direction = self._update_fused_direction(record, cx, cy)
+                if fused_direction != 'unknown':
+                    vehicle_direction = fused_direction
                 
                 # Check if vehicle crossed THE stop line
-                if is_on_stop_line(cx, cy, threshold=20):
+                if config.is_on_stop_line(cx, cy, threshold=20):
                     if not self.violation_detector.passed_vehicles.__contains__(track_id):
                         # ⚠️ CRITICAL: Đánh dấu điểm bắt đầu khi xe VỪA qua stopline
                         self.vehicle_tracker.mark_stopline_crossing(track_id, cx, cy)
+                        record.crossing_point = (cx, cy)
                         
                         # Mark vehicle as passed and count by type
                         self.violation_detector.mark_vehicle_passed(track_id, cls_id)
@@ -277,37 +758,57 @@ class VideoThread(QThread):
                         elif cls_id in [0, 1, 4]:  # ô tô, xe bus, xe tải
                             CAR_COUNT.add(track_id)
                         
-                        # Debug: Print TL states when vehicle crosses
+                        # Snapshot TL states now, resolve the verdict once the direction is confident
                         if len(TL_ROIS) > 0:
                             tl_states = [f"{tl_type}:{color}" for _, _, _, _, tl_type, color in TL_ROIS]
                             print(f"🚦 Vehicle crossing: {vehicle_label} (ID={track_id}) Dir={vehicle_direction} | TL states: {tl_states}")
+                            self.pending_verdicts.add(PendingVerdict(
+                                track_id, cls_id, vehicle_label, list(TL_ROIS),
+                                self.frame_index, self.media_time, veh["box"]
+                            ))
                         
-                        # Check for TL violation using direction and OOP
-                        is_violation, reason = check_tl_violation(track_id, vehicle_direction)
-                        if is_violation:
-                            self.violation_detector.add_violation(track_id, 'red_light')
-                            # Update globals for backward compatibility
-                            RED_LIGHT_VIOLATORS.add(track_id)
-                            VIOLATOR_TRACK_IDS.add(track_id)
-                            print(f"🚨 TL VIOLATION: {vehicle_label} (ID={track_id}) Dir={vehicle_direction} - {reason}")
-                        else:
-                            print(f"✅ Vehicle passed: {vehicle_label} (ID={track_id}) Dir={vehicle_direction} - {reason}")
+                        self.event_log.log('crossing', REASON_CROSSING, track_id, self.frame_index,
+                                           self.media_time, cls_id=cls_id, label=vehicle_label,
+                                           direction=vehicle_direction, bbox=veh["box"],
+                                           tl_snapshot=TL_ROIS)
+            
+                # Check lane-direction rule once the fused direction is frozen
+                if (check_lane_direction_match is not None and record.entry_zone is not None
+                        and record.direction_frozen and not record.lane_direction_checked):
+                    self._check_lane_direction(record, vehicle_label,
+                                               check_lane_direction_match, VIOLATOR_TRACK_IDS,
+                                               bbox=veh["box"], direction_rules=config.direction_rules)
+            
+            # Check speed violation (only when ground calibration is set)
+            speed = speeds.get(track_id)
+            if speed is not None and check_speed_violation is not None:
+                if track_id not in self.violation_detector.speed_violators:
+                    is_violation, reason = check_speed_violation(speed, self.speed_limit)
+                    if is_violation:
+                        self.violation_detector.add_violation(track_id, 'speed')
+                        VIOLATOR_TRACK_IDS.add(track_id)
+                        print(f"🚨 SPEED VIOLATION: {vehicle_label} (ID={track_id}) - {reason}")
+                        self._record_violation(REASON_SPEED, track_id, self.frame_index,
+                                               self.media_time, cls_id=cls_id, label=vehicle_label,
+                                               direction=self.vehicle_tracker.get_direction(track_id),
+                                               bbox=veh["box"], tl_snapshot=TL_ROIS, reason=reason)
             
             # Check lane violation
-            for lane in LANE_CONFIGS:
-                poly = lane["poly"]
-                allowed = lane.get("allowed_labels", ["all"])
-                
-                if point_in_polygon((cx, cy), poly):
-                    # Check if vehicle type is allowed in this lane
-                    if "all" not in allowed and vehicle_label not in allowed:
-                        if not self.violation_detector.lane_violators.__contains__(track_id):
-                            self.violation_detector.add_violation(track_id, 'lane')
-                            # Update globals for backward compatibility
-                            LANE_VIOLATORS.add(track_id)
-                            VIOLATOR_TRACK_IDS.add(track_id)
-                            print(f"🚨 LANE VIOLATION: {vehicle_label} (ID={track_id}) in restricted lane!")
-                    break
+            lane = config.lane_at(cx, cy) if config.lanes else None
+            if lane is not None and not lane.allows(vehicle_label):
+                if not self.violation_detector.lane_violators.__contains__(track_id):
+                    self.violation_detector.add_violation(track_id, 'lane')
+                    # Update globals for backward compatibility
+                    LANE_VIOLATORS.add(track_id)
+                    VIOLATOR_TRACK_IDS.add(track_id)
+                    print(f"🚨 LANE VIOLATION: {vehicle_label} (ID={track_id}) in restricted lane!")
+                    self._record_violation(REASON_LANE, track_id, self.frame_index,
+                                           self.media_time, cls_id=cls_id, label=vehicle_label,
+                                           bbox=veh["box"], tl_snapshot=TL_ROIS,
+                                           reason=f"{vehicle_label} not allowed in lane")
+            
+            if not render:
+                continue
             
             # Draw vehicle (respect _show_all_boxes flag)
             is_violator = self.violation_detector.is_violator(track_id)
@@ -316,70 +817,185 @@ class VideoThread(QThread):
             has_passed_stopline = track_id in PASSED_VEHICLES
             show_as_violator = is_violator and has_passed_stopline
             
-            # Get real-time _show_all_boxes value via lambda function
-            get_show_all_boxes = self.globals_ref.get('get_show_all_boxes')
-            _show_all_boxes = get_show_all_boxes() if get_show_all_boxes else True
-            
             # Only draw if: _show_all_boxes=True OR vehicle is violator (and passed)
             if _show_all_boxes or show_as_violator:
                 box_color = (0, 0, 255) if show_as_violator else (0, 255, 0)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), box_color, 2)
                 
                 label_text = f"{vehicle_label} ID:{track_id}"
+                if speed is not None:
+                    label_text += f" {speed:.0f}km/h"
                 if show_as_violator:
                     label_text += " [VIOLATOR]"
                 
-                cv2.putText(frame, label_text, (x1, y1-5),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, box_color, 2)
+                detections.append((x1, y1, x2, y2, box_color, label_text))
+        
+        # Resolve pending red-light verdicts in bulk (before pruning lost tracks)
+        for verdict, direction, timed_out in self.pending_verdicts.resolve(self.media_time, self._verdict_direction):
+            self._apply_tl_verdict(verdict, direction, timed_out, check_tl_violation,
+                                   RED_LIGHT_VIOLATORS, VIOLATOR_TRACK_IDS)
         
-        # Draw statistics panel
-        frame = self._draw_statistics_panel(frame)
+        for stale in self.track_registry.prune(self.media_time):
+            # Track left before its direction froze (never crossed the stopline / low confidence):
+            # judge the lane-direction rule on its best fused direction, like a timed-out verdict
+            if (check_lane_direction_match is not None and stale.entry_zone is not None
+                    and not stale.lane_direction_checked and stale.fused_direction != 'unknown'):
+                self._check_lane_direction(stale, VEHICLE_CLASSES.get(stale.cls_id, "vehicle"),
+                                           check_lane_direction_match, VIOLATOR_TRACK_IDS,
+                                           direction_rules=config.direction_rules, timed_out=True)
+            self.trajectory_analyzer.clear_trajectory(stale.track_id)
+            self.vehicle_tracker.remove_track(stale.track_id)
+        
+        self._frame_detections = detections
+        self._frame_detections_index = self.frame_index
         
         return frame
     
-    def _draw_statistics_panel(self, frame):
-        """Draw statistics panel on frame"""
-        # Panel position - TOP LEFT
-        panel_x = 10
-        panel_y = 10
-        panel_width = 550
-        panel_height = 100
+    def _update_fused_direction(self, record, cx, cy):
+        """Recompute the fused direction of a track only when it moved enough
+        
+        Returns:
+            Fused direction ('left', 'straight', 'right', 'unknown')
+        """
+        if record.direction_frozen:
+            return record.fused_direction
+        
+        if record.fused_anchor is not None:
+            ax, ay = record.fused_anchor
+            if (cx - ax) ** 2 + (cy - ay) ** 2 < self.fusion_move_threshold ** 2:
+                return record.fused_direction
+        
+        info = self.trajectory_analyzer.get_trajectory_info(record.track_id)
+        roi_direction = None
+        if record.entry_zone is not None:
+            roi_direction = self.camera_config.direction_zones[record.entry_zone].primary_direction
         
-        # Semi-transparent background
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (panel_x, panel_y), (panel_x + panel_width, panel_y + panel_height), (50, 50, 50), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+        final_dir, source, is_conflict = self.direction_fusion.fuse_directions(
+            roi_direction, info['direction'], info['confidence']
+        )
+        record.fused_direction = final_dir
+        record.fused_source = source
+        record.fused_conflict = is_conflict
+        record.fused_confidence = info['confidence']
+        record.fused_anchor = (cx, cy)
+        
+        # Freeze once motion evidence is confident and the vehicle is well past the stopline
+        if (record.crossing_point is not None and source in ('trajectory', 'both')
+                and info['confidence'] >= self.fusion_freeze_confidence):
+            px, py = record.crossing_point
+            if (cx - px) ** 2 + (cy - py) ** 2 >= self.fusion_freeze_distance ** 2:
+                record.direction_frozen = True
         
-        # Get statistics from OOP module
+        return final_dir
+    
+    def _record_violation(self, reason_code, track_id, frame_index, media_time,
+                          cls_id=None, label=None, direction=None, bbox=None,
+                          tl_snapshot=None, reason=''):
+        """Persist a violation event and request evidence for it"""
+        self.event_log.log('violation', reason_code, track_id, frame_index, media_time,
+                           cls_id=cls_id, label=label, direction=direction, bbox=bbox,
+                           tl_snapshot=tl_snapshot, reason=reason)
+        self.evidence_recorder.trigger(track_id, reason_code, frame_index, media_time,
+                                       bbox=bbox, label=label or '')
+    
+    def _verdict_direction(self, track_id):
+        """Best direction for a pending verdict and whether it is final
+        
+        Returns:
+            (direction, is_confident)
+        """
+        record = self.track_registry.get(track_id)
+        if record is not None and record.direction_frozen:
+            return (record.fused_direction, True)
+        if record is not None and record.fused_direction != 'unknown':
+            return (record.fused_direction, False)
+        return (self.vehicle_tracker.get_direction(track_id), False)
+    
+    def _apply_tl_verdict(self, verdict, direction, timed_out, check_tl_violation,
+                          red_light_violators, violator_track_ids):
+        """Evaluate the TL rule against the light states captured at crossing time"""
+        track_id = verdict.track_id
+        is_violation, reason = check_tl_violation(track_id, direction, tl_rois=verdict.tl_snapshot)
+        suffix = " (timeout)" if timed_out else ""
+        if is_violation:
+            self.violation_detector.add_violation(track_id, 'red_light')
+            # Update globals for backward compatibility
+            red_light_violators.add(track_id)
+            violator_track_ids.add(track_id)
+            print(f"🚨 TL VIOLATION: {verdict.label} (ID={track_id}) Dir={direction}{suffix} - {reason}")
+            # Logged with the crossing-time frame and light snapshot, not the resolution time
+            self._record_violation(REASON_RED_LIGHT, track_id, verdict.frame_index,
+                                   verdict.timestamp, cls_id=verdict.cls_id, label=verdict.label,
+                                   direction=direction, bbox=verdict.bbox,
+                                   tl_snapshot=verdict.tl_snapshot, reason=reason + suffix)
+        else:
+            print(f"✅ Vehicle passed: {verdict.label} (ID={track_id}) Dir={direction}{suffix} - {reason}")
+    
+    def _check_lane_direction(self, record, vehicle_label,
+                              check_lane_direction_match, violator_track_ids, bbox=None, direction_rules=(),
+                              timed_out=False):
+        """Evaluate the lane-direction rule for a track with a frozen fused direction
+        (timed_out: the track was pruned first - best non-frozen fused direction)"""
+        record.lane_direction_checked = True
+        is_violation, reason = check_lane_direction_match(record.fused_direction, record.entry_zone,
+                                                          direction_rois=direction_rules)
+        if is_violation:
+            self.violation_detector.add_violation(record.track_id, 'lane_direction')
+            violator_track_ids.add(record.track_id)
+            suffix = " (timeout)" if timed_out else ""
+            print(f"🚨 LANE DIRECTION VIOLATION: {vehicle_label} (ID={record.track_id}){suffix} - {reason}")
+            self._record_violation(REASON_LANE_DIRECTION, record.track_id, self.frame_index,
+                                   self.media_time, cls_id=record.cls_id, label=vehicle_label,
+                                   direction=record.fused_direction, bbox=bbox, reason=reason)
+    
+    def _statistics_snapshot(self):
+        """Numbers shown in the statistics panel"""
         stats = self.violation_detector.get_statistics()
+        stats['fps'] = self.fps
+        stats['processed_fps'] = self.processed_fps
+        stats['detection_enabled'] = self.detection_enabled
+        stats['speed_limit'] = self.speed_limit if self.speed_estimator.is_calibrated else None
+        return stats
+    
+    def _render_due(self, display_due):
+        """Whether the current frame goes to the display (counts frames nobody would see)"""
+        if not display_due or self.render_worker is None:
+            return False
+        if not self.render_enabled or self.render_worker.is_backlogged():
+            self.render_skipped += 1
+            return False
+        return True
+    
+    def _update_tl_colors(self, frame):
+        """Update the color of each TL ROI (HSV pixel counting on the full frame), every tl_color_interval frames"""
+        lights = self.camera_config.traffic_lights
+        detect_tl_color = self.globals_ref.get('detect_tl_color') if self.globals_ref else None
+        if not lights or detect_tl_color is None:
+            return
         
-        # Draw stats in 3 rows
-        text_y = panel_y + 28
-        
-        # Row 1: FPS info
-        cv2.putText(frame, f"Render FPS: {self.fps}", (panel_x + 10, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.65, (0, 255, 255), 2)
-        if self.detection_enabled:
-            cv2.putText(frame, f"Detection FPS: {self.processed_fps}", (panel_x + 230, text_y),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.65, (0, 255, 0), 2)
-        
-        # Row 2: Vehicle counts (from OOP)
-        text_y += 32
-        cv2.putText(frame, f"Xe may: {stats['motorbikes']}", (panel_x + 10, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.65, (255, 255, 255), 2)
-        cv2.putText(frame, f"O to: {stats['cars']}", (panel_x + 150, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.65, (255, 255, 255), 2)
-        cv2.putText(frame, f"Total: {stats['total_vehicles']}", (panel_x + 280, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.65, (255, 255, 0), 2)
-        
-        # Row 3: Violations (from OOP)
-        text_y += 32
-        cv2.putText(frame, f"TL Violations: {stats['red_light_violations']}", (panel_x + 10, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.65, (0, 0, 255), 2)
-        cv2.putText(frame, f"Lane Violations: {stats['lane_violations']}", (panel_x + 280, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.65, (0, 165, 255), 2)
+        self._tl_color_countdown -= 1
+        if self._tl_color_countdown > 0:
+            return
+        self._tl_color_countdown = self.tl_color_interval
         
-        return frame
+        colors = list(self.tl_colors)
+        for i, tl in enumerate(lights):
+            roi = frame[tl.rows, tl.cols]
+            if roi.size > 0:
+                colors[i] = detect_tl_color(roi)
+        self.tl_colors = colors
+        self._tl_snapshot = [tl.geometry + (color,) for tl, color in zip(lights, colors)]
+        
+        # Mirror the colors into the GUI's TL_ROIS, unless it was edited meanwhile (the next config has it)
+        TL_ROIS = self.globals_ref.get('TL_ROIS')
+        if TL_ROIS is not None and [tuple(tl[:5]) for tl in TL_ROIS] == list(self.camera_config.tl_geometry):
+            TL_ROIS[:] = self._tl_snapshot
+    
+    def _publish_frame(self, frame):
+        """Hand the frame (plus this frame's detections, if any) to the RenderWorker"""
+        if self._frame_detections_index == self.frame_index:
+            self.render_worker.submit(frame, self._frame_detections, self._statistics_snapshot())
+        else:
+            self.render_worker.submit(frame)
     
     def stop(self):
         """Stop the thread"""
@@ -5,6 +5,8 @@ Contains methods for saving and loading configurations
 import math
 from PyQt5.QtWidgets import QMessageBox
 
+from core.camera_config import CameraConfig, ConfigError
+
 
 class ConfigHandlerMixin:
     """Mixin class for configuration handling in MainWindow"""
@@ -34,7 +36,8 @@ class ConfigHandlerMixin:
             stop_line=main.STOP_LINE,
             tl_rois=main.TL_ROIS,
             direction_rois=main.DIRECTION_ROIS,
-            reference_vector=ref_vector
+            reference_vector=ref_vector,
+            ground_calibration=getattr(self, 'ground_calibration', None)
         )
         
         if success:
@@ -49,6 +52,7 @@ class ConfigHandlerMixin:
                 f"- Direction Zones: {len(main.DIRECTION_ROIS)}\n"
                 f"- Reference Vector: {'Yes' if ref_vector else 'No'}"
             )
+            self._watch_config_file()  # Our own save is not an external change
             self.config_status_label.setText(f"✅ Config: Saved to file")
             self.config_status_label.setStyleSheet("QLabel { color: green; font-weight: bold; }")
         else:
@@ -72,6 +76,7 @@ class ConfigHandlerMixin:
             return
         
         self._apply_loaded_config(result)
+        self._watch_config_file()
         
         config_path = self.config_manager.get_config_path(self.video_path)
         QMessageBox.information(
@@ -96,8 +101,28 @@ class ConfigHandlerMixin:
             return False
         
         self._apply_loaded_config(result)
+        self._watch_config_file()
         return True
     
+    def _watch_config_file(self):
+        """(Re)start watching the video's config file, taking its current state as loaded"""
+        from utils.config_watcher import ConfigFileWatcher
+        
+        self.config_watcher = ConfigFileWatcher(self.config_manager.get_config_path(self.video_path))
+    
+    def _check_config_file(self):
+        """Hot reload: the config file was edited outside the GUI → apply it without reopening the video"""
+        watcher = getattr(self, 'config_watcher', None)
+        if watcher is None or not watcher.changed():
+            return
+        print(f"🔄 Config file changed on disk: {watcher.path}")
+        result = self.config_manager.load_config_file(watcher.path)
+        if result is None:
+            return  # Invalid/partial file - keep the current ROIs
+        self._apply_loaded_config(result)
+        self.config_status_label.setText("🔄 Config: Reloaded from file")
+        self.config_status_label.setStyleSheet("QLabel { color: green; font-weight: bold; }")
+    
     def _apply_loaded_config(self, config):
         """Apply loaded configuration to global variables and UI"""
         main = self._get_globals()
@@ -109,7 +134,8 @@ class ConfigHandlerMixin:
                 'poly': lane_data['points'],
                 'points': lane_data['points'],
                 'label': lane_data.get('label', 'Unnamed Lane'),
-                'allowed_types': lane_data.get('allowed_types', [])
+                'allowed_types': lane_data.get('allowed_types', []),
+                'allowed_labels': lane_data.get('allowed_types') or ['all']
             })
         
         # Update lane list widget
@@ -141,11 +167,6 @@ class ConfigHandlerMixin:
             self.ref_vector_label.setText(f"✅ Ref Vector: {angle:.1f}° ({dx:.0f}, {dy:.0f})")
             self.ref_vector_label.setStyleSheet("QLabel { color: green; font-weight: bold; }")
             print(f"✅ Reference Vector loaded: {angle:.1f}° from {self.ref_vector_p1} to {self.ref_vector_p2}")
-            
-            # ⚠️ CRITICAL: Apply reference angle to VehicleTracker
-            if hasattr(self, 'thread') and self.thread is not None:
-                self.thread.set_reference_angle(angle)
-                print(f"🎯 Applied ref_angle={angle:.1f}° to VehicleTracker from config")
         else:
             self.ref_vector_p1 = None
             self.ref_vector_p2 = None
@@ -156,4 +177,72 @@ class ConfigHandlerMixin:
                 print("   → This may affect turn detection accuracy")
                 print("   → Recommend: Set Reference Vector before starting detection")
         
+        # Load ground-plane calibration (speed estimation)
+        self.ground_calibration = config.get('ground_calibration')
+        
+        # Compile and hand the new config to VideoThread (reference angle, homography, zones...)
+        self._sync_camera_config(force=True)
+        
         print(f"✅ Configuration applied to UI and global variables")
+    
+    def compile_current_config(self):
+        """
+        Compile the ROIs currently drawn in the GUI into a CameraConfig
+        
+        Raises:
+            ConfigError: Degenerate geometry (e.g. a lane with < 3 points)
+        """
+        main = self._get_globals()
+        ref_vector = None
+        if self.ref_vector_p1 and self.ref_vector_p2:
+            ref_vector = (tuple(self.ref_vector_p1), tuple(self.ref_vector_p2))
+        return CameraConfig.compile(
+            lanes=main.LANE_CONFIGS,
+            stopline=main.STOP_LINE,
+            traffic_lights=main.TL_ROIS,
+            direction_zones=main.DIRECTION_ROIS,
+            reference_vector=ref_vector,
+            ground_calibration=getattr(self, 'ground_calibration', None)
+        )
+    
+    def _config_signature(self):
+        """Cheap fingerprint of the editable ROI state (TL colors excluded - VideoThread writes them)"""
+        main = self._get_globals()
+        calibration = getattr(self, 'ground_calibration', None)
+        return (
+            tuple((tuple(map(tuple, lane.get('points') or lane.get('poly') or [])),
+                   tuple(lane.get('allowed_labels') or lane.get('allowed_types') or []))
+                  for lane in main.LANE_CONFIGS),
+            tuple(map(tuple, main.STOP_LINE)) if main.STOP_LINE else None,
+            tuple(tuple(tl[:5]) for tl in main.TL_ROIS),
+            tuple((tuple(map(tuple, roi['points'])), roi.get('primary_direction', roi.get('direction')),
+                   tuple(roi.get('allowed_directions') or []))
+                  for roi in main.DIRECTION_ROIS),
+            (tuple(self.ref_vector_p1), tuple(self.ref_vector_p2))
+            if self.ref_vector_p1 and self.ref_vector_p2 else None,
+            repr(calibration) if calibration else None,
+        )
+    
+    def _sync_camera_config(self, force=False):
+        """Recompile and push the config to VideoThread when the drawn ROIs (or the config file) changed
+        
+        Polled by a timer; VideoThread swaps the new config in at its next frame boundary.
+        """
+        if getattr(self, 'thread', None) is None:
+            return
+        if not force:
+            self._check_config_file()  # May apply a reloaded file (forces a sync itself)
+        signature = self._config_signature()
+        if not force and signature == getattr(self, '_camera_config_signature', None):
+            return
+        self._camera_config_signature = signature
+        
+        try:
+            config = self.compile_current_config()
+        except ConfigError as e:
+            print(f"⚠️ ROI config not applied: {e}")
+            return
+        calibration_changed = config.ground_calibration != self.thread.camera_config.ground_calibration
+        self.thread.set_camera_config(config)
+        if calibration_changed and config.homography is not None:
+            print(f"📏 Ground calibration applied - speed rule enabled (limit {config.speed_limit_kmh} km/h)")
@@ -127,6 +127,10 @@ class DetectionHandlerMixin:
         
         if not g._detection_running:
             if self.yolo_model is None:
+                if not g.BACKENDS.is_ready():
+                    self.status_label.setText("Status: Detection backends still loading...")
+                    self.statusBar().showMessage("Detection backends still loading - try again in a moment")
+                    return
                 self.status_label.setText("Status: Model not loaded at startup")
                 QMessageBox.warning(self, "No Model", "Please select a model first!")
                 return
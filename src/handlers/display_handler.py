@@ -5,8 +5,34 @@ Contains methods for rendering overlays, toggles, and display management
 import cv2
 import numpy as np
 import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
 from PyQt5.QtGui import QImage, QPixmap
 
+from tools.roi_editor import ROIEditor
+
+
+@dataclass(frozen=True)
+class OverlayScene:
+    """
+    Snapshot of the GUI overlays (frame coordinates, plain tuples) - built on the GUI thread,
+    read by the RenderWorker; a new object per change, never modified after hand-off
+    """
+    rois: Optional[Tuple] = None  # ((points, direction), ...), None = hidden
+    lanes: Optional[Tuple] = None
+    stop_line: Optional[Tuple] = None
+    ref_vector: Optional[Tuple] = None
+    editing_points: Optional[Tuple] = None  # Points of the ROI being edited
+    editing_state: Optional[Tuple] = None  # ROIEditor.overlay_state()
+    tmp_lane_pts: Tuple = ()
+    tmp_stop_point: Optional[Tuple] = None
+    tmp_direction_roi_pts: Tuple = ()
+    selected_direction: str = 'straight'
+    tmp_tl_point: Optional[Tuple] = None
+    pending_ref_point: Optional[Tuple] = None  # First reference vector point, waiting for the second
+    tl_rois: Tuple = ()  # TL_ROIS rows, () = hidden
+
 
 class DisplayHandlerMixin:
     """Mixin class for display and rendering in MainWindow"""
@@ -16,138 +42,352 @@ class DisplayHandlerMixin:
         import integrated_main
         return integrated_main
     
-    def update_image(self, frame):
-        """Update video display with all overlays"""
+    def update_image(self):
+        """Blit the newest frame composed by the RenderWorker (GUI thread does nothing else)"""
+        self._refresh_overlay_scene()
+        exchange = self.render_worker.exchange
+        slot = exchange.acquire_read()
+        if slot is None:
+            return
+        try:
+            # VideoThread emits a fresh array per frame and never touches it again → no copy needed
+            frame, dpr = slot.meta
+            self.current_frame = frame
+            self._update_display_transform(frame.shape)
+            
+            # QImage wraps the exchange buffer (no copy); fromImage converts it into the pixmap,
+            # after which the buffer goes back to the RenderWorker
+            h, w, ch = slot.array.shape
+            image = QImage(slot.array.data, w, h, ch * w, QImage.Format_RGB888)
+            image.setDevicePixelRatio(dpr)
+            self.video_label.setPixmap(QPixmap.fromImage(image))
+        finally:
+            exchange.release(slot)
+    
+    def _update_render_state(self):
+        """Render only while the window can actually be seen (called on show/hide/minimize)"""
+        thread = getattr(self, 'thread', None)
+        if thread is not None:
+            thread.set_render_enabled(self.isVisible() and not self.isMinimized())
+    
+    def _build_overlay_scene(self):
+        """Immutable snapshot of everything paint_scene draws (GUI thread only - reads the editing globals)"""
         main = self._get_globals()
+        show_rois = self.show_direction_rois and self.show_roi_overlays
+        show_ref = getattr(self, 'show_ref_vector', True)
+        has_full_ref = self.ref_vector_p1 is not None and self.ref_vector_p2 is not None
+        mode = main._drawing_mode
         
-        self.current_frame = frame.copy()
-        display = frame.copy()
+        def points_of(points):
+            return tuple(tuple(p) for p in points)
         
-        # Update TL colors continuously (HSV pixel counting)
-        self.update_tl_colors(display)
+        rois = lanes = stop_line = ref_vector = None
+        if show_rois:
+            rois = tuple((points_of(roi['points']), roi['direction']) for roi in main.DIRECTION_ROIS)
+        if self.show_lanes:
+            lanes = tuple(points_of(lane["poly"]) for lane in main.LANE_CONFIGS)
+        if getattr(self, 'show_stopline', True) and main.STOP_LINE is not None:
+            stop_line = points_of(main.STOP_LINE)
+        if show_ref:
+            ref_vector = (self.ref_vector_p1, self.ref_vector_p2)
         
-        # Draw direction ROIs (if enabled)
-        if self.show_direction_rois and self.show_roi_overlays:
-            display = self.draw_direction_rois(display)
+        # ROI being edited: its points are copied here, the editor itself stays on the GUI thread
+        editing_state = self.roi_editor.overlay_state() if show_rois else None
+        editing_points = None
+        if editing_state is not None and editing_state[0] < len(main.DIRECTION_ROIS):
+            editing_points = points_of(main.DIRECTION_ROIS[editing_state[0]]['points'])
         
-        # Draw lanes (if enabled)
-        if self.show_lanes:
-            display = self.draw_lanes(display)
+        pending_ref = None
+        if not (show_ref and has_full_ref) and mode == 'ref_vector' and self.ref_vector_p1 is not None:
+            pending_ref = tuple(self.ref_vector_p1)
+        tmp_stop = main._tmp_stop_point if mode == 'stopline' else None
+        tmp_tl = main._tmp_tl_point if mode == 'tl_manual' else None
+        
+        return OverlayScene(
+            rois=rois,
+            lanes=lanes,
+            stop_line=stop_line,
+            ref_vector=ref_vector,
+            editing_points=editing_points,
+            editing_state=editing_state if editing_points is not None else None,
+            tmp_lane_pts=points_of(main._tmp_lane_pts) if mode == 'lane' else (),
+            tmp_stop_point=tuple(tmp_stop) if tmp_stop is not None else None,
+            tmp_direction_roi_pts=points_of(main._tmp_direction_roi_pts) if mode == 'direction_roi' else (),
+            selected_direction=main._selected_direction,
+            tmp_tl_point=tuple(tmp_tl) if tmp_tl is not None else None,
+            pending_ref_point=pending_ref,
+            tl_rois=points_of(list(main.TL_ROIS)) if getattr(self, 'show_traffic_lights', True) else (),
+        )
+    
+    def _refresh_overlay_scene(self):
+        """Hand a fresh overlay snapshot to the RenderWorker when it changed (GUI thread: per frame + timer)"""
+        render_worker = getattr(self, 'render_worker', None)
+        if render_worker is None:
+            return
+        scene = self._build_overlay_scene()
+        if scene != getattr(self, '_overlay_scene', None):
+            self._overlay_scene = scene
+            render_worker.set_scene(scene)
+    
+    def paint_scene(self, scene, display, scale):
+        """
+        Draw GUI overlays onto a display-sized frame (runs in the RenderWorker thread)
+        
+        Args:
+            scene: OverlayScene snapshot taken on the GUI thread (never the live editing state)
+            display: Frame already resized to display size, drawn on in place
+            scale: Frame → display coordinate scale
         
-        # Draw stop line (if enabled)
-        if getattr(self, 'show_stopline', True):
-            display = self.draw_stop_line(display)
+        TL colors are tracked by VideoThread, this only draws them.
+        """
+        def to_disp(p):
+            return (int(p[0] * scale), int(p[1] * scale))
+        
+        # Static geometry (direction ROIs, lanes, stop line, reference vector):
+        # pre-rendered layer, rebuilt only when config/toggles/size change, one blend per frame
+        self._composite_static_layer(display, self._get_static_layer(scene, display.shape, scale))
+        
+        # Draw editing overlay if in edit mode
+        if scene.editing_points is not None:
+            points = [to_disp(p) for p in scene.editing_points]
+            ROIEditor.draw_overlay_state(display, points, scene.editing_state)
         
         # Draw temporary lane
-        if main._drawing_mode == 'lane' and len(main._tmp_lane_pts) > 0:
-            pts_tmp = np.array(main._tmp_lane_pts, dtype=np.int32)
+        if scene.tmp_lane_pts:
+            pts_tmp = np.array([to_disp(p) for p in scene.tmp_lane_pts], dtype=np.int32)
             cv2.polylines(display, [pts_tmp], isClosed=False, color=(0, 255, 0), thickness=2)
-            for p in main._tmp_lane_pts:
-                cv2.circle(display, p, 4, (0, 255, 0), -1)
+            for p in scene.tmp_lane_pts:
+                cv2.circle(display, to_disp(p), 4, (0, 255, 0), -1)
         
         # Draw temporary stop line point
-        if main._drawing_mode == 'stopline' and main._tmp_stop_point is not None:
-            cv2.circle(display, main._tmp_stop_point, 5, (0, 0, 255), -1)
+        if scene.tmp_stop_point is not None:
+            cv2.circle(display, to_disp(scene.tmp_stop_point), 5, (0, 0, 255), -1)
         
         # Draw temporary direction ROI
-        if main._drawing_mode == 'direction_roi' and len(main._tmp_direction_roi_pts) > 0:
+        if scene.tmp_direction_roi_pts:
             DIRECTION_COLORS = {
                 'left': (0, 0, 255),
                 'right': (0, 165, 255),
                 'straight': (0, 255, 0)
             }
-            color = DIRECTION_COLORS.get(main._selected_direction, (128, 128, 128))
-            pts_tmp = np.array(main._tmp_direction_roi_pts, dtype=np.int32)
+            color = DIRECTION_COLORS.get(scene.selected_direction, (128, 128, 128))
+            pts_tmp = np.array([to_disp(p) for p in scene.tmp_direction_roi_pts], dtype=np.int32)
             cv2.polylines(display, [pts_tmp], isClosed=False, color=color, thickness=2)
-            for p in main._tmp_direction_roi_pts:
-                cv2.circle(display, tuple(p), 5, color, -1)
+            for p in scene.tmp_direction_roi_pts:
+                cv2.circle(display, to_disp(p), 5, color, -1)
         
         # Draw temporary TL point
-        if main._drawing_mode == 'tl_manual' and main._tmp_tl_point is not None:
-            cv2.circle(display, main._tmp_tl_point, 6, (0, 200, 255), -1)
-            cv2.putText(display, "P1", (main._tmp_tl_point[0]+8, main._tmp_tl_point[1]), 
+        if scene.tmp_tl_point is not None:
+            tl_x, tl_y = to_disp(scene.tmp_tl_point)
+            cv2.circle(display, (tl_x, tl_y), 6, (0, 200, 255), -1)
+            cv2.putText(display, "P1", (tl_x+8, tl_y), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 200, 255), 2)
         
-        # Draw reference vector (for direction calibration) - if enabled
-        if getattr(self, 'show_ref_vector', True) and self.ref_vector_p1 is not None and self.ref_vector_p2 is not None:
-            p1 = self.ref_vector_p1
-            p2 = self.ref_vector_p2
-            # Draw arrow showing reference direction
-            cv2.arrowedLine(display, p1, p2, (255, 0, 255), 3, tipLength=0.05)
-            # Draw start/end points
-            cv2.circle(display, p1, 6, (255, 0, 255), -1)
-            cv2.circle(display, p2, 6, (255, 0, 255), -1)
-            # Draw label with angle
-            mid = ((p1[0] + p2[0]) // 2, (p1[1] + p2[1]) // 2)
-            dx = p2[0] - p1[0]
-            dy = p2[1] - p1[1]
-            angle = math.degrees(math.atan2(dy, dx))
-            cv2.putText(display, f"REF: {angle:.1f} deg", (mid[0] + 10, mid[1] - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2, cv2.LINE_AA)
-        elif main._drawing_mode == 'ref_vector' and self.ref_vector_p1 is not None:
+        # Reference vector with both points is part of the static layer
+        if scene.pending_ref_point is not None:
             # Show first point while waiting for second
-            cv2.circle(display, self.ref_vector_p1, 6, (255, 0, 255), -1)
-            cv2.putText(display, "Click second point", (self.ref_vector_p1[0] + 10, self.ref_vector_p1[1] - 10),
+            ref_x, ref_y = to_disp(scene.pending_ref_point)
+            cv2.circle(display, (ref_x, ref_y), 6, (255, 0, 255), -1)
+            cv2.putText(display, "Click second point", (ref_x + 10, ref_y - 10),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2, cv2.LINE_AA)
         
         # Overlay ALL TL ROIs and labels (if enabled)
-        if getattr(self, 'show_traffic_lights', True):
-            for idx, tl_data in enumerate(main.TL_ROIS):
-                x1, y1, x2, y2, tl_type, current_color = tl_data
-                # Color code by current light color
-                box_color = (128, 128, 128)  # Gray default
-                if current_color == 'đỏ':
-                    box_color = (0, 0, 255)  # Red
-                    color_display = "DO"
-                elif current_color == 'xanh':
-                    box_color = (0, 255, 0)  # Green
-                    color_display = "XANH"
-                elif current_color == 'vàng':
-                    box_color = (0, 255, 255)  # Yellow
-                    color_display = "VANG"
-                else:
-                    color_display = "???"
-                
-                # Map tl_type to ASCII for display
-                if tl_type == 'tròn':
-                    type_display = "tron"
-                elif tl_type == 'đi thẳng':
-                    type_display = "thang"
-                elif tl_type == 'rẽ trái':
-                    type_display = "L"
-                elif tl_type == 'rẽ phải':
-                    type_display = "R"
-                else:
-                    type_display = tl_type
-                
-                cv2.rectangle(display, (x1, y1), (x2, y2), box_color, 2)
-                label_text = f"TL{idx+1}[{type_display}]: {color_display}"
-                cv2.putText(display, label_text, (x1, max(0, y1 - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, box_color, 2, cv2.LINE_AA)
-        
-        # Convert to QImage
-        rgb_image = cv2.cvtColor(display, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        
-        # Scale to fit label while maintaining aspect ratio
-        scaled_pixmap = QPixmap.fromImage(qt_image).scaled(
-            self.video_label.width(), 
-            self.video_label.height(), 
-            aspectRatioMode=1  # Keep aspect ratio
-        )
+        for idx, tl_data in enumerate(scene.tl_rois):
+            x1, y1, x2, y2, tl_type, current_color = tl_data
+            x1, y1 = to_disp((x1, y1))
+            x2, y2 = to_disp((x2, y2))
+            # Color code by current light color
+            box_color = (128, 128, 128)  # Gray default
+            if current_color == 'đỏ':
+                box_color = (0, 0, 255)  # Red
+                color_display = "DO"
+            elif current_color == 'xanh':
+                box_color = (0, 255, 0)  # Green
+                color_display = "XANH"
+            elif current_color == 'vàng':
+                box_color = (0, 255, 255)  # Yellow
+                color_display = "VANG"
+            else:
+                color_display = "???"
+            
+            # Map tl_type to ASCII for display
+            if tl_type == 'tròn':
+                type_display = "tron"
+            elif tl_type == 'đi thẳng':
+                type_display = "thang"
+            elif tl_type == 'rẽ trái':
+                type_display = "L"
+            elif tl_type == 'rẽ phải':
+                type_display = "R"
+            else:
+                type_display = tl_type
+            
+            cv2.rectangle(display, (x1, y1), (x2, y2), box_color, 2)
+            label_text = f"TL{idx+1}[{type_display}]: {color_display}"
+            cv2.putText(display, label_text, (x1, max(0, y1 - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, box_color, 2, cv2.LINE_AA)
+    
+    def _update_display_transform(self, frame_shape):
+        """Compute (and cache) the frame → label transform used for click mapping,
+        and tell the RenderWorker the size to render at"""
+        label_w = self.video_label.width()
+        label_h = self.video_label.height()
+        dpr = self.video_label.devicePixelRatioF()
+        key = (label_w, label_h, dpr, frame_shape[:2])
+        if key != getattr(self, '_display_transform_key', None):
+            frame_h, frame_w = frame_shape[:2]
+            
+            # Store scale information (logical pixels) for accurate click detection
+            self.current_display_scale = min(label_w / frame_w, label_h / frame_h)
+            self.current_display_width = max(1, int(frame_w * self.current_display_scale))
+            self.current_display_height = max(1, int(frame_h * self.current_display_scale))
+            self.current_display_offset_x = (label_w - self.current_display_width) // 2
+            self.current_display_offset_y = (label_h - self.current_display_height) // 2
+            
+            # RenderWorker renders at physical resolution on HiDPI screens
+            render_worker = getattr(self, 'render_worker', None)
+            if render_worker is not None:
+                render_worker.set_target_size(label_w, label_h, dpr)
+            self._display_transform_key = key
+    
+    def label_to_frame(self, pos):
+        """Map a point on video_label to frame coordinates, None if outside the image"""
+        x = pos.x() - self.current_display_offset_x
+        y = pos.y() - self.current_display_offset_y
+        if 0 <= x < self.current_display_width and 0 <= y < self.current_display_height:
+            return int(x / self.current_display_scale), int(y / self.current_display_scale)
+        return None
+    
+    def _get_static_layer(self, scene, shape, scale=1.0):
+        """Return cached static layer, rebuilding it only when its signature changed (RenderWorker thread only)"""
+        key = (shape[:2], scale, scene.rois, scene.lanes, scene.stop_line, scene.ref_vector)
+        if key != getattr(self, '_static_layer_cache_key', None):
+            self._static_layer = self._build_static_layer(shape, key)
+            self._static_layer_cache_key = key
+        return self._static_layer
+    
+    def _build_static_layer(self, shape, key):
+        """
+        Render static geometry into a premultiplied BGR layer + alpha
+        (geometry in frame coordinates is scaled to display coordinates)
         
-        # Store scale information for accurate click detection
-        self.current_display_scale = min(
-            self.video_label.width() / w,
-            self.video_label.height() / h
-        )
-        self.current_display_width = int(w * self.current_display_scale)
-        self.current_display_height = int(h * self.current_display_scale)
-        self.current_display_offset_x = (self.video_label.width() - self.current_display_width) // 2
-        self.current_display_offset_y = (self.video_label.height() - self.current_display_height) // 2
+        Returns:
+            None if nothing to draw, else (y0, y1, x0, x1, premult, inv_alpha) cropped to the
+            bounding box of drawn pixels; composite = frame * inv_alpha/255 + premult
+        """
+        h, w = shape[:2]
+        _, scale, rois, lanes, stop_line, ref_vector = key
+        
+        def to_disp(p):
+            return (int(p[0] * scale), int(p[1] * scale))
+        
+        def to_pts(points):
+            return np.array([to_disp(p) for p in points], dtype=np.int32)
+        premult = np.zeros((h, w, 3), dtype=np.float32)
+        alpha = np.zeros((h, w), dtype=np.float32)
+        
+        def paint(draw, opacity):
+            # Each group is drawn opaque on its own canvas, then blended "over" the layer
+            canvas = np.zeros((h, w, 3), dtype=np.uint8)
+            mask = np.zeros((h, w), dtype=np.uint8)
+            draw(canvas, mask)
+            m = mask > 0
+            premult[m] = opacity * canvas[m] + (1 - opacity) * premult[m]
+            alpha[m] = opacity + (1 - opacity) * alpha[m]
+        
+        if rois:
+            DIRECTION_COLORS = {
+                'left': (0, 0, 255),      # Đỏ
+                'right': (0, 165, 255),   # Vàng
+                'straight': (0, 255, 0),  # Xanh
+                'unknown': (128, 128, 128)
+            }
+            DIRECTION_LABELS = {
+                'left': 'RE TRAI',
+                'right': 'RE PHAI',
+                'straight': 'DI THANG',
+                'unknown': 'UNKNOWN'
+            }
+            
+            def draw_fills(canvas, mask):
+                for points, direction in rois:
+                    pts = to_pts(points)
+                    cv2.fillPoly(canvas, [pts], DIRECTION_COLORS.get(direction, DIRECTION_COLORS['unknown']))
+                    cv2.fillPoly(mask, [pts], 255)
+            
+            def draw_outlines(canvas, mask):
+                for points, direction in rois:
+                    pts = to_pts(points)
+                    color = DIRECTION_COLORS.get(direction, DIRECTION_COLORS['unknown'])
+                    center_x = int(np.mean([p[0] for p in points]) * scale)
+                    center_y = int(np.mean([p[1] for p in points]) * scale)
+                    text = DIRECTION_LABELS.get(direction, direction.upper())
+                    for img, c in ((canvas, color), (mask, 255)):
+                        cv2.polylines(img, [pts], True, c, 2)
+                    for img, c in ((canvas, (255, 255, 255)), (mask, 255)):
+                        cv2.putText(img, text, (center_x - 50, center_y),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, c, 2)
+            
+            paint(draw_fills, 0.25)
+            paint(draw_outlines, 0.75)
+        
+        if lanes:
+            def draw_lanes(canvas, mask):
+                for idx, poly in enumerate(lanes, start=1):
+                    pts = to_pts(poly)
+                    cx = int(sum(p[0] for p in poly) / len(poly) * scale)
+                    cy = int(sum(p[1] for p in poly) / len(poly) * scale)
+                    for img, fill, edge, text in ((canvas, (0, 255, 255), (0, 200, 200), (0, 0, 0)),
+                                                  (mask, 255, 255, 255)):
+                        cv2.fillPoly(img, [pts], fill)
+                        cv2.polylines(img, [pts], isClosed=True, color=edge, thickness=2)
+                        cv2.putText(img, f"L{idx}", (cx-15, cy),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, text, 2)
+            
+            paint(draw_lanes, 0.3)
         
-        self.video_label.setPixmap(scaled_pixmap)
+        if stop_line is not None:
+            def draw_stopline(canvas, mask):
+                p1, p2 = to_disp(stop_line[0]), to_disp(stop_line[1])
+                for img, c in ((canvas, (0, 0, 255)), (mask, 255)):
+                    cv2.line(img, p1, p2, c, 4)
+                    cv2.putText(img, "STOP LINE", (p1[0], p1[1]-10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, c, 2)
+            
+            paint(draw_stopline, 1.0)
+        
+        if ref_vector is not None and ref_vector[0] is not None and ref_vector[1] is not None:
+            def draw_ref_vector(canvas, mask):
+                angle = math.degrees(math.atan2(ref_vector[1][1] - ref_vector[0][1],
+                                                ref_vector[1][0] - ref_vector[0][0]))
+                p1, p2 = to_disp(ref_vector[0]), to_disp(ref_vector[1])
+                mid = ((p1[0] + p2[0]) // 2, (p1[1] + p2[1]) // 2)
+                for img, c in ((canvas, (255, 0, 255)), (mask, 255)):
+                    # Arrow showing reference direction + start/end points + angle label
+                    cv2.arrowedLine(img, p1, p2, c, 3, tipLength=0.05)
+                    cv2.circle(img, p1, 6, c, -1)
+                    cv2.circle(img, p2, 6, c, -1)
+                    cv2.putText(img, f"REF: {angle:.1f} deg", (mid[0] + 10, mid[1] - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, c, 2, cv2.LINE_AA)
+            
+            paint(draw_ref_vector, 1.0)
+        
+        ys, xs = np.nonzero(alpha)
+        if ys.size == 0:
+            return None
+        y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+        premult_u8 = np.clip(premult[y0:y1, x0:x1] + 0.5, 0, 255).astype(np.uint8)
+        inv_alpha = np.clip((1 - alpha[y0:y1, x0:x1]) * 255 + 0.5, 0, 255).astype(np.uint8)
+        inv_alpha = cv2.merge([inv_alpha, inv_alpha, inv_alpha])
+        return (y0, y1, x0, x1, premult_u8, inv_alpha)
+    
+    def _composite_static_layer(self, display, layer):
+        """Blend cached static layer onto display in place (only inside its bounding box)"""
+        if layer is None:
+            return
+        y0, y1, x0, x1, premult, inv_alpha = layer
+        roi = display[y0:y1, x0:x1]
+        cv2.multiply(roi, inv_alpha, dst=roi, scale=1.0 / 255)
+        cv2.add(roi, premult, dst=roi)
     
     def draw_direction_rois(self, frame):
         """Draw direction ROIs with transparency"""
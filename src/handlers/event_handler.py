@@ -160,18 +160,10 @@ class EventHandlerMixin:
         from PyQt5.QtCore import Qt
         from PyQt5.QtWidgets import QMessageBox
         
-        # Use stored scale information for accurate click detection
-        if not hasattr(self, 'current_display_scale'):
-            return
-        
-        # Get click position relative to label
-        click_x = event.pos().x() - self.current_display_offset_x
-        click_y = event.pos().y() - self.current_display_offset_y
-        
-        # Convert to frame coordinates using stored scale
-        if 0 <= click_x < self.current_display_width and 0 <= click_y < self.current_display_height:
-            frame_x = int(click_x / self.current_display_scale)
-            frame_y = int(click_y / self.current_display_scale)
+        # Convert to frame coordinates using the cached display transform
+        frame_pos = self.label_to_frame(event.pos())
+        if frame_pos is not None:
+            frame_x, frame_y = frame_pos
             
             # Handle lane editing mode
             if hasattr(self, 'editing_lane_idx') and self.editing_lane_idx is not None:
@@ -278,8 +270,7 @@ class EventHandlerMixin:
                     print(f"🚦 TL ROI created: ({x1},{y1},{x2},{y2}) Type={tl_type}")
                     print(f"📍 Use vehicle direction to match with TL type")
                     
-                    # Enable color tracking
-                    self.tl_tracking_active = True
+                    # VideoThread picks up the new ROI and starts HSV color tracking
                     print("🚦 HSV color tracking started")
                     
                     main._tmp_tl_point = None
@@ -298,23 +289,9 @@ class EventHandlerMixin:
             return
         
         # Get mouse position in frame coordinates
-        label_width = self.video_label.width()
-        label_height = self.video_label.height()
-        frame_height, frame_width = self.current_frame.shape[:2]
-        
-        scale = min(label_width / frame_width, label_height / frame_height)
-        display_width = int(frame_width * scale)
-        display_height = int(frame_height * scale)
-        
-        offset_x = (label_width - display_width) // 2
-        offset_y = (label_height - display_height) // 2
-        
-        mouse_x = event.pos().x() - offset_x
-        mouse_y = event.pos().y() - offset_y
-        
-        if 0 <= mouse_x < display_width and 0 <= mouse_y < display_height:
-            frame_x = int(mouse_x / scale)
-            frame_y = int(mouse_y / scale)
+        frame_pos = self.label_to_frame(event.pos())
+        if frame_pos is not None:
+            frame_x, frame_y = frame_pos
             
             # Handle lane editing drag
             if hasattr(self, 'editing_lane_idx') and self.editing_lane_idx is not None:
@@ -356,23 +333,9 @@ class EventHandlerMixin:
             return
         
         # Get click position in frame coordinates
-        label_width = self.video_label.width()
-        label_height = self.video_label.height()
-        frame_height, frame_width = self.current_frame.shape[:2]
-        
-        scale = min(label_width / frame_width, label_height / frame_height)
-        display_width = int(frame_width * scale)
-        display_height = int(frame_height * scale)
-        
-        offset_x = (label_width - display_width) // 2
-        offset_y = (label_height - display_height) // 2
-        
-        click_x = event.pos().x() - offset_x
-        click_y = event.pos().y() - offset_y
-        
-        if 0 <= click_x < display_width and 0 <= click_y < display_height:
-            frame_x = int(click_x / scale)
-            frame_y = int(click_y / scale)
+        frame_pos = self.label_to_frame(event.pos())
+        if frame_pos is not None:
+            frame_x, frame_y = frame_pos
             
             # Handle lane editing - double click to add point
             if hasattr(self, 'editing_lane_idx') and self.editing_lane_idx is not None:
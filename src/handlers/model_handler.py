@@ -18,49 +18,80 @@ class ModelHandlerMixin:
         if model_type in self.available_models:
             first_weight = self.available_models[model_type]["weights"][0]
             self.load_model(model_type, first_weight)
-            self.statusBar().showMessage(f"Loaded model: {model_type}")
     
     def load_model(self, model_type, weight_name):
-        """Load model dynamically based on selection"""
+        """Start loading a model in the background (returns False if it can't be loaded now)
+        
+        The running video keeps using the current model until the new one is loaded and warmed up,
+        then VideoThread swaps it in between two frames (see _on_model_loaded)
+        """
         main = self._get_globals()
         
-        if not main.YOLO_AVAILABLE:
+        if not main.BACKENDS.is_ready():
+            print("⏳ Detection backends still loading - model will load when they are ready")
+            return False
+        if not main.BACKENDS.available('ultralytics'):
             print("⚠️ YOLO not available")
             return False
         
-        try:
-            from model_config import get_weight_path, get_model_config
-            from ultralytics import YOLO
-            
-            print(f"🔄 Loading {model_type} model: {weight_name}...")
-            weight_path = get_weight_path(model_type, weight_name)
-            self.yolo_model = YOLO(weight_path)
-            self.current_model_type = model_type
-            self.current_model_config = get_model_config(model_type)
-            
-            # Update thread model if thread exists and was already initialized
-            if hasattr(self, 'thread') and hasattr(self.thread, 'model_loaded'):
-                if self.thread.model_loaded:
-                    self.thread.set_model(self.yolo_model)
-                    self.thread.model_config = self.current_model_config
-            
-            # Update spinboxes with model's default values
-            if hasattr(self, 'imgsz_spinbox'):
-                self.imgsz_spinbox.setValue(self.current_model_config['default_imgsz'])
-            if hasattr(self, 'conf_spinbox'):
-                self.conf_spinbox.setValue(self.current_model_config['default_conf'])
-            
-            print(f"✅ Model loaded: {weight_path}")
-            if hasattr(self, 'status_label'):
-                self.status_label.setText(f"Status: Loaded {model_type} - {weight_name}")
-            return True
-        except Exception as e:
-            import traceback
-            print(f"❌ Failed to load model: {e}")
-            print(traceback.format_exc())
-            if hasattr(self, 'status_label'):
-                QMessageBox.warning(self, "Model Load Error", f"Could not load model:\n{e}")
-            return False
+        from core.model_loader import ModelLoadWorker
+        from model_config import get_model_config
+        
+        imgsz = self.imgsz_spinbox.value() if hasattr(self, 'imgsz_spinbox') else get_model_config(model_type)['default_imgsz']
+        worker = ModelLoadWorker(model_type, weight_name, imgsz=imgsz)
+        worker.loaded.connect(lambda *args, w=worker: self._on_model_loaded(w, *args))
+        worker.failed.connect(lambda *args, w=worker: self._on_model_load_failed(w, *args))
+        worker.finished.connect(lambda w=worker: self._model_loaders.discard(w))
+        
+        # Latest request wins: results of older loads still in flight are ignored
+        if not hasattr(self, '_model_loaders'):
+            self._model_loaders = set()
+        self._model_loaders.add(worker)
+        self._latest_model_loader = worker
+        worker.start()
+        
+        if hasattr(self, 'status_label'):
+            self.status_label.setText(f"Status: Loading {model_type} - {weight_name}...")
+            self.statusBar().showMessage(f"Loading {model_type} - {weight_name}...")
+        return True
+    
+    def _on_model_loaded(self, worker, model, model_type, weight_name, weight_path):
+        """Model loaded and warmed up (GUI thread) - hand it to the video thread"""
+        if worker is not self._latest_model_loader:
+            print(f"ℹ️ Discarding superseded model load: {weight_name}")
+            return
+        from model_config import get_model_config
+        
+        # Another model family may use other class ids - don't carry track state across it
+        reset_tracks = self.current_model_type is not None and model_type != self.current_model_type
+        self.yolo_model = model
+        self.current_model_type = model_type
+        self.current_model_config = get_model_config(model_type)
+        
+        thread = getattr(self, 'thread', None)
+        if thread is not None:
+            thread.request_model_swap(self.yolo_model, self.current_model_config, reset_tracks=reset_tracks)
+        
+        # Update spinboxes with model's default values
+        if hasattr(self, 'imgsz_spinbox'):
+            self.imgsz_spinbox.setValue(self.current_model_config['default_imgsz'])
+        if hasattr(self, 'conf_spinbox'):
+            self.conf_spinbox.setValue(self.current_model_config['default_conf'])
+        self.update_model_info_label()
+        
+        print(f"✅ Model loaded: {weight_path}")
+        self.status_label.setText(f"Status: Loaded {model_type} - {weight_name}")
+        self.statusBar().showMessage(f"Ready - {model_type} loaded")
+        
+        main = self._get_globals()
+        main.mark_startup('model loaded')
+        main.report_import_timing()
+    
+    def _on_model_load_failed(self, worker, model_type, weight_name, message):
+        if worker is not self._latest_model_loader:
+            return
+        self.status_label.setText(f"Status: Failed to load {model_type} - {weight_name}")
+        QMessageBox.warning(self, "Model Load Error", f"Could not load model:\n{message}")
     
     def update_weight_combo(self):
         """Update weight dropdown based on selected model type"""
@@ -112,13 +143,8 @@ class ModelHandlerMixin:
         weight_name = self.weight_combo.currentText()
         
         if weight_name:
-            success = self.load_model(model_type, weight_name)
-            if success:
-                # Update spinboxes with model default values
-                if self.current_model_config:
-                    self.imgsz_spinbox.setValue(self.current_model_config['default_imgsz'])
-                    self.conf_spinbox.setValue(self.current_model_config['default_conf'])
-                self.update_model_info_label()
+            # Spinboxes and info label are updated once the model is loaded (_on_model_loaded)
+            self.load_model(model_type, weight_name)
     
     def on_imgsz_changed(self):
         """Handle image size change"""
@@ -57,9 +57,9 @@ class ReferenceVectorHandlerMixin:
         print(f"   Vector: ({dx:.1f}, {dy:.1f})")
         print(f"   Angle: {angle:.2f}°")
         
-        # ⚠️ CRITICAL: Update VehicleTracker with reference angle
+        # ⚠️ CRITICAL: Update VehicleTracker with reference angle (via the compiled config)
         if hasattr(self, 'thread') and self.thread is not None:
-            self.thread.set_reference_angle(angle)
+            self._sync_camera_config()
             print(f"🎯 Applied ref_angle={angle:.1f}° to VehicleTracker")
         else:
             print(f"⚠️ Warning: VideoThread not initialized yet, ref_angle will be applied when video loads")
@@ -0,0 +1,213 @@
+"""
+Headless Runner - Chạy detection trên video không cần GUI (không render hiển thị)
+Dùng cùng VideoThread với GUI; chỉ ghi event log / evidence
+"""
+import signal
+from functools import partial
+from pathlib import Path
+
+from model_config import MODEL_TYPES, get_available_weights, get_weight_path, get_model_config
+from utils.config_manager import ConfigManager
+from utils.import_timing import mark_startup
+from app.detection import (
+    check_tl_violation, check_speed_violation, check_lane_direction_match,
+    detect_tl_color_hsv, set_violation_checker_globals
+)
+
+VEHICLE_CLASSES = {0: "o to", 1: "xe bus", 2: "xe dap", 3: "xe may", 4: "xe tai"}
+ALLOWED_VEHICLE_IDS = [0, 1, 2, 3, 4]
+
+
+def _resolve_weights(model_type, model=None):
+    """Weight path: explicit file, weight name in the model folder, or first available weight"""
+    if model and Path(model).is_file():
+        return str(model)
+    if model:
+        return get_weight_path(model_type, model)
+    weights = get_available_weights(model_type)
+    if not weights:
+        raise FileNotFoundError(f"No weights found for {model_type}")
+    return get_weight_path(model_type, weights[0])
+
+
+def _build_globals(camera_config):
+    """Same globals_ref layout as MainWindow; ROI geometry comes from the compiled CameraConfig"""
+    tl_rois = [geometry + ('unknown',) for geometry in camera_config.tl_geometry]
+
+    # Module-level link kept for single-camera runs; VideoThread passes this camera's TL/zones explicitly
+    # so several pipelines can share one process (CameraSupervisor shared_inference)
+    set_violation_checker_globals(tl_rois, list(camera_config.direction_rules), {})
+
+    return {
+        'ALLOWED_VEHICLE_IDS': ALLOWED_VEHICLE_IDS,
+        'VEHICLE_CLASSES': VEHICLE_CLASSES,
+        'TL_ROIS': tl_rois,
+        'get_show_all_boxes': lambda: True,
+        'check_tl_violation': check_tl_violation,
+        'check_speed_violation': check_speed_violation,
+        'check_lane_direction_match': check_lane_direction_match,
+        'detect_tl_color': detect_tl_color_hsv,
+        'VIOLATOR_TRACK_IDS': set(),
+        'RED_LIGHT_VIOLATORS': set(),
+        'LANE_VIOLATORS': set(),
+        'PASSED_VEHICLES': set(),
+        'MOTORBIKE_COUNT': set(),
+        'CAR_COUNT': set()
+    }
+
+
+def load_camera_config(config_manager, config_path, tl_rois=None):
+    """
+    Load + validate + compile a config file (hot reload callback)
+
+    Args:
+        tl_rois: TL_ROIS list of the thread's globals - refreshed when the TL geometry changed
+
+    Returns:
+        CameraConfig, or None if the file can't be loaded (the current config stays active)
+    """
+    from core import CameraConfig
+
+    data = config_manager.load_config_file(config_path)
+    if data is None:
+        return None
+    camera_config = CameraConfig.from_loaded(data)
+    if tl_rois is not None and [tuple(tl[:5]) for tl in tl_rois] != list(camera_config.tl_geometry):
+        tl_rois[:] = [geometry + ('unknown',) for geometry in camera_config.tl_geometry]
+    return camera_config
+
+
+def load_model(model_type="YOLOv8", model=None):
+    """
+    Load YOLO weights for a model type (optimized artifact from models/.cache, warmed up)
+
+    Returns:
+        (yolo_model, weight_path)
+    """
+    from core.model_loader import load_optimized_model
+
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type: {model_type}")
+    config = get_model_config(model_type)
+    weight_path = _resolve_weights(model_type, model)
+    print(f"🔄 Loading {model_type} model: {weight_path}...")
+    # Cached optimized artifact + warm-up: the first frame runs at full speed
+    yolo_model = load_optimized_model(weight_path, config.get('warmup_imgsz') or [config['default_imgsz']],
+                                      config.get('backend', 'pytorch'), config['default_conf'])
+    mark_startup('model loaded')
+    return yolo_model, weight_path
+
+
+def build_headless_thread(video_path, config_path=None, model=None, model_type="YOLOv8",
+                          name=None, yolo_model=None, decode_process=False, watch_config=False, live_stream=None,
+                          start_time=None, end_time=None, checkpoint=False, checkpoint_interval=60.0,
+                          motion_gate=False):
+    """
+    Tạo VideoThread đã cấu hình đầy đủ để chạy không hiển thị (chưa chạy)
+
+    Args:
+        video_path: Đường dẫn video hoặc URL stream
+        config_path: File config JSON (None = config đã lưu của video trong configs/)
+        model: Tên file weight trong thư mục model, hoặc đường dẫn .pt (None = weight đầu tiên)
+        model_type: Loại model trong MODEL_TYPES
+        name: Tên nguồn cho event log / evidence (None = video_path)
+        yolo_model: Model YOLO đã load sẵn (None = load từ model/model_type)
+        decode_process: Decode video trong process riêng, frame qua shared memory (SharedFrameCapture)
+        watch_config: Hot reload - file config đổi thì áp dụng ở frame kế tiếp, không restart pipeline
+        live_stream: Nguồn live (kết nối lại, chỉ lấy frame mới nhất); None = tự nhận URL stream,
+            True với file video = camera giả lập (đọc theo FPS gốc) để test
+        start_time, end_time: Chỉ xử lý đoạn [start_time, end_time) giây của video (None = đầu / cuối)
+        checkpoint: Lưu tiến độ định kỳ; còn checkpoint của lần chạy bị dừng thì chạy tiếp từ đó.
+            True = file mặc định trong checkpoints/, hoặc đường dẫn file
+        checkpoint_interval: Chu kỳ lưu checkpoint (giây video)
+        motion_gate: Bỏ qua detector khi không có gì chuyển động trong làn/stopline (vẫn detect thưa
+            để giữ tracker) - True = MotionGate mặc định, hoặc MotionGate đã cấu hình
+    """
+    from core import VideoThread, CameraConfig, JobCheckpoint, MotionGate
+    from utils.config_watcher import ConfigFileWatcher
+
+    config_manager = ConfigManager()
+    if config_path:
+        config = config_manager.load_config_file(config_path)
+    else:
+        config = config_manager.load_config(video_path)
+    if config is None:
+        print("⚠️ Headless: no configuration - only vehicle counting/tracking will run")
+
+    camera_config = CameraConfig.from_loaded(config)  # Raises ConfigError on degenerate geometry
+
+    thread = VideoThread(video_path, name=name)
+    globals_ref = _build_globals(camera_config)
+    thread.set_globals_reference(globals_ref)
+    thread.set_camera_config(camera_config)
+
+    if watch_config:
+        watched_path = config_path or config_manager.get_config_path(video_path)
+        thread.watch_config_file(ConfigFileWatcher(watched_path),
+                                 partial(load_camera_config, config_manager, tl_rois=globals_ref['TL_ROIS']))
+        print(f"👀 Watching config for changes: {watched_path}")
+
+    if yolo_model is None:
+        yolo_model, _ = load_model(model_type, model)
+    thread.set_model(yolo_model)
+    thread.model_config = get_model_config(model_type)
+
+    # No display: nothing is rendered, every frame is processed, stop at the end of the video
+    thread.set_render_enabled(False)
+    thread.realtime_mode = False
+    thread.loop_video = False
+    thread.detection_enabled = True
+    thread.decode_process = decode_process
+    thread.live_stream = live_stream
+    thread.set_time_range(start_time, end_time)
+    if checkpoint:
+        path = JobCheckpoint.default_path(name or video_path, start_time, end_time) if checkpoint is True \
+            else checkpoint
+        thread.checkpoint = JobCheckpoint(path, checkpoint_interval)
+        print(f"💾 Checkpointing every {checkpoint_interval:g}s of video to {path}")
+    if motion_gate:
+        thread.motion_gate = MotionGate() if motion_gate is True else motion_gate
+    return thread
+
+
+def run_headless(video_path, config_path=None, model=None, model_type="YOLOv8", decode_process=False,
+                 watch_config=False, live_stream=None, start_time=None, end_time=None, checkpoint=False,
+                 checkpoint_interval=60.0, motion_gate=False):
+    """
+    Xử lý toàn bộ video một lần, không hiển thị
+
+    Args:
+        video_path: Đường dẫn video
+        config_path: File config JSON (None = config đã lưu của video trong configs/)
+        model: Tên file weight trong thư mục model, hoặc đường dẫn .pt (None = weight đầu tiên)
+        model_type: Loại model trong MODEL_TYPES
+        decode_process: Decode video trong process riêng (giải phóng GIL cho inference + rules)
+        watch_config: Hot reload file config khi đang chạy
+        live_stream: Xử lý như camera live (None = tự nhận URL stream)
+        start_time, end_time: Đoạn video cần xử lý (giây)
+        checkpoint: Lưu/khôi phục tiến độ (True = file mặc định, hoặc đường dẫn file)
+        checkpoint_interval: Chu kỳ lưu checkpoint (giây video)
+        motion_gate: Bỏ qua detector khi ROI không có chuyển động
+
+    Returns:
+        Dict thống kê vi phạm (ViolationDetector.get_statistics())
+    """
+    thread = build_headless_thread(video_path, config_path, model, model_type, decode_process=decode_process,
+                                   watch_config=watch_config, live_stream=live_stream,
+                                   start_time=start_time, end_time=end_time, checkpoint=checkpoint,
+                                   checkpoint_interval=checkpoint_interval, motion_gate=motion_gate)
+
+    if checkpoint:
+        # Preempted (SIGTERM) or interrupted: end the loop cleanly so the final checkpoint is written
+        def stop_gracefully(signum, frame):
+            print(f"⏹️ Signal {signum} - stopping after the current frame")
+            thread._run_flag = False
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, stop_gracefully)
+
+    print(f"▶️ Headless run: {video_path}")
+    thread.run()  # Runs in the calling thread
+
+    stats = thread.violation_detector.get_statistics()
+    print(f"✅ Headless run finished: {stats}")
+    return stats
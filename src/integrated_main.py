@@ -1,27 +1,27 @@
 import sys
-import cv2
 import numpy as np
 import os
 import math
 
-# CRITICAL: Import YOLO BEFORE PyQt to avoid DLL conflicts
-try:
-    from ultralytics import YOLO
-    print("✅ YOLO imported successfully before PyQt")
-    YOLO_AVAILABLE = True
-except Exception as e:
-    print(f"❌ YOLO import failed: {e}")
-    YOLO_AVAILABLE = False
-
-from PyQt5.QtWidgets import QApplication, QWidget, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QListWidget, QFileDialog, QInputDialog, QMessageBox, QComboBox, QSpinBox, QDoubleSpinBox, QMenu, QAction, QMenuBar, QDialog
-from PyQt5.QtCore import QThread, pyqtSignal, QTimer, Qt
+from utils.backend_loader import BackendLoader
+from utils.import_timing import mark_startup, report_import_timing
+
+# torch/ultralytics take seconds to import - load them in the background while the window appears.
+# On Windows they must still load BEFORE PyQt to avoid DLL conflicts, so import them up front there.
+BACKENDS = BackendLoader()
+if sys.platform == 'win32':
+    BACKENDS.load_now()
+else:
+    BACKENDS.start()
+
+from PyQt5.QtWidgets import QApplication, QWidget, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QListWidget, QInputDialog, QMessageBox, QComboBox, QSpinBox, QDoubleSpinBox, QMenu, QAction, QMenuBar, QDialog
+from PyQt5.QtCore import QThread, pyqtSignal, QTimer, Qt, QEvent
 from PyQt5.QtGui import QImage, QPixmap, QCursor
 from ui.lane_selector import VehicleTypeDialog
-import torch
 from model_config import scan_all_models, get_weight_path, get_model_config, migrate_old_weights
 
 # Import core OOP modules
-from core import VehicleTracker, ViolationDetector, StopLineManager, TrafficLightManager, VideoThread
+from core import VehicleTracker, ViolationDetector, StopLineManager, TrafficLightManager, RenderWorker
 
 # Import Direction Detection modules
 from core.roi_direction_manager import ROIDirectionManager
@@ -42,11 +42,11 @@ from handlers import (
 )
 
 # Import new modular functions
-from app.geometry import point_in_polygon, point_to_segment_distance, is_on_stop_line
+from app.geometry import point_to_segment_distance
 from app.detection import (
     tl_pixel_state, classify_tl_color,
     calculate_vehicle_direction, estimate_vehicle_speed,
-    check_tl_violation, check_speed_violation, check_lane_direction_match,
+    check_speed_violation, check_lane_direction_match,
     set_vehicle_positions_ref, set_violation_checker_globals
 )
 
@@ -78,9 +78,9 @@ set_vehicle_positions_ref(VEHICLE_POSITIONS)
 # Link TL_ROIS, DIRECTION_ROIS, VEHICLE_DIRECTIONS to violation_checker module
 set_violation_checker_globals(TL_ROIS, DIRECTION_ROIS, VEHICLE_DIRECTIONS)
 
-# NOTE: tl_pixel_state, classify_tl_color, point_in_polygon are imported from modules
+# NOTE: tl_pixel_state, classify_tl_color are imported from modules
 # See imports at top of file:
-#   from app.geometry import point_in_polygon, point_to_segment_distance, is_on_stop_line
+#   from app.geometry import point_to_segment_distance
 #   from app.detection import tl_pixel_state, classify_tl_color, ...
 
 # Global variables
@@ -117,12 +117,12 @@ def is_on_stop_line(cx, cy, threshold=15):
 
 # NOTE: check_speed_violation is imported from app.detection (100% identical)
 
-# NOTE: check_lane_direction_match and check_tl_violation are imported from app.detection
+# NOTE: check_lane_direction_match is imported from app.detection (check_tl_violation: handlers/video_handler.py)
 # They use TL_ROIS, DIRECTION_ROIS, VEHICLE_DIRECTIONS via set_violation_checker_globals() called above
 
 
 class MainWindow(QMainWindow, DirectionROIHandlerMixin, ReferenceVectorHandlerMixin, TrafficLightHandlerMixin, LaneHandlerMixin, ConfigHandlerMixin, EventHandlerMixin, ModelHandlerMixin, DisplayHandlerMixin, DialogHandlerMixin, VideoHandlerMixin, DetectionHandlerMixin):
-    def __init__(self):
+    def __init__(self, video_path=None):
         super().__init__()
         
         # Declare globals used in this method
@@ -133,28 +133,14 @@ class MainWindow(QMainWindow, DirectionROIHandlerMixin, ReferenceVectorHandlerMi
         # Initialize ROI Editor
         self.roi_editor = ROIEditor()
         
-        # Ask user to select video FIRST before showing main UI
-        video_path, _ = QFileDialog.getOpenFileName(
-            self,
-            "Select Video File to Start",
-            "",
-            "Video Files (*.mp4 *.avi *.mov *.mkv);;All Files (*.*)"
-        )
-        
-        if not video_path:
-            # User cancelled - exit application
-            print("❌ No video selected. Exiting...")
-            QApplication.quit()
-            return
-        
+        # Video is opened once the window is up (see _open_initial_video)
         self.video_path = video_path
-        print(f"📹 Selected video: {video_path}")
         
         # Now setup the UI
         self.setWindowTitle("Traffic Violation Detector - Integrated")
         self.setGeometry(50, 50, 1600, 900)
         
-        # Pre-load YOLO model in main thread to avoid DLL issues in QThread
+        # Model is loaded once the detection backends finish importing (see _poll_backends)
         self.yolo_model = None
         self.current_model_type = None
         self.current_model_config = None
@@ -169,18 +155,7 @@ class MainWindow(QMainWindow, DirectionROIHandlerMixin, ReferenceVectorHandlerMi
         # Setup menu bar AFTER available_models is initialized
         self.setup_menu_bar()
         
-        # Auto-load first available model
-        if YOLO_AVAILABLE and self.available_models:
-            first_model_type = list(self.available_models.keys())[0]
-            first_weight = self.available_models[first_model_type]["weights"][0]
-            self.load_model(first_model_type, first_weight)
-        else:
-            print("⚠️ YOLO not available or no models found, detection disabled")
-        
-        # Initialize TL tracking (manual ROI only, no auto-detection)
-        self.tl_tracking_active = False  # Continuous color tracking flag
-        self.tl_color_frame_count = 0  # Counter for color update throttling
-        self.cap = None  # Will be set when video loads
+        # TL ROIs are drawn manually; their colors are tracked by VideoThread
         print("✅ Manual TL ROI mode enabled")
         
         # Initialize display scale variables for accurate click detection
@@ -395,6 +370,7 @@ class MainWindow(QMainWindow, DirectionROIHandlerMixin, ReferenceVectorHandlerMi
         self.show_ref_vector = True  # Toggle for reference vector display
         self.ref_vector_p1 = None
         self.ref_vector_p2 = None
+        self.ground_calibration = None  # 4-point ground-plane calibration (speed rule)
         
         # Config Manager
         self.config_manager = ConfigManager()
@@ -435,52 +411,28 @@ class MainWindow(QMainWindow, DirectionROIHandlerMixin, ReferenceVectorHandlerMi
         self.control_layout = control_layout
         self.control_panel_visible = False
         
-        # Video thread - start with selected video
-        self.thread = VideoThread(self.video_path)
-        self.thread.change_pixmap_signal.connect(self.update_image)
-        self.thread.error_signal.connect(self.show_error)
-        
-        # Pass globals reference to thread
-        # Use lambda for _show_all_boxes to get real-time value
-        self.thread.set_globals_reference({
-            'ALLOWED_VEHICLE_IDS': ALLOWED_VEHICLE_IDS,
-            'VEHICLE_CLASSES': VEHICLE_CLASSES,
-            'LANE_CONFIGS': LANE_CONFIGS,
-            'TL_ROIS': TL_ROIS,
-            'DIRECTION_ROIS': DIRECTION_ROIS,
-            'get_show_all_boxes': lambda: globals()['_show_all_boxes'],
-            'is_on_stop_line': is_on_stop_line,
-            'check_tl_violation': check_tl_violation,
-            'point_in_polygon': point_in_polygon,
-            'VIOLATOR_TRACK_IDS': VIOLATOR_TRACK_IDS,
-            'RED_LIGHT_VIOLATORS': RED_LIGHT_VIOLATORS,
-            'LANE_VIOLATORS': LANE_VIOLATORS,
-            'PASSED_VEHICLES': PASSED_VEHICLES,
-            'MOTORBIKE_COUNT': MOTORBIKE_COUNT,
-            'CAR_COUNT': CAR_COUNT
-        })
-        
-        # Set model and config to thread if loaded
-        if self.yolo_model is not None:
-            self.thread.set_model(self.yolo_model)
-            self.thread.model_config = self.current_model_config
-        
-        self.thread.start()
-        
-        # Initialize cap and current_frame for TL detection
-        self.current_frame = None
-        self.cap = cv2.VideoCapture(self.video_path)
-        
-        # Wait for first frame before auto-detect
-        import time
-        time.sleep(0.5)  # Wait for video thread to emit first frame
-        
-        # Trigger auto-detect after first frame is ready
-        if self.cap.isOpened():
-            ret, first_frame = self.cap.read()
-            if ret:
-                self.current_frame = first_frame
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Reset to start
+        # Render worker - composes display frames off the GUI thread, GUI only blits
+        self.render_worker = RenderWorker()
+        self.render_worker.set_scene_painter(self.paint_scene)
+        self.render_worker.frame_ready.connect(self.update_image)
+        self.render_worker.start()
+        
+        self.current_frame = None  # Set by the first rendered frame
+        
+        # Load the model as soon as the background imports are done
+        self._backend_timer = QTimer(self)
+        self._backend_timer.timeout.connect(self._poll_backends)
+        self._backend_timer.start(50)
+        self.statusBar().showMessage("Loading detection backends...")
+        
+        # Recompile the ROI config for VideoThread whenever the drawn ROIs change
+        self._config_timer = QTimer(self)
+        self._config_timer.timeout.connect(self._sync_camera_config)
+        self._config_timer.timeout.connect(self._refresh_overlay_scene)  # Overlay snapshot for the RenderWorker
+        self._config_timer.start(200)
+        
+        # Open the video after the window has been shown (never block before the first paint)
+        QTimer.singleShot(0, self._open_initial_video)
         
         # No auto-detect - user will draw TL ROIs manually
         self.update_lists()
@@ -735,13 +687,55 @@ class MainWindow(QMainWindow, DirectionROIHandlerMixin, ReferenceVectorHandlerMi
     # NOTE: select_video moved to VideoHandlerMixin
     # NOTE: show_error moved to VideoHandlerMixin
     
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self._update_render_state()
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._update_render_state()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._update_render_state()
+    
+    def _open_initial_video(self):
+        mark_startup('window shown')
+        if self.video_path:
+            self.open_video(self.video_path)
+        elif not self.select_video():
+            # User cancelled - exit application
+            print("❌ No video selected. Exiting...")
+            self.close()
+    
+    def _poll_backends(self):
+        """Load the first model once torch/ultralytics are imported (GUI stays responsive meanwhile)"""
+        if not BACKENDS.is_ready():
+            return
+        self._backend_timer.stop()
+        
+        if BACKENDS.available('ultralytics') and self.available_models:
+            first_model_type = list(self.available_models.keys())[0]
+            first_weight = self.available_models[first_model_type]["weights"][0]
+            self.load_model(first_model_type, first_weight)  # Startup report is printed once it's loaded
+        else:
+            print("⚠️ YOLO not available or no models found, detection disabled")
+            self.statusBar().showMessage("Detection disabled - YOLO not available or no models found")
+            report_import_timing()
+    
     def closeEvent(self, event):
-        self.thread.stop()
+        self._config_timer.stop()
+        if getattr(self, 'thread', None) is not None:
+            self.thread.stop()
+        self.render_worker.stop()
+        for loader in list(getattr(self, '_model_loaders', ())):
+            loader.wait()  # A QThread must not be destroyed while still running
         event.accept()
 
-def main():
+def main(video_path=None):
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(video_path)
     window.show()
     sys.exit(app.exec_())
 
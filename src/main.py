@@ -1,12 +1,88 @@
 """
 Traffic Violation Detection System - Main Entry Point
-Simple entry point that runs integrated_main.py
+Runs the GUI (integrated_main.py), a headless pass over a video with --headless
+(--chunks N: in parallel time chunks, --scan: only in windows found by a quick scan),
+or every camera of a site manifest with --site
 """
 
+import argparse
 import sys
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Traffic Violation Detection System")
+    parser.add_argument("--video", help="Video file to process (GUI: opened at startup instead of asking)")
+    parser.add_argument("--config", help="ROI config JSON (default: saved config of the video)")
+    parser.add_argument("--model", help="Weight file name (in models/<type>/) or path to a .pt file")
+    parser.add_argument("--model-type", default="YOLOv8", help="Model type (see model_config.MODEL_TYPES)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Process the video without GUI/rendering, then exit")
+    parser.add_argument("--decode-process", action="store_true",
+                        help="Headless: decode the video in a separate process (frames via shared memory)")
+    parser.add_argument("--watch-config", action="store_true",
+                        help="Headless: reload the ROI config when its file changes (no restart)")
+    parser.add_argument("--live", action="store_true", default=None,
+                        help="Headless: treat --video as a live camera (reconnects, latest frame only); "
+                             "with a file, plays it at its native FPS like a camera")
+    parser.add_argument("--start", type=float, help="Headless: start at this time of the video (seconds)")
+    parser.add_argument("--end", type=float, help="Headless: stop at this time of the video (seconds)")
+    parser.add_argument("--checkpoint", nargs="?", const=True, default=False, metavar="PATH",
+                        help="Headless: save progress periodically and resume an interrupted run "
+                             "(default file in checkpoints/)")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0,
+                        help="Seconds of video between checkpoints (default: 60)")
+    parser.add_argument("--chunks", type=int,
+                        help="Headless: split the video into N time chunks processed in parallel, then merge")
+    parser.add_argument("--overlap", type=float, default=10.0,
+                        help="Seconds of warm-up/tail overlap between chunks (default: 10)")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="Headless: skip the detector while nothing moves in the lanes/stopline area")
+    parser.add_argument("--scan", action="store_true",
+                        help="Headless: quick scan first (light state + motion at the stopline), then run "
+                             "detection only in the candidate time windows")
+    parser.add_argument("--scan-step", type=float, default=1.0,
+                        help="Seconds between scanned frames (default: 1)")
+    parser.add_argument("--scan-any-light", action="store_true",
+                        help="Scan: any motion across the stopline is a candidate, not only on red")
+    parser.add_argument("--import-timing", action="store_true",
+                        help="Print a startup report: milestones and per-module import times")
+    parser.add_argument("--site", help="Site manifest JSON: run one headless pipeline process per camera")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    # Import and run the integrated main application
-    from integrated_main import main
-    main()
+    args = parse_args()
+
+    if args.import_timing:
+        # Must be installed before any heavy module is imported
+        import atexit
+        from utils.import_timing import start_import_timing, report_import_timing
+        start_import_timing()
+        atexit.register(report_import_timing)
 
+    if args.site:
+        from camera_supervisor import run_site
+        run_site(args.site)
+    elif args.headless:
+        if not args.video:
+            sys.exit("--headless requires --video")
+        if args.chunks:
+            from chunked_runner import run_chunked
+            run_chunked(args.video, workers=args.chunks, overlap=args.overlap, config_path=args.config,
+                        model=args.model, model_type=args.model_type, checkpoint=bool(args.checkpoint))
+            sys.exit(0)
+        if args.scan:
+            from scan_runner import run_scanned
+            run_scanned(args.video, config_path=args.config, model=args.model, model_type=args.model_type,
+                        step=args.scan_step, require_red=not args.scan_any_light)
+            sys.exit(0)
+        from headless_runner import run_headless
+        run_headless(args.video, config_path=args.config, model=args.model, model_type=args.model_type,
+                     decode_process=args.decode_process, watch_config=args.watch_config,
+                     live_stream=args.live, start_time=args.start, end_time=args.end,
+                     checkpoint=args.checkpoint, checkpoint_interval=args.checkpoint_interval,
+                     motion_gate=args.motion_gate)
+    else:
+        # Import and run the integrated main application
+        from integrated_main import main
+        main(args.video)
@@ -7,6 +7,7 @@ from pathlib import Path
 # Base directory - go up one level from src/ to traffic-violation-detector/
 BASE_DIR = Path(__file__).parent.parent
 MODELS_DIR = BASE_DIR / "models"
+MODEL_CACHE_DIR = MODELS_DIR / ".cache"  # Model đã tối ưu (fuse/ONNX/OpenVINO), key theo hash weight + imgsz
 
 # Model types configuration
 MODEL_TYPES = {
@@ -15,14 +16,18 @@ MODEL_TYPES = {
         "description": "YOLOv8 - Fast and accurate",
         "classes": [0, 1, 2, 3, 4],  # ô tô, xe bus, xe đạp, xe máy, xe tải
         "default_imgsz": 416,
-        "default_conf": 0.3
+        "default_conf": 0.3,
+        "warmup_imgsz": [416],  # Warm-up khi load (imgsz đầu tiên dùng cho ONNX/OpenVINO export)
+        "backend": "pytorch"  # pytorch | onnx | openvino
     },
     "RT-DETR": {
         "folder": "rtdetr",
         "description": "RT-DETR - Transformer-based (Coming soon)",
         "classes": [0, 1, 2, 5],  # Different class mapping
         "default_imgsz": 640,
-        "default_conf": 0.5
+        "default_conf": 0.5,
+        "warmup_imgsz": [640],
+        "backend": "pytorch"
     }
 }
 
@@ -0,0 +1,174 @@
+"""
+Scan Runner - Quét nhanh video dài trước, chỉ chạy detection đầy đủ trong các khoảng thời gian đáng xét
+Lượt quét thô: mỗi `step` giây lấy 1 frame, thu nhỏ, đọc màu đèn (ROI đèn trong config) và
+đo chuyển động quanh stopline (trừ frame) → khoảng ứng viên (đèn đỏ + có xe qua vạch) → headless từng khoảng
+"""
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+from app.detection import detect_tl_color_hsv
+
+
+@dataclass(frozen=True)
+class ScanSample:
+    """1 frame của lượt quét"""
+    media_time: float
+    red: Optional[bool]  # None = config không có ROI đèn
+    motion: float  # Tỉ lệ pixel thay đổi quanh stopline so với mẫu trước (0..1)
+
+
+def scan_video(video_path: str, camera_config, step: float = 1.0, scale: float = 0.25,
+               seek_above: int = 250) -> Tuple[List[ScanSample], float]:
+    """
+    Lượt quét thô: decode 1 frame mỗi `step` giây
+
+    Args:
+        camera_config: CameraConfig - ROI đèn và stopline
+        step: Khoảng cách giữa 2 mẫu (giây)
+        scale: Hệ số thu nhỏ frame cho phép trừ frame
+        seek_above: Bước dài hơn số frame này thì seek thay vì grab() từng frame
+            (seek phải decode lại từ keyframe - chỉ lợi khi bước dài hơn 1 GOP)
+
+    Returns:
+        (danh sách mẫu, độ dài video giây)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Cannot open video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    step_frames = max(1, int(round(step * fps)))
+
+    samples: List[ScanSample] = []
+    mask = None
+    previous = None
+    index = 0
+    try:
+        while cap.grab():
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+            small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+            if mask is None:
+                full_mask = camera_config.activity_mask(frame.shape, stopline_only=True)
+                mask = cv2.resize(full_mask, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_NEAREST) \
+                    if full_mask is not None else False  # No stopline: whole frame
+            motion = 0.0
+            if previous is not None:
+                _, moving = cv2.threshold(cv2.absdiff(gray, previous), 25, 255, cv2.THRESH_BINARY)
+                if mask is not False:
+                    moving = cv2.bitwise_and(moving, mask)
+                    area = cv2.countNonZero(mask)
+                else:
+                    area = moving.size
+                motion = cv2.countNonZero(moving) / max(1, area)
+            previous = gray
+
+            red = None
+            if camera_config.traffic_lights:
+                # TL ROIs are tiny - classified on the full-resolution frame
+                red = any(detect_tl_color_hsv(frame[tl.rows, tl.cols]) == 'đỏ'
+                          for tl in camera_config.traffic_lights)
+            samples.append(ScanSample(index / fps, red, motion))
+
+            index += step_frames
+            if step_frames > seek_above:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            elif not all(cap.grab() for _ in range(step_frames - 1)):
+                break
+    finally:
+        cap.release()
+
+    duration = frame_count / fps if frame_count > 0 else (samples[-1].media_time + step if samples else 0.0)
+    return samples, duration
+
+
+def candidate_windows(samples: List[ScanSample], duration: float, step: float = 1.0,
+                      motion_threshold: float = 0.02, padding: float = 8.0, merge_gap: float = 5.0,
+                      require_red: bool = True) -> List[Tuple[float, float]]:
+    """
+    Khoảng thời gian cần chạy detection đầy đủ
+
+    Mẫu "nóng": có chuyển động quanh stopline và đèn đỏ ở mẫu này hoặc mẫu trước
+    (xe qua vạch lúc đèn vừa đổi). Mỗi mẫu nóng → [t - step - padding, t + padding];
+    padding trước để track ổn định trước khi xe tới vạch, padding sau để chốt verdict
+
+    Args:
+        require_red: False = mọi chuyển động qua vạch (cả vi phạm làn/hướng/tốc độ)
+        merge_gap: Gộp 2 khoảng cách nhau không quá merge_gap giây (đỡ khởi động lại tracker)
+    """
+    windows: List[List[float]] = []
+    previous_red = False
+    for sample in samples:
+        red_phase = sample.red is None or sample.red or previous_red
+        previous_red = bool(sample.red)
+        if sample.motion < motion_threshold or (require_red and not red_phase):
+            continue
+        start = max(0.0, sample.media_time - step - padding)
+        end = min(duration, sample.media_time + padding)
+        if windows and start - windows[-1][1] <= merge_gap:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+    return [(start, end) for start, end in windows]
+
+
+def run_scanned(video_path: str, config_path: Optional[str] = None, model: Optional[str] = None,
+                model_type: str = "YOLOv8", step: float = 1.0, motion_threshold: float = 0.02,
+                padding: float = 8.0, require_red: bool = True) -> Dict:
+    """
+    Quét nhanh rồi chạy headless chỉ trong các khoảng ứng viên
+
+    Args:
+        video_path: File video (phải seek được)
+        config_path: File config JSON (None = config đã lưu của video)
+        step: Khoảng cách giữa 2 mẫu quét (giây)
+        motion_threshold: Tỉ lệ pixel thay đổi quanh stopline để tính là có xe qua vạch
+        padding: Thời gian chạy thêm trước/sau mỗi mẫu nóng (giây)
+        require_red: Chỉ xét lúc đèn đỏ (False = mọi chuyển động qua vạch)
+
+    Returns:
+        Dict: các khoảng đã xử lý, tỉ lệ video đã xử lý, thống kê vi phạm cộng dồn
+    """
+    from core import CameraConfig
+    from core.model_loader import reset_tracker_state
+    from headless_runner import build_headless_thread, load_model
+    from utils.config_manager import ConfigManager
+
+    config_manager = ConfigManager()
+    config = config_manager.load_config_file(config_path) if config_path else config_manager.load_config(video_path)
+    camera_config = CameraConfig.from_loaded(config)
+    if camera_config.stopline is None:
+        print("⚠️ Scan: no stopline in the config - motion is measured over the whole frame")
+    if require_red and not camera_config.traffic_lights:
+        print("⚠️ Scan: no traffic light ROI in the config - every moving sample is a candidate")
+
+    scan_started = time.time()
+    samples, duration = scan_video(video_path, camera_config, step)
+    windows = candidate_windows(samples, duration, step, motion_threshold, padding, require_red=require_red)
+    covered = sum(end - start for start, end in windows)
+    print(f"🔎 Scan: {len(samples)} samples in {time.time() - scan_started:.1f}s → {len(windows)} windows, "
+          f"{covered:.0f}s of {duration:.0f}s ({covered / max(duration, 1e-6):.0%}) to process")
+
+    totals: Dict[str, int] = {}
+    if windows:
+        yolo_model, _ = load_model(model_type, model)
+        for i, (start, end) in enumerate(windows):
+            print(f"▶️ Window {i + 1}/{len(windows)}: {start:.1f}-{end:.1f}s")
+            reset_tracker_state(yolo_model)  # Windows are not contiguous - no track carries over
+            thread = build_headless_thread(video_path, config_path, model, model_type, yolo_model=yolo_model,
+                                           start_time=start, end_time=end)
+            thread.run()
+            for key, value in thread.violation_detector.get_statistics().items():
+                totals[key] = totals.get(key, 0) + value
+
+    print(f"✅ Scanned run finished: {totals}")
+    return {
+        'windows': windows,
+        'processed_fraction': covered / duration if duration else 0.0,
+        'stats': totals,
+    }
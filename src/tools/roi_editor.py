@@ -196,6 +196,17 @@ class ROIEditor:
         ny = y1 + t * dy
         return np.sqrt((px - nx)**2 + (py - ny)**2)
     
+    def overlay_state(self):
+        """Immutable copy of what the editing overlay shows (None = not editing), safe to hand to another thread
+        
+        Returns:
+            (editing_roi_index, dragging_point_index, hover_point_index, hover_edge_indices) or None
+        """
+        if not self.is_editing():
+            return None
+        edge = tuple(self.hover_edge_indices) if self.hover_edge_indices is not None else None
+        return (self.editing_roi_index, self.dragging_point_index, self.hover_point_index, edge)
+    
     def draw_editing_overlay(self, frame, points):
         """
         Draw editing overlay on frame (points, hover effects, etc.)
@@ -204,8 +215,21 @@ class ROIEditor:
             frame: OpenCV image to draw on
             points: List of ROI points [[x,y], ...]
         """
-        if not self.is_editing() or len(points) == 0:
+        self.draw_overlay_state(frame, points, self.overlay_state())
+    
+    @staticmethod
+    def draw_overlay_state(frame, points, state):
+        """
+        Draw the editing overlay from an overlay_state() snapshot (no access to the editor itself)
+        
+        Args:
+            frame: OpenCV image to draw on
+            points: List of ROI points [[x,y], ...]
+            state: overlay_state() result
+        """
+        if state is None or len(points) == 0:
             return
+        _, dragging_point_index, hover_point_index, hover_edge_indices = state
         
         # Draw ROI polygon with thicker line
         pts = np.array(points, dtype=np.int32)
@@ -216,10 +240,10 @@ class ROIEditor:
             x, y = int(pt[0]), int(pt[1])
             
             # Different colors for different states
-            if i == self.dragging_point_index:
+            if i == dragging_point_index:
                 color = (0, 0, 255)  # Red for dragging
                 radius = 10
-            elif i == self.hover_point_index:
+            elif i == hover_point_index:
                 color = (0, 255, 0)  # Green for hover
                 radius = 9
             else:
@@ -234,8 +258,8 @@ class ROIEditor:
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
         
         # Highlight hovered edge
-        if self.hover_edge_indices is not None:
-            i1, i2 = self.hover_edge_indices
+        if hover_edge_indices is not None and max(hover_edge_indices) < len(points):
+            i1, i2 = hover_edge_indices
             p1 = points[i1]
             p2 = points[i2]
             cv2.line(frame, (int(p1[0]), int(p1[1])), (int(p2[0]), int(p2[1])),
@@ -0,0 +1,84 @@
+"""
+Backend Loader - Import torch/ultralytics (và ONNX Runtime nếu có) trong thread nền
+Cửa sổ GUI hiện lên ngay, model chỉ được load sau khi backend sẵn sàng
+"""
+import importlib
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+from utils.import_timing import mark_startup
+
+
+# Theo thứ tự import: torch trước (ultralytics import torch), backend tùy chọn sau cùng
+BACKEND_MODULES = ('torch', 'ultralytics', 'onnxruntime')
+OPTIONAL_BACKENDS = ('onnxruntime',)
+
+
+class BackendLoader:
+    """
+    Import các backend nặng một lần, trong thread nền
+
+    - start(): import trong thread nền (không block GUI)
+    - load_now(): import ngay trong thread gọi (dùng khi thứ tự load DLL quan trọng)
+    - wait()/is_ready(): chờ / kiểm tra đã import xong
+    - available(name): backend đã import thành công
+    """
+
+    def __init__(self, modules: Sequence[str] = BACKEND_MODULES, optional: Sequence[str] = OPTIONAL_BACKENDS):
+        self.modules = tuple(modules)
+        self.optional = set(optional)
+        self.timings: Dict[str, float] = {}  # Module → giây
+        self.errors: Dict[str, Exception] = {}
+        self._loaded = set()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        self._thread = threading.Thread(target=self._load, name='BackendLoader', daemon=True)
+        self._thread.start()
+        return self
+
+    def load_now(self):
+        with self._lock:
+            already_started = self._started
+            self._started = True
+        if already_started:
+            self.wait()
+        else:
+            self._load()
+        return self
+
+    def _load(self):
+        for name in self.modules:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception as e:  # DLL/CUDA errors surface as OSError/RuntimeError, not only ImportError
+                if name not in self.optional:
+                    self.errors[name] = e
+                    print(f"❌ {name} import failed: {e}")
+                continue
+            self.timings[name] = time.perf_counter() - start
+            self._loaded.add(name)
+
+        summary = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items())
+        print(f"✅ Backends ready ({summary})")
+        mark_startup('backends imported')
+        self._ready.set()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def available(self, name: str) -> bool:
+        """Backend đã import thành công (False nếu chưa xong hoặc lỗi)"""
+        return self._ready.is_set() and name in self._loaded
@@ -7,6 +7,8 @@ import os
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
+from core.camera_config import validate_config_data
+
 
 class ConfigManager:
     """Manages saving and loading of ROI configurations"""
@@ -45,7 +47,8 @@ class ConfigManager:
     def save_config(self, video_path: str, lane_configs: List[Dict], 
                    stop_line: Optional[Tuple], tl_rois: List[Tuple], 
                    direction_rois: List[Dict], 
-                   reference_vector: Optional[Tuple] = None) -> bool:
+                   reference_vector: Optional[Tuple] = None,
+                   ground_calibration: Optional[Dict] = None) -> bool:
         """
         Save all ROI configurations to JSON file
         
@@ -56,6 +59,7 @@ class ConfigManager:
             tl_rois: List of traffic light ROIs
             direction_rois: List of direction zone ROIs
             reference_vector: Optional reference vector for tilted camera
+            ground_calibration: Optional 4-point ground-plane calibration for speed
             
         Returns:
             True if save successful, False otherwise
@@ -71,7 +75,8 @@ class ConfigManager:
                 'stopline': self._serialize_stopline(stop_line),
                 'traffic_lights': self._serialize_traffic_lights(tl_rois),
                 'direction_zones': self._serialize_direction_zones(direction_rois),
-                'reference_vector': self._serialize_reference_vector(reference_vector)
+                'reference_vector': self._serialize_reference_vector(reference_vector),
+                'ground_calibration': self._serialize_ground_calibration(ground_calibration)
             }
             
             # Write to file with pretty formatting
@@ -95,23 +100,43 @@ class ConfigManager:
         Returns:
             Dictionary with all ROI data, or None if config doesn't exist
         """
-        try:
-            config_path = self.get_config_path(video_path)
-            
-            if not config_path.exists():
-                print(f"ℹ️ No config found for this video: {config_path}")
-                return None
+        config_path = self.get_config_path(video_path)
+        
+        if not config_path.exists():
+            print(f"ℹ️ No config found for this video: {config_path}")
+            return None
+        
+        return self.load_config_file(config_path)
+    
+    def load_config_file(self, config_path: str) -> Optional[Dict]:
+        """
+        Load ROI configuration from an explicit JSON file
+        
+        Args:
+            config_path: Path to config file
             
+        Returns:
+            Dictionary with all ROI data, or None if the file can't be loaded
+        """
+        try:
             with open(config_path, 'r', encoding='utf-8') as f:
                 config_data = json.load(f)
             
+            problems = validate_config_data(config_data)
+            if problems:
+                print(f"❌ Invalid config {config_path}:")
+                for problem in problems:
+                    print(f"   - {problem}")
+                return None
+            
             # Deserialize all components
             result = {
                 'lanes': self._deserialize_lanes(config_data.get('lanes', [])),
                 'stopline': self._deserialize_stopline(config_data.get('stopline')),
                 'traffic_lights': self._deserialize_traffic_lights(config_data.get('traffic_lights', [])),
                 'direction_zones': self._deserialize_direction_zones(config_data.get('direction_zones', [])),
-                'reference_vector': self._deserialize_reference_vector(config_data.get('reference_vector'))
+                'reference_vector': self._deserialize_reference_vector(config_data.get('reference_vector')),
+                'ground_calibration': self._deserialize_ground_calibration(config_data.get('ground_calibration'))
             }
             
             print(f"✅ Configuration loaded: {config_path}")
@@ -135,10 +160,11 @@ class ConfigManager:
         """Convert lane configs to JSON-serializable format"""
         serialized = []
         for lane in lane_configs:
+            # Lanes drawn in the GUI carry 'poly'/'allowed_labels', loaded ones 'points'/'allowed_types'
             serialized.append({
-                'points': lane['points'],
+                'points': [list(p) for p in (lane.get('points') or lane['poly'])],
                 'label': lane.get('label', 'Unnamed Lane'),
-                'allowed_types': lane.get('allowed_types', [])
+                'allowed_types': list(lane.get('allowed_labels') or lane.get('allowed_types', []))
             })
         return serialized
     
@@ -192,6 +218,17 @@ class ConfigManager:
             'p2': list(p2)
         }
     
+    def _serialize_ground_calibration(self, calibration: Optional[Dict]) -> Optional[Dict]:
+        """Convert ground-plane calibration to JSON-serializable format"""
+        if calibration is None:
+            return None
+        # Format: 4 image points (pixels) ↔ 4 world points (meters on the road)
+        return {
+            'image_points': [[float(x), float(y)] for x, y in calibration['image_points']],
+            'world_points': [[float(x), float(y)] for x, y in calibration['world_points']],
+            'speed_limit_kmh': calibration.get('speed_limit_kmh', 50)
+        }
+    
     # Deserialization methods
     def _deserialize_lanes(self, lanes_data: List[Dict]) -> List[Dict]:
         """Convert JSON data back to lane configs"""
@@ -248,3 +285,18 @@ class ConfigManager:
         p1 = tuple(ref_data['p1'])
         p2 = tuple(ref_data['p2'])
         return (p1, p2)
+    
+    def _deserialize_ground_calibration(self, calib_data: Optional[Dict]) -> Optional[Dict]:
+        """Convert JSON data back to ground-plane calibration"""
+        if calib_data is None:
+            return None
+        image_points = [tuple(p) for p in calib_data.get('image_points', [])]
+        world_points = [tuple(p) for p in calib_data.get('world_points', [])]
+        if len(image_points) < 4 or len(image_points) != len(world_points):
+            print("⚠️ Invalid ground_calibration in config (need 4 image/world point pairs) - ignored")
+            return None
+        return {
+            'image_points': image_points,
+            'world_points': world_points,
+            'speed_limit_kmh': calib_data.get('speed_limit_kmh', 50)
+        }
@@ -0,0 +1,82 @@
+"""
+Config Watcher - Theo dõi file config JSON bằng polling (mtime + size), không cần inotify
+Dùng để hot-reload cấu hình ROI khi pipeline đang chạy
+"""
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+
+class ConfigFileWatcher:
+    """
+    Phát hiện file config thay đổi
+
+    - changed(): kiểm tra không chặn (gọi từ timer GUI), tự giới hạn theo interval
+    - start(on_change): thread nền gọi on_change(path) mỗi khi file đổi (headless)
+    - Debounce: chỉ báo đổi khi (mtime, size) giữ nguyên qua 2 lần kiểm tra liên tiếp
+      → không đọc file đang được ghi dở
+    """
+
+    def __init__(self, path, interval: float = 1.0):
+        self.path = str(path)
+        self.interval = interval
+        self._current = self._stat()  # Trạng thái đã load
+        self._candidate = None  # Trạng thái mới thấy, chờ ổn định
+        self._last_check = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None  # Chưa có / đang bị thay thế (ghi file tạm rồi rename)
+        return stat.st_mtime_ns, stat.st_size
+
+    def mark_current(self):
+        """Ghi nhận trạng thái hiện tại là đã load (sau khi chính app save/load file)"""
+        self._current = self._stat()
+        self._candidate = None
+
+    def changed(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_check < self.interval:
+            return False
+        self._last_check = now
+        return self._poll()
+
+    def _poll(self) -> bool:
+        state = self._stat()
+        if state is None or state == self._current:
+            self._candidate = None
+            return False
+        if state != self._candidate:
+            self._candidate = state  # Có thể còn đang ghi - xác nhận ở lần kiểm tra sau
+            return False
+        self._current, self._candidate = state, None
+        return True
+
+    def start(self, on_change: Callable[[str], None]):
+        """Poll trong thread nền, gọi on_change(path) khi file đổi"""
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+
+        def poll():
+            while not self._stop.wait(self.interval):
+                if self._poll():
+                    try:
+                        on_change(self.path)
+                    except Exception as e:
+                        print(f"⚠️ Config reload failed: {e}")
+
+        self._thread = threading.Thread(target=poll, name='ConfigFileWatcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
@@ -0,0 +1,230 @@
+"""
+Image Encode Pool - Encode JPEG/PNG song song trong background threads
+cv2.imencode nhả GIL nên thread pool đủ để chạy song song (không cần process pool)
+"""
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+POLICY_DROP_OLDEST = 'drop_oldest'
+POLICY_BLOCK = 'block'
+
+
+class EncodeJob:
+    """Một job encode (tương tự Future: done(), result(), add_done_callback())"""
+
+    __slots__ = ('image', 'ext', 'params', 'path', 'submitted_at', 'keep',
+                 '_data', '_error', '_dropped', '_event', '_callbacks', '_lock')
+
+    def __init__(self, image: np.ndarray, ext: str, params: List[int], path: Optional[Path]):
+        self.image = image
+        self.ext = ext
+        self.params = params
+        self.path = path
+        self.submitted_at = time.perf_counter()
+        self.keep = False  # True = không bao giờ bị drop_oldest bỏ (job submit với block=True)
+        self._data: Optional[bytes] = None
+        self._error: Optional[Exception] = None
+        self._dropped = False
+        self._event = threading.Event()
+        self._callbacks: List[Callable] = []
+        self._lock = threading.Lock()
+
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    def dropped(self) -> bool:
+        """True nếu job bị bỏ do queue đầy (policy drop_oldest) hoặc pool đã đóng"""
+        return self._dropped
+
+    def result(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Chờ và trả về bytes đã encode (None nếu bị bỏ hoặc encode lỗi)"""
+        self._event.wait(timeout)
+        return self._data
+
+    def exception(self) -> Optional[Exception]:
+        return self._error
+
+    def add_done_callback(self, fn: Callable[['EncodeJob'], None]):
+        """Gọi fn(job) khi xong (gọi ngay nếu đã xong)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, data: Optional[bytes] = None, error: Optional[Exception] = None, dropped: bool = False):
+        self.image = None  # Giải phóng frame gốc ngay
+        self._data = data
+        self._error = error
+        self._dropped = dropped
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"⚠️ Encode callback error: {e}")
+
+
+class ImageEncodePool:
+    """
+    Pool encode ảnh với queue giới hạn
+
+    Policy khi queue đầy:
+    - drop_oldest: bỏ job cũ nhất đang chờ (job đó kết thúc với result None) - không bao giờ block
+      Job submit với block=True không bị bỏ; nếu queue toàn job như vậy thì bỏ chính job mới
+    - block: chờ đến khi có chỗ trong queue
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32,
+                 policy: str = POLICY_DROP_OLDEST, jpeg_quality: int = 90, png_compression: int = 3):
+        """
+        Args:
+            workers: Số thread encode
+            max_queue: Số job tối đa đang chờ
+            policy: 'drop_oldest' hoặc 'block'
+            jpeg_quality: Chất lượng JPEG mặc định (0-100)
+            png_compression: Mức nén PNG mặc định (0-9)
+        """
+        if policy not in (POLICY_DROP_OLDEST, POLICY_BLOCK):
+            raise ValueError(f"Unknown encode policy: {policy}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.jpeg_quality = jpeg_quality
+        self.png_compression = png_compression
+
+        self._jobs: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f'ImageEncode-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, image: np.ndarray, path: Optional[str] = None, ext: Optional[str] = None,
+               quality: Optional[int] = None, block: Optional[bool] = None) -> EncodeJob:
+        """
+        Đưa ảnh vào queue encode
+
+        Args:
+            image: Ảnh BGR - caller KHÔNG được sửa ảnh sau khi submit (copy trước nếu cần)
+            path: Nếu có, ghi bytes ra file này sau khi encode
+            ext: '.jpg' hoặc '.png' (mặc định lấy theo path, không có path → '.jpg')
+            quality: JPEG quality (0-100) hoặc PNG compression (0-9) cho riêng job này
+            block: Ghi đè policy cho riêng job này (True = chờ chỗ trống, False = drop oldest)
+        """
+        if ext is None:
+            ext = Path(path).suffix.lower() if path else '.jpg'
+        if ext in ('.jpg', '.jpeg'):
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality if quality is None else quality]
+        elif ext == '.png':
+            params = [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression if quality is None else quality]
+        else:
+            params = []
+
+        job = EncodeJob(image, ext, params, Path(path) if path else None)
+        if block is None:
+            block = self.policy == POLICY_BLOCK
+        job.keep = block
+
+        evicted = None
+        with self._cond:
+            if len(self._jobs) >= self.max_queue and not self._closed:
+                if block:
+                    while len(self._jobs) >= self.max_queue and not self._closed:
+                        self._cond.wait()
+                else:
+                    evicted = next((j for j in self._jobs if not j.keep), job)
+                    if evicted is not job:
+                        self._jobs.remove(evicted)
+                    self.dropped += 1
+            if self._closed:
+                evicted = job
+            elif evicted is not job:
+                self._jobs.append(job)
+                self.submitted += 1
+                self._cond.notify_all()
+
+        if evicted is not None:
+            evicted._finish(dropped=True)
+        return job
+
+    def queue_depth(self) -> int:
+        return len(self._jobs)
+
+    def stats(self) -> Dict[str, float]:
+        """Thống kê: độ sâu queue, số job, latency (ms, tính từ lúc submit đến lúc xong)"""
+        completed = max(self.completed, 1)
+        return {
+            'queue_depth': len(self._jobs),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'avg_latency_ms': self._latency_total / completed * 1000,
+            'max_latency_ms': self._latency_max * 1000,
+        }
+
+    def close(self, wait: bool = True):
+        """Dừng pool; wait=True → encode hết job còn trong queue trước khi dừng"""
+        with self._cond:
+            self._closed = True
+            pending = [] if wait else list(self._jobs)
+            if not wait:
+                self._jobs.clear()
+            self._cond.notify_all()
+        for job in pending:
+            job._finish(dropped=True)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._closed:
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                job = self._jobs.popleft()
+                self._cond.notify_all()  # Có chỗ trống cho submit đang block
+
+            try:
+                ok, buf = cv2.imencode(job.ext, job.image, job.params)
+                if not ok:
+                    raise ValueError(f"cv2.imencode failed ({job.ext})")
+                data = buf.tobytes()
+                if job.path is not None:
+                    job.path.parent.mkdir(parents=True, exist_ok=True)
+                    job.path.write_bytes(data)
+            except Exception as e:
+                with self._cond:
+                    self.failed += 1
+                print(f"❌ Encode error: {e}")
+                job._finish(error=e)
+                continue
+
+            latency = time.perf_counter() - job.submitted_at
+            with self._cond:
+                self.completed += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+            job._finish(data=data)
@@ -0,0 +1,129 @@
+"""
+Import Timing - Đo thời gian khởi động: thời gian import từng module (giống python -X importtime)
+và các mốc khởi động (cửa sổ hiện lên, backend sẵn sàng, model đã load)
+Đo cả import chạy trong thread nền (BackendLoader)
+"""
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class ImportTimer:
+    """
+    Meta path finder chỉ để đo: tìm spec bằng các finder còn lại, bọc exec_module của loader
+
+    - self time = thời gian exec module trừ thời gian import module con
+    - cumulative = tổng thời gian exec (kể cả module con)
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._records: List[Tuple[str, float, float, str]] = []  # (module, self, cumulative, thread)
+        self._marks: List[Tuple[str, float]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reported = False
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        if getattr(self._local, 'finding', False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    self._wrap_loader(spec)
+                    return spec
+            return None
+        finally:
+            self._local.finding = False
+
+    def _wrap_loader(self, spec):
+        loader = spec.loader
+        # Builtin/frozen importers are shared classes - patching them would affect every module
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return
+        exec_module = loader.exec_module
+        name = spec.name
+
+        def timed_exec_module(module):
+            stack = self._stack()
+            stack.append(0.0)  # Time spent in nested imports
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with self._lock:
+                    self._records.append((name, elapsed - children, elapsed, threading.current_thread().name))
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass  # Loader with __slots__ - its time is counted in the parent module
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def mark(self, label: str):
+        """Ghi một mốc khởi động (giây tính từ lúc install)"""
+        with self._lock:
+            self._marks.append((label, time.perf_counter() - self.started_at))
+
+    def report(self, top: int = 25):
+        """In mốc khởi động + top module theo cumulative time"""
+        self.reported = True
+        with self._lock:
+            records = list(self._records)
+            marks = list(self._marks)
+
+        print(f"📊 Startup timing ({len(records)} modules imported)")
+        for label, at in marks:
+            print(f"   {at * 1000:9.1f} ms  {label}")
+
+        print(f"   {'self [ms]':>10} | {'cumulative [ms]':>15} | module")
+        main_thread = threading.main_thread().name
+        for name, self_time, cumulative, thread in sorted(records, key=lambda r: r[2], reverse=True)[:top]:
+            where = '' if thread == main_thread else f"  [{thread}]"
+            print(f"   {self_time * 1000:10.1f} | {cumulative * 1000:15.1f} | {name}{where}")
+
+
+_timer: Optional[ImportTimer] = None
+
+
+def start_import_timing() -> ImportTimer:
+    """Bật đo import (gọi trước khi import các module nặng)"""
+    global _timer
+    if _timer is None:
+        _timer = ImportTimer().install()
+    return _timer
+
+
+def mark_startup(label: str):
+    """Ghi mốc khởi động (không làm gì nếu chưa bật đo)"""
+    if _timer is not None:
+        _timer.mark(label)
+
+
+def report_import_timing(top: int = 25):
+    """In báo cáo một lần (không làm gì nếu chưa bật đo hoặc đã in)"""
+    if _timer is not None and not _timer.reported:
+        _timer.report(top)
@@ -0,0 +1,286 @@
+"""
+Shared Frame Pool - Truyền frame giữa các process qua shared memory (không pickle frame)
+Queue chỉ chở handle nhỏ (slot, frame_index, timestamp); slot có đếm tham chiếu và được tái sử dụng
+"""
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameHandle:
+    """Handle của một frame trong pool (đi qua queue thay cho frame)"""
+
+    __slots__ = ('slot', 'frame_index', 'timestamp')
+
+    def __init__(self, slot: int, frame_index: int, timestamp: float):
+        self.slot = slot
+        self.frame_index = frame_index
+        self.timestamp = timestamp  # Thời điểm decode (wall clock)
+
+    def __getstate__(self):
+        return (self.slot, self.frame_index, self.timestamp)
+
+    def __setstate__(self, state):
+        self.slot, self.frame_index, self.timestamp = state
+
+
+class SharedFramePool:
+    """
+    Pool N slot frame cùng kích thước trong một khối shared memory
+
+    Nguyên lý:
+    - acquire() lấy slot rảnh (refs = 1), chờ nếu hết slot → producer tự bị giới hạn tốc độ
+    - Producer ghi thẳng vào view(slot), gửi FrameHandle qua queue
+    - Consumer đọc view(slot); retain()/release() khi chia sẻ slot cho stage khác
+    - refs về 0 → slot quay lại pool (không cấp phát, không copy)
+    - Truyền pool sang process con qua args của Process (attach lại theo tên shared memory)
+    """
+
+    def __init__(self, num_slots: int, shape: Tuple[int, ...], dtype=np.uint8, ctx=None):
+        """
+        Args:
+            num_slots: Số slot frame
+            shape: Shape mỗi frame (vd. (1080, 1920, 3))
+            dtype: Kiểu dữ liệu frame
+            ctx: multiprocessing context (None = mặc định)
+        """
+        ctx = ctx or mp.get_context()
+        self.num_slots = num_slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self.frame_bytes * num_slots)
+        self._owner = True
+        self._refs = ctx.Array('i', num_slots, lock=False)
+        self._cond = ctx.Condition()
+        self._views: Optional[List[np.ndarray]] = None
+
+    def __getstate__(self):
+        return {
+            'name': self._shm.name, 'num_slots': self.num_slots, 'shape': self.shape,
+            'dtype': self.dtype.str, 'refs': self._refs, 'cond': self._cond,
+        }
+
+    def __setstate__(self, state):
+        self.num_slots = state['num_slots']
+        self.shape = state['shape']
+        self.dtype = np.dtype(state['dtype'])
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        try:
+            self._shm = shared_memory.SharedMemory(name=state['name'], track=False)
+        except TypeError:  # Python < 3.13: no track flag
+            self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._refs = state['refs']
+        self._cond = state['cond']
+        self._views = None
+
+    def view(self, slot: int) -> np.ndarray:
+        """numpy array trỏ thẳng vào slot (không copy)"""
+        if self._views is None:
+            self._views = [
+                np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf, offset=i * self.frame_bytes)
+                for i in range(self.num_slots)
+            ]
+        return self._views[slot]
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Lấy slot rảnh (refs = 1); None nếu hết timeout mà chưa có slot"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for slot in range(self.num_slots):
+                    if self._refs[slot] == 0:
+                        self._refs[slot] = 1
+                        return slot
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def retain(self, slot: int):
+        """Thêm một tham chiếu (stage khác cũng giữ slot)"""
+        with self._cond:
+            self._refs[slot] += 1
+
+    def release(self, slot: int):
+        """Bỏ một tham chiếu; về 0 thì slot được tái sử dụng"""
+        with self._cond:
+            if self._refs[slot] > 0:
+                self._refs[slot] -= 1
+            if self._refs[slot] == 0:
+                self._cond.notify_all()
+
+    def in_use(self) -> int:
+        """Số slot đang được giữ"""
+        with self._cond:
+            return sum(1 for slot in range(self.num_slots) if self._refs[slot] > 0)
+
+    def close(self):
+        """Đóng mapping (process tạo pool thì giải phóng luôn shared memory)"""
+        self._views = None
+        try:
+            self._shm.close()
+        except BufferError:
+            print("⚠️ SharedFramePool: frame views still referenced, mapping left open")
+            return
+        if self._owner:
+            self._shm.unlink()
+
+
+def _decode_worker(pool: SharedFramePool, source: str, handles, stop_event):
+    """Decode stage (process riêng): đọc frame thẳng vào slot của pool, gửi handle qua queue"""
+    cap = cv2.VideoCapture(source)
+    height, width = pool.shape[:2]
+    frame_index = 0
+    try:
+        while not stop_event.is_set():
+            slot = pool.acquire(timeout=0.5)
+            if slot is None:
+                continue  # Consumer still holds every slot
+
+            view = pool.view(slot)
+            ok, frame = cap.read(view)
+            if not ok:
+                pool.release(slot)
+                break
+            if frame.shape != view.shape:
+                cv2.resize(frame, (width, height), dst=view)  # Stream changed resolution
+            elif frame.ctypes.data != view.ctypes.data:
+                np.copyto(view, frame)  # Backend didn't decode in place
+
+            handle = FrameHandle(slot, frame_index, time.time())
+            frame_index += 1
+            while True:
+                try:
+                    handles.put(handle, timeout=0.5)
+                    break
+                except queue.Full:
+                    if stop_event.is_set():
+                        pool.release(slot)
+                        return
+    finally:
+        cap.release()
+        try:
+            handles.put(None, timeout=1.0)  # End of stream
+        except queue.Full:
+            pass
+        frame = view = None
+        pool.close()
+
+
+class SharedFrameCapture:
+    """
+    Thay cv2.VideoCapture: decode chạy trong process riêng, frame đến qua SharedFramePool
+
+    Frame trả về từ read() là view vào shared memory, chỉ hợp lệ đến lần read() tiếp theo
+    (slot được trả lại pool lúc đó) - copy nếu cần giữ lâu hơn.
+    Không hỗ trợ seek: set() luôn trả về False.
+    """
+
+    def __init__(self, source: str, num_slots: int = 4, read_timeout: float = 10.0):
+        """
+        Args:
+            source: Video file hoặc URL stream
+            num_slots: Số slot trong pool (= số frame decode trước tối đa)
+            read_timeout: Thời gian chờ frame tối đa (giây) trước khi coi decoder đã chết
+        """
+        self.source = source
+        self.read_timeout = read_timeout
+        self.frame_index = -1
+        self._current: Optional[int] = None
+        self._pool = None
+        self._process = None
+
+        # Probe size/FPS in this process (pool slots need a fixed frame size)
+        probe = cv2.VideoCapture(source)
+        self._opened = probe.isOpened()
+        self._fps = probe.get(cv2.CAP_PROP_FPS) if self._opened else 0.0
+        ok, first = probe.read() if self._opened else (False, None)
+        probe.release()
+        if not ok:
+            self._opened = False
+            return
+        self._width, self._height = first.shape[1], first.shape[0]
+
+        # spawn: never fork a process that already runs inference/GUI threads
+        ctx = mp.get_context('spawn')
+        self._pool = SharedFramePool(num_slots, first.shape, first.dtype, ctx=ctx)
+        self._handles = ctx.Queue(maxsize=num_slots)
+        self._stop = ctx.Event()
+        self._process = ctx.Process(target=_decode_worker, args=(self._pool, source, self._handles, self._stop),
+                                    name='FrameDecoder', daemon=True)
+        self._process.start()
+        print(f"🎞️ Decoding in a separate process (pid={self._process.pid}, {num_slots} shared slots "
+              f"of {self._width}x{self._height})")
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def get(self, prop) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._width) if self._opened else 0.0
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._height) if self._opened else 0.0
+        return 0.0
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def read(self):
+        """(ok, frame) như cv2.VideoCapture.read(); frame là view vào shared memory"""
+        if self._current is not None:
+            self._pool.release(self._current)
+            self._current = None
+        if not self._opened:
+            return False, None
+
+        deadline = time.monotonic() + self.read_timeout
+        while True:
+            try:
+                handle = self._handles.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if not self._process.is_alive() or time.monotonic() >= deadline:
+                    print("⚠️ SharedFrameCapture: decoder stopped responding")
+                    self._opened = False
+                    return False, None
+
+        if handle is None:
+            self._opened = False  # End of stream
+            return False, None
+        self._current = handle.slot
+        self.frame_index = handle.frame_index
+        return True, self._pool.view(handle.slot)
+
+    def release(self):
+        """Dừng decoder và giải phóng shared memory"""
+        if self._process is None:
+            return
+        self._stop.set()
+        if self._current is not None:
+            self._pool.release(self._current)
+            self._current = None
+        # Drain pending handles so the decoder can't block on a full queue
+        deadline = time.monotonic() + 5.0
+        while self._process.is_alive() and time.monotonic() < deadline:
+            try:
+                handle = self._handles.get(timeout=0.1)
+                if handle is not None:
+                    self._pool.release(handle.slot)
+            except queue.Empty:
+                pass
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+        self._process = None
+        self._pool.close()
+        self._opened = False
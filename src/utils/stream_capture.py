@@ -0,0 +1,183 @@
+"""
+Stream Capture - Nguồn video live (RTSP/HTTP): tự kết nối lại, luôn trả frame mới nhất
+Thread nền đọc liên tục, chỉ giữ frame cuối cùng → frame cũ trong buffer bị bỏ, độ trễ không tăng dần
+File video cũng dùng được như một camera giả lập (đọc theo FPS gốc, hết file = mất kết nối) để test
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+
+
+def is_stream_source(source) -> bool:
+    """URL (rtsp://, http://...) - nguồn live, không có 'hết video'"""
+    return isinstance(source, str) and '://' in source
+
+
+class StreamCapture:
+    """
+    Thay cv2.VideoCapture cho camera live
+
+    - Kết nối lại với backoff (nhân đôi, tối đa backoff_max) khi mở thất bại hoặc mất frame
+    - read() trả frame mới nhất chưa trả lần nào; frame đến trong lúc đang xử lý mà bị thay thế → dropped
+    - timestamp: thời điểm capture (wall clock) của frame vừa read(), không phải lúc xử lý
+    - health(): số liệu tình trạng stream (kết nối, reconnect, FPS vào, frame bỏ, độ trễ)
+    Không hỗ trợ seek: set() luôn trả về False.
+    """
+
+    def __init__(self, source: str, read_timeout: float = 5.0, backoff_initial: float = 0.5,
+                 backoff_max: float = 30.0, pace: Optional[bool] = None, open_timeout: float = 10.0):
+        """
+        Args:
+            source: URL stream, hoặc file video (camera giả lập)
+            read_timeout: read() chờ frame mới tối đa (giây), hết thời gian trả về (False, None)
+            backoff_initial: Thời gian chờ trước lần kết nối lại đầu tiên (giây)
+            backoff_max: Thời gian chờ tối đa giữa 2 lần kết nối lại (giây)
+            pace: Đọc theo FPS gốc như camera thật (None = chỉ với file, stream tự có nhịp)
+            open_timeout: Chờ kết nối đầu tiên tối đa (giây) để biết FPS/kích thước
+        """
+        self.source = source
+        self.read_timeout = read_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.pace = (not is_stream_source(source)) if pace is None else pace
+
+        self.frame_index = -1  # Số thứ tự (theo capture) của frame vừa read()
+        self.timestamp: Optional[float] = None
+
+        self._cond = threading.Condition()
+        self._latest = None  # (frame, timestamp, seq)
+        self._delivered_seq = -1
+        self._props = {cv2.CAP_PROP_FPS: 0.0, cv2.CAP_PROP_FRAME_WIDTH: 0.0, cv2.CAP_PROP_FRAME_HEIGHT: 0.0}
+        self._stats = {'connected': False, 'connects': 0, 'reconnects': 0, 'frames_captured': 0,
+                       'frames_delivered': 0, 'frames_dropped': 0, 'last_error': None}
+        self._capture_times = []  # Timestamp các frame gần đây - tính FPS vào
+        self._last_latency = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._reader, name='StreamCapture', daemon=True)
+        self._thread.start()
+
+        with self._cond:
+            self._cond.wait_for(lambda: self._latest is not None or self._stop.is_set(), timeout=open_timeout)
+        if self._latest is None:
+            print(f"⚠️ StreamCapture: no frame from {source} after {open_timeout:.0f}s - still retrying")
+
+    def _connect(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Best effort: not every backend keeps a small buffer
+        with self._cond:
+            for prop in self._props:
+                value = cap.get(prop)
+                if value > 0:
+                    self._props[prop] = value
+        return cap
+
+    def _reader(self):
+        backoff = self.backoff_initial
+        seq = 0
+        while not self._stop.is_set():
+            cap = self._connect()
+            if cap is None:
+                self._set_disconnected(f"cannot open {self.source}")
+                print(f"⚠️ StreamCapture: cannot open {self.source} - retrying in {backoff:.1f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+                continue
+
+            with self._cond:
+                self._stats['connected'] = True
+                self._stats['connects'] += 1
+                if self._stats['connects'] > 1:
+                    self._stats['reconnects'] += 1
+            interval = 1.0 / (self._props[cv2.CAP_PROP_FPS] or 30.0)
+            next_due = time.monotonic()
+
+            while not self._stop.is_set():
+                if self.pace:
+                    delay = next_due - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    next_due = max(next_due + interval, time.monotonic() - interval)
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                backoff = self.backoff_initial  # Connection delivered frames - reset backoff
+                captured_at = time.time()
+                with self._cond:
+                    if self._latest is not None and self._latest[2] > self._delivered_seq:
+                        self._stats['frames_dropped'] += 1  # Replaced before anyone read it
+                    self._latest = (frame, captured_at, seq)
+                    self._stats['frames_captured'] += 1
+                    self._capture_times.append(captured_at)
+                    if len(self._capture_times) > 60:
+                        del self._capture_times[0]
+                    self._cond.notify_all()
+                seq += 1
+
+            cap.release()
+            if self._stop.is_set():
+                break
+            self._set_disconnected("stream ended")
+            print(f"⚠️ StreamCapture: lost {self.source} - reconnecting in {backoff:.1f}s")
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.backoff_max)
+
+        with self._cond:
+            self._stats['connected'] = False
+            self._cond.notify_all()
+
+    def _set_disconnected(self, error: str):
+        with self._cond:
+            self._stats['connected'] = False
+            self._stats['last_error'] = error
+
+    def isOpened(self) -> bool:
+        """True đến khi release() - mất kết nối tạm thời vẫn tính là mở (đang kết nối lại)"""
+        return not self._stop.is_set()
+
+    def get(self, prop) -> float:
+        with self._cond:
+            return self._props.get(prop, 0.0)
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def read(self):
+        """(ok, frame) như cv2.VideoCapture.read(); ok=False nếu không có frame mới trong read_timeout"""
+        with self._cond:
+            has_new = self._cond.wait_for(
+                lambda: (self._latest is not None and self._latest[2] > self._delivered_seq) or self._stop.is_set(),
+                timeout=self.read_timeout)
+            if not has_new or self._stop.is_set():
+                return False, None
+            frame, captured_at, seq = self._latest
+            self._delivered_seq = seq
+            self._stats['frames_delivered'] += 1
+        self.frame_index = seq
+        self.timestamp = captured_at
+        self._last_latency = time.time() - captured_at
+        return True, frame
+
+    def health(self) -> Dict:
+        """Tình trạng stream (đọc từ thread khác được)"""
+        with self._cond:
+            stats = dict(self._stats)
+            times = list(self._capture_times)
+            last_capture = self._latest[1] if self._latest is not None else None
+        span = times[-1] - times[0] if len(times) > 1 else 0.0
+        stats['capture_fps'] = round((len(times) - 1) / span, 1) if span > 0 else 0.0
+        stats['last_frame_age'] = round(time.time() - last_capture, 3) if last_capture is not None else None
+        stats['latency_ms'] = round(self._last_latency * 1000, 1)
+        return stats
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=5.0)
+        with self._cond:
+            self._latest = None
@@ -1,3 +1,6 @@
+import cv2
+
+
 def read_video(video_path):
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -17,5 +20,14 @@ def release_video(cap):
     cap.release()
     cv2.destroyAllWindows()
 
-def save_frame(frame, output_path):
-    cv2.imwrite(output_path, frame)
\ No newline at end of file
+def save_frame(frame, output_path, encoder=None, quality=None, block=None):
+    """Save a frame to disk; with an ImageEncodePool the write is asynchronous
+    and the returned EncodeJob can be waited on (frame must not be modified afterwards).
+    block overrides the pool policy for this job (True = wait for room, never evicted)"""
+    if encoder is not None:
+        return encoder.submit(frame, path=output_path, quality=quality, block=block)
+    if quality is not None:
+        ext = str(output_path).lower().rsplit('.', 1)[-1]
+        flag = cv2.IMWRITE_PNG_COMPRESSION if ext == 'png' else cv2.IMWRITE_JPEG_QUALITY
+        return cv2.imwrite(str(output_path), frame, [flag, quality])
+    return cv2.imwrite(str(output_path), frame)
@@ -0,0 +1,53 @@
+"""
+CameraConfig.activity_mask: mask phải phủ hợp (union) của mọi làn / zone, kể cả chỗ chồng lấn
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
+
+# Load the module file directly: core/__init__ pulls in the Qt video pipeline
+_spec = importlib.util.spec_from_file_location("camera_config", SRC / "core" / "camera_config.py")
+camera_config = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(camera_config)
+CameraConfig = camera_config.CameraConfig
+
+SHAPE = (100, 100)
+
+
+def _union(polygons):
+    union = np.zeros(SHAPE, dtype=np.uint8)
+    for points in polygons:
+        single = np.zeros(SHAPE, dtype=np.uint8)
+        cv2.fillPoly(single, [np.array(points, dtype=np.int32)], 255)
+        union |= single
+    return union
+
+
+def test_overlapping_lane_and_zone_cover_their_union():
+    lane = [(10, 10), (60, 10), (60, 60), (10, 60)]
+    zone = [(40, 40), (90, 40), (90, 90), (40, 90)]
+    config = CameraConfig.compile(lanes=[{'points': lane}], direction_zones=[{'points': zone}])
+
+    mask = config.activity_mask(SHAPE)
+
+    assert mask[50, 50] == 255  # Inside both polygons
+    np.testing.assert_array_equal(mask, _union([lane, zone]))
+
+
+def test_overlapping_lanes_cover_their_union():
+    lanes = [[(10, 10), (60, 10), (60, 60), (10, 60)], [(30, 30), (80, 30), (80, 80), (30, 80)]]
+    config = CameraConfig.compile(lanes=[{'points': points} for points in lanes])
+
+    np.testing.assert_array_equal(config.activity_mask(SHAPE), _union(lanes))
+
+
+def test_empty_config_has_no_mask():
+    assert CameraConfig().activity_mask(SHAPE) is None
@@ -0,0 +1,34 @@
+"""
+SpeedEstimator: thu hồi slot khi đầy không được cấp trùng slot trong cùng 1 lần update()
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+# Load the module file directly: core/__init__ pulls in the Qt video pipeline
+_spec = importlib.util.spec_from_file_location("speed_estimator", SRC / "core" / "speed_estimator.py")
+speed_estimator = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(speed_estimator)
+SpeedEstimator = speed_estimator.SpeedEstimator
+
+
+def test_full_estimator_evicts_distinct_slots_in_one_update():
+    estimator = SpeedEstimator(capacity=2)
+    estimator.update([1, 2], [(0, 0), (10, 10)], 0.0)
+    estimator.update([3, 4], [(0, 0), (10, 10)], 0.1)
+
+    assert sorted(estimator._slot_of) == [3, 4]
+    assert sorted(estimator._slot_of.values()) == [0, 1]
+
+
+def test_tracks_beyond_capacity_in_one_frame_are_skipped():
+    estimator = SpeedEstimator(capacity=2)
+    estimator.update([1, 2, 3], [(0, 0), (10, 10), (20, 20)], 0.0)
+
+    assert sorted(estimator._slot_of) == [1, 2]
+    assert sorted(estimator._slot_of.values()) == [0, 1]